@@ -1,6 +1,6 @@
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 
 from app.core.config import SECRET_KEY, API_PREFIX
@@ -15,15 +15,23 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{API_PREFIX}/users/login/token/"
 
 def get_user_from_token(
     *,
+    request: Request,
     token: str = Depends(oauth2_scheme),
     user_repo: UsersRepository = Depends(get_repository(UsersRepository)),
 ) -> Optional[UserInDB]:
+    # every sub-request of a batch carries the batch's Authorization header, so resolve it once
+    batch_state = request.scope.get("batch")
+    if batch_state is not None and "current_user" in batch_state:
+        return batch_state["current_user"]
+
     try:
         username = auth_service.get_username_from_token(token=token, secret_key=str(SECRET_KEY))
         user = user_repo.get_user_by_username(username=username)
     except Exception as e:
         raise e
 
+    if batch_state is not None:
+        batch_state["current_user"] = user
     return user
 
 
@@ -43,3 +51,8 @@ def get_current_active_user(current_user: UserInDB = Depends(get_user_from_token
 
     return current_user
 
+
+def get_current_superuser(current_user: UserInDB = Depends(get_current_active_user)) -> UserInDB:
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superusers may do that.")
+    return current_user
@@ -0,0 +1,31 @@
+from typing import Optional
+
+from fastapi import Header, HTTPException, Response, status
+
+from app.db.repositories.base import VERSION_CONFLICT_DETAIL
+
+
+def etag_for(version: int) -> str:
+    return f'"{version}"'
+
+
+def set_etag(response: Response, version: int) -> None:
+    response.headers["ETag"] = etag_for(version)
+
+
+def get_if_match_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """
+    The version an update was made against, from the ETag the client sends back in If-Match. Without
+    the header (or with "*") there is nothing to compare to up front, but the update is still refused
+    if the row changes between being loaded and being written.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    etag = if_match.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    try:
+        return int(etag.strip('"'))
+    except ValueError:
+        # not an ETag we handed out, so it can't match the current one
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=VERSION_CONFLICT_DETAIL)
@@ -1,5 +1,5 @@
 from typing import Callable, Type
-from fastapi import Depends
+from fastapi import Depends, Request
 from sqlalchemy.orm import session
 
 from app.db.repositories.base import BaseRepository
@@ -8,7 +8,13 @@ from app import settings
 
 print(settings.db_url)
 
-def get_db():
+def get_db(request: Request):
+    # sub-requests run by POST /api/batch share the session the batch itself checked out
+    batch_state = request.scope.get("batch")
+    if batch_state is not None:
+        yield batch_state["db"]
+        return
+
     db = SessionLocal()
     try:
         yield db
@@ -21,4 +27,3 @@ def get_repository(Repo_type: Type[BaseRepository]) -> Callable:
         return Repo_type(db)
 
     return get_repo
-
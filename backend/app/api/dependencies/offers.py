@@ -1,5 +1,5 @@
 from typing import List
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Query, status
 from app.api.dependencies.users import get_user_by_username_from_path
 from app.db.metadata import Offer
 from app.models.offer import OfferInDB
@@ -37,10 +37,11 @@ async def get_offer_for_trade_from_current_user(
 
 
 def list_offers_for_trade_by_id_from_path(
+    live: bool = Query(False),
     trade: TradeInDB = Depends(get_trade_by_id_from_path),
     offers_repo: OffersRepository = Depends(get_repository(OffersRepository)),
 ) -> List[Offer]:
-    return offers_repo.list_offers_for_trade(trade=trade)
+    return offers_repo.list_offers_for_trade(trade=trade, live_only=live)
 
 def check_offer_create_permissions(
     current_user: UserInDB = Depends(get_current_active_user),
@@ -82,7 +83,7 @@ def check_offer_acceptance_permissions(
     current_user: UserInDB = Depends(get_current_active_user),
     trade: TradeInDB = Depends(get_trade_by_id_from_path),
     offer: OfferInDB = Depends(get_offer_for_trade_from_user_by_path),
-    existing_offers: List[OfferInDB] = Depends(list_offers_for_trade_by_id_from_path)
+    offers_repo: OffersRepository = Depends(get_repository(OffersRepository)),
 ) -> None:
     if trade.user_id != current_user.id:
         raise HTTPException(
@@ -92,7 +93,7 @@ def check_offer_acceptance_permissions(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Can only accept offers that are currently pending."
         )
-    if "accepted" in [o.status for o in existing_offers]:
+    if offers_repo.has_accepted_offer(trade_id=trade.id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="That product for trade already has an accepted offer."
         )
@@ -0,0 +1,25 @@
+import base64
+import json
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Query, status
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Pack the sort key of the last row on a page into an opaque string for the client to send back
+    """
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+
+def get_cursor_from_query(cursor: Optional[str] = Query(None)) -> Optional[List[Any]]:
+    if cursor is None:
+        return None
+    return decode_cursor(cursor)
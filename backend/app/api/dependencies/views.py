@@ -0,0 +1,27 @@
+from fastapi import Request
+
+from app.db.repositories.views import ViewsRepository
+from app.models.views import ViewCounts
+from app.services import view_counter
+
+
+def get_viewer_key(request: Request) -> str:
+    """
+    Tells viewers apart for the unique viewer counts without requiring a login
+    """
+    host = request.client.host if request.client else ""
+    return f"{host}|{request.headers.get('user-agent', '')}"
+
+
+def count_view(*, views_repo: ViewsRepository, kind: str, item_id: int, viewer: str) -> ViewCounts:
+    """
+    Record a view in this worker's buffer and return the counts including it. Only reads the database.
+    """
+    view_counter.record(kind=kind, item_id=item_id, viewer=viewer)
+    stored = views_repo.get_view_count(kind=kind, item_id=item_id)
+    return view_counter.get_counts(
+        kind=kind,
+        item_id=item_id,
+        stored_views=stored.views if stored else 0,
+        stored_viewers=stored.unique_viewers if stored else None,
+    )
@@ -6,6 +6,16 @@ from app.api.routes.users import router as users_router
 from app.api.routes.profiles import router as profiles_router
 from app.api.routes.trades import router as trade_router
 from app.api.routes.offers import router as offers_router  
+from app.api.routes.inbox import router as inbox_router
+from app.api.routes.offer_events import router as offer_events_router
+from app.api.routes.webhooks import router as webhooks_router
+from app.api.routes.wishlist import router as wishlist_router
+from app.api.routes.swaps import router as swaps_router
+from app.api.routes.searches import router as searches_router
+from app.api.routes.batch import router as batch_router
+from app.api.routes.follows import router as follows_router
+from app.api.routes.sync import router as sync_router
+from app.api.routes.changes import router as changes_router
 
 router = APIRouter()
 
@@ -14,3 +24,13 @@ router.include_router(users_router, prefix="/users", tags=["users"])
 router.include_router(profiles_router, prefix="/profiles", tags=["profiles"])
 router.include_router(trade_router, prefix="/trade", tags=["trades"])
 router.include_router(offers_router, prefix="/trade/{trade_id}/offers", tags=["offers"])  
+router.include_router(inbox_router, prefix="/offers", tags=["offers"])
+router.include_router(offer_events_router, prefix="/offers/events", tags=["offers"])
+router.include_router(webhooks_router, prefix="/webhooks", tags=["webhooks"])
+router.include_router(wishlist_router, prefix="/wishlist", tags=["swaps"])
+router.include_router(swaps_router, prefix="/swaps", tags=["swaps"])
+router.include_router(searches_router, prefix="/searches", tags=["searches"])
+router.include_router(batch_router, prefix="/batch", tags=["batch"])
+router.include_router(follows_router, prefix="/following", tags=["follows"])
+router.include_router(sync_router, prefix="/sync", tags=["sync"])
+router.include_router(changes_router, prefix="/changes", tags=["changes"])
@@ -0,0 +1,78 @@
+import json
+from typing import List
+
+from fastapi import APIRouter, Body, Depends, Request
+from sqlalchemy.orm import session
+
+from app.api.dependencies.database import get_db
+from app.models.batch import BatchSubRequest, BatchSubResponse, BatchResponse
+
+router = APIRouter()
+
+# scope keys copied from the batch request onto every sub-request
+INHERITED_SCOPE_KEYS = ("type", "asgi", "http_version", "scheme", "server", "client", "root_path")
+
+
+async def run_sub_request(*, request: Request, sub_request: BatchSubRequest, batch_state: dict) -> BatchSubResponse:
+    path, _, query_string = sub_request.path.partition("?")
+    body = b"" if sub_request.body is None else json.dumps(sub_request.body).encode()
+    headers = [
+        (name, value) for name, value in request.scope["headers"]
+        if name not in (b"content-length", b"content-type")
+    ]
+    headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+    scope = {key: request.scope[key] for key in INHERITED_SCOPE_KEYS if key in request.scope}
+    scope.update({
+        "method": sub_request.method.value,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "headers": headers,
+        "batch": batch_state,
+    })
+
+    body_sent = False
+    async def receive() -> dict:
+        nonlocal body_sent
+        if body_sent:
+            return {"type": "http.disconnect"}
+        body_sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    response = {"status_code": 500, "content_type": b"", "chunks": []}
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            response["status_code"] = message["status"]
+            response["content_type"] = dict(message.get("headers", [])).get(b"content-type", b"")
+        elif message["type"] == "http.response.body":
+            response["chunks"].append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        # the app already answered 500 before re-raising; keep going with the rest of the batch
+        batch_state["db"].rollback()
+        response["status_code"] = 500
+
+    raw_body = b"".join(response["chunks"])
+    if not raw_body:
+        return BatchSubResponse(status_code=response["status_code"])
+    if response["content_type"].startswith(b"application/json"):
+        return BatchSubResponse(status_code=response["status_code"], body=json.loads(raw_body))
+    return BatchSubResponse(status_code=response["status_code"], body=raw_body.decode(errors="replace"))
+
+
+@router.post("/", response_model=BatchResponse, name="batch:run-batch")
+async def run_batch(
+    request: Request,
+    requests: List[BatchSubRequest] = Body(..., embed=True, min_items=1, max_items=20),
+    db: session.Session = Depends(get_db),
+) -> BatchResponse:
+    # sub-requests run one after the other: they share a single (non thread-safe) session
+    batch_state = {"db": db}
+    responses = [
+        await run_sub_request(request=request, sub_request=sub_request, batch_state=batch_state)
+        for sub_request in requests
+    ]
+    return BatchResponse(responses=responses)
@@ -0,0 +1,39 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api.dependencies.auth import get_current_superuser
+from app.api.dependencies.database import get_repository
+from app.api.dependencies.pagination import encode_cursor, get_cursor_from_query
+from app.db.repositories.changes import ChangesRepository
+from app.models.change import Change, ChangeEntity, ChangePage
+from app.models.user import UserInDB
+
+router = APIRouter()
+
+
+@router.get("/", response_model=ChangePage, name="changes:list-changes")
+def list_changes(
+    entity: Optional[List[ChangeEntity]] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[list] = Depends(get_cursor_from_query),
+    current_user: UserInDB = Depends(get_current_superuser),
+    changes_repo: ChangesRepository = Depends(get_repository(ChangesRepository)),
+) -> ChangePage:
+    after = None
+    if cursor:
+        try:
+            txid, change_id = cursor
+            after = (int(txid), int(change_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+    entries = changes_repo.list_changes(
+        after=after, entities=[e.value for e in entity] if entity else None, limit=limit,
+    )
+    if entries:
+        after = (entries[-1].txid, entries[-1].id)
+    return ChangePage(
+        changes=[Change.from_entry(e) for e in entries],
+        next_cursor=encode_cursor(*after) if after else None,
+    )
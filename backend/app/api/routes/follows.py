@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+
+from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.database import get_repository
+from app.api.dependencies.pagination import encode_cursor, get_cursor_from_query
+from app.db.repositories.follows import FollowsRepository
+from app.models.follow import FollowedUser, PersonalFeedPage
+from app.models.trade import TradePublic
+from app.models.user import UserInDB
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[FollowedUser], name="follows:list-following")
+def list_following(
+    current_user: UserInDB = Depends(get_current_active_user),
+    follows_repo: FollowsRepository = Depends(get_repository(FollowsRepository)),
+) -> List[FollowedUser]:
+    return [
+        FollowedUser(id=f.followee_id, username=f.followee.username, followed_at=f.created_at)
+        for f in follows_repo.list_following(user_id=current_user.id)
+    ]
+
+
+@router.get("/feed/", response_model=PersonalFeedPage, name="follows:get-feed")
+def get_feed(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[list] = Depends(get_cursor_from_query),
+    current_user: UserInDB = Depends(get_current_active_user),
+    follows_repo: FollowsRepository = Depends(get_repository(FollowsRepository)),
+) -> PersonalFeedPage:
+    after = None
+    if cursor:
+        try:
+            created_at, trade_id = cursor
+            after = (datetime.fromisoformat(created_at), int(trade_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+    trades = follows_repo.list_feed(user_id=current_user.id, after=after, limit=limit + 1)
+    next_cursor = None
+    if len(trades) > limit:
+        trades = trades[:limit]
+        next_cursor = encode_cursor(trades[-1].created_at.isoformat(), trades[-1].id)
+
+    return PersonalFeedPage(trades=[TradePublic.from_orm(t) for t in trades], next_cursor=next_cursor)
+
+
+@router.put("/{user_id}/", response_model=bool, name="follows:follow-user")
+def follow_user(
+    user_id: int = Path(..., ge=1),
+    current_user: UserInDB = Depends(get_current_active_user),
+    follows_repo: FollowsRepository = Depends(get_repository(FollowsRepository)),
+) -> bool:
+    if user_id == current_user.id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Users cannot follow themselves.")
+    if not follows_repo.user_exists(user_id=user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No user found with that id.")
+    follows_repo.follow_user(follower_id=current_user.id, followee_id=user_id)
+    return True
+
+
+@router.delete("/{user_id}/", response_model=bool, name="follows:unfollow-user")
+def unfollow_user(
+    user_id: int = Path(..., ge=1),
+    current_user: UserInDB = Depends(get_current_active_user),
+    follows_repo: FollowsRepository = Depends(get_repository(FollowsRepository)),
+) -> bool:
+    if not follows_repo.unfollow_user(follower_id=current_user.id, followee_id=user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="You are not following that user.")
+    return True
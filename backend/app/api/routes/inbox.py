@@ -0,0 +1,94 @@
+from datetime import datetime
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+
+from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.database import get_repository
+from app.api.dependencies.pagination import encode_cursor, get_cursor_from_query
+from app.db.repositories.offers import OffersRepository
+from app.models.offer import OfferBulkResult, OfferInboxItem, OfferInboxPage, OfferStatus
+from app.models.user import UserInDB
+
+router = APIRouter()
+
+
+def list_offer_page(
+    *,
+    offers_repo: OffersRepository,
+    user_id: int,
+    incoming: bool,
+    statuses: Optional[List[OfferStatus]],
+    cursor: Optional[List[Any]],
+    limit: int,
+) -> OfferInboxPage:
+    after = None
+    if cursor:
+        try:
+            created_at, trade_id, user_id_key = cursor
+            after = (datetime.fromisoformat(created_at), int(trade_id), int(user_id_key))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+    # fetch one extra row to find out whether there is another page
+    offers = offers_repo.list_offers_for_user(
+        user_id=user_id,
+        incoming=incoming,
+        statuses=[s.value for s in statuses] if statuses else None,
+        after=after,
+        limit=limit + 1,
+    )
+    next_cursor = None
+    if len(offers) > limit:
+        offers = offers[:limit]
+        last = offers[-1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.trade_id, last.user_id)
+
+    return OfferInboxPage(offers=[OfferInboxItem.from_orm(o) for o in offers], next_cursor=next_cursor)
+
+
+@router.get("/outgoing/", response_model=OfferInboxPage, name="offers:list-outgoing-offers")
+def list_outgoing_offers(
+    statuses: Optional[List[OfferStatus]] = Query(None, alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[List[Any]] = Depends(get_cursor_from_query),
+    current_user: UserInDB = Depends(get_current_active_user),
+    offers_repo: OffersRepository = Depends(get_repository(OffersRepository)),
+) -> OfferInboxPage:
+    return list_offer_page(
+        offers_repo=offers_repo, user_id=current_user.id, incoming=False, statuses=statuses, cursor=cursor, limit=limit,
+    )
+
+
+@router.get("/incoming/", response_model=OfferInboxPage, name="offers:list-incoming-offers")
+def list_incoming_offers(
+    statuses: Optional[List[OfferStatus]] = Query(None, alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[List[Any]] = Depends(get_cursor_from_query),
+    current_user: UserInDB = Depends(get_current_active_user),
+    offers_repo: OffersRepository = Depends(get_repository(OffersRepository)),
+) -> OfferInboxPage:
+    return list_offer_page(
+        offers_repo=offers_repo, user_id=current_user.id, incoming=True, statuses=statuses, cursor=cursor, limit=limit,
+    )
+
+
+@router.post("/incoming/expire/", response_model=OfferBulkResult, name="offers:expire-incoming-offers")
+def expire_incoming_offers(
+    trade_ids: List[int] = Body(..., embed=True, min_items=1, max_items=500),
+    current_user: UserInDB = Depends(get_current_active_user),
+    offers_repo: OffersRepository = Depends(get_repository(OffersRepository)),
+) -> OfferBulkResult:
+    """
+    Expire every pending offer on several of the current user's trades at once
+    """
+    owners = offers_repo.get_trade_owners(trade_ids=trade_ids)
+    if len(owners) != len(set(trade_ids)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No trade found with that id.")
+    if any(owner_id != current_user.id for owner_id in owners.values()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Action forbidden. Users are only able to modify trades they own.",
+        )
+    by_trade = offers_repo.expire_pending_offers(trade_ids=list(owners))
+    return OfferBulkResult(affected=sum(by_trade.values()), by_trade=by_trade)
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.api.dependencies.auth import oauth2_scheme
+from app.core.config import SECRET_KEY
+from app.db.database import SessionLocal
+from app.db.repositories.users import UsersRepository
+from app.services import auth_service, offer_event_hub
+
+router = APIRouter()
+
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def get_active_user_id_for_token(token: str) -> int:
+    """
+    Resolve the token with a short-lived session: event streams stay open for a long time and
+    shouldn't pin a pooled connection the way a request-scoped get_db session would
+    """
+    username = auth_service.get_username_from_token(token=token, secret_key=str(SECRET_KEY))
+    db = SessionLocal()
+    try:
+        user = UsersRepository(db).get_user_by_username(username=username)
+        if not user or not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="No authenticated user.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return user.id
+    finally:
+        db.close()
+
+
+@router.get("/", name="offers:stream-offer-events")
+async def stream_offer_events(request: Request, token: str = Depends(oauth2_scheme)) -> StreamingResponse:
+    user_id = await run_in_threadpool(get_active_user_id_for_token, token)
+
+    async def event_stream():
+        async with offer_event_hub.subscription(user_id) as queue:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.websocket("/ws")
+async def offer_events_websocket(websocket: WebSocket, token: str = Query(...)) -> None:
+    # browsers can't set an Authorization header on a websocket, so the JWT comes in the query string
+    try:
+        user_id = await run_in_threadpool(get_active_user_id_for_token, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    async with offer_event_hub.subscription(user_id) as queue:
+        receiver = asyncio.ensure_future(websocket.receive())
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if receiver in done:
+                    if receiver.result()["type"] == "websocket.disconnect":
+                        getter.cancel()
+                        return
+                    # clients have nothing to say on this channel; keep listening for the disconnect
+                    receiver = asyncio.ensure_future(websocket.receive())
+                if getter in done:
+                    await websocket.send_json(getter.result())
+                else:
+                    getter.cancel()
+        finally:
+            receiver.cancel()
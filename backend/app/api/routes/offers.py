@@ -1,16 +1,19 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Path, Body, status, Depends
+from fastapi import APIRouter, Path, Body, Query, status, Depends
 from fastapi.exceptions import HTTPException
 from app.api.dependencies.auth import get_current_active_user
 from app.api.dependencies.database import get_repository
-from app.api.dependencies.trades import get_trade_by_id_from_path
+from app.api.dependencies.pagination import encode_cursor, get_cursor_from_query
+from app.api.dependencies.trades import check_trade_modification_permissions, get_trade_by_id_from_path
 from app.api.dependencies.offers import check_offer_create_permissions, check_offer_rescind_permissions, get_offer_for_trade_from_current_user
 from app.db.metadata import Offer, Trade
 from app.db.repositories.offers import OffersRepository
 from app.models.trade import TradeInDB
 
-from app.models.offer import OfferCreate, OfferUpdate, OfferInDB, OfferPublic
+from app.models.offer import (
+    OfferBulkResult, OfferCreate, OfferEventPublic, OfferTimeline, OfferUpdate, OfferInDB, OfferPublic,
+)
 from app.models.user import UserInDB
 
 
@@ -59,6 +62,73 @@ def list_offers_for_trade(
 
 
 
+@router.post(
+    "/reject/",
+    response_model=OfferBulkResult,
+    name="offers:reject-offers",
+    dependencies=[Depends(check_trade_modification_permissions)],
+)
+def reject_offers(
+    usernames: Optional[List[str]] = Body(None, min_items=1, max_items=1000),
+    except_username: Optional[str] = Body(None),
+    trade: Trade = Depends(get_trade_by_id_from_path),
+    offers_repo: OffersRepository = Depends(get_repository(OffersRepository)),
+) -> OfferBulkResult:
+    """
+    Reject the pending offers from usernames, or every pending offer except the one from except_username
+    """
+    if (usernames is None) == (except_username is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Provide exactly one of usernames or except_username.",
+        )
+    rejected = offers_repo.reject_pending_offers(trade_id=trade.id, usernames=usernames, except_username=except_username)
+    return OfferBulkResult(affected=rejected, by_trade={trade.id: rejected})
+
+
+
+
+@router.post(
+    "/expire/",
+    response_model=OfferBulkResult,
+    name="offers:expire-offers",
+    dependencies=[Depends(check_trade_modification_permissions)],
+)
+def expire_offers(
+    trade: Trade = Depends(get_trade_by_id_from_path),
+    offers_repo: OffersRepository = Depends(get_repository(OffersRepository)),
+) -> OfferBulkResult:
+    by_trade = offers_repo.expire_pending_offers(trade_ids=[trade.id])
+    return OfferBulkResult(affected=sum(by_trade.values()), by_trade=by_trade)
+
+
+
+
+@router.get("/timeline/", response_model=OfferTimeline, name="offers:get-offer-timeline")
+def get_offer_timeline(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[list] = Depends(get_cursor_from_query),
+    trade: Trade = Depends(get_trade_by_id_from_path),
+    current_user: UserInDB = Depends(get_current_active_user),
+    offers_repo: OffersRepository = Depends(get_repository(OffersRepository)),
+) -> OfferTimeline:
+    try:
+        after_id = int(cursor[0]) if cursor else None
+    except (ValueError, TypeError, IndexError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+    # the trade owner sees every offer's history, anyone else only their own offer's
+    user_id = None if trade.user_id == current_user.id else current_user.id
+    events = offers_repo.list_events_for_trade(trade_id=trade.id, user_id=user_id, after_id=after_id, limit=limit + 1)
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_cursor(events[-1].id)
+
+    return OfferTimeline(events=[OfferEventPublic.from_orm(e) for e in events], next_cursor=next_cursor)
+
+
+
+
 @router.get(
     "/{username}/",
     response_model=OfferPublic,
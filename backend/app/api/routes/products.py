@@ -1,37 +1,82 @@
-from typing import List
-from fastapi import APIRouter, Body, Depends, HTTPException, Path
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Response
 from pydantic.tools import parse_obj_as
 from sqlalchemy.orm import session
 from sqlalchemy.sql.expression import delete
 from sqlalchemy.sql.sqltypes import Integer
 from starlette.status import HTTP_201_CREATED, HTTP_200_OK, HTTP_404_NOT_FOUND
 from app.api.dependencies.auth import get_current_active_user
-from app.models.product import ProductCreate, ProductPublic  
+from app.api.dependencies.concurrency import get_if_match_version, set_etag
+from app.models.product import ProductCreate, ProductPriceStats, ProductPublic, ProductInDB, SimilarProduct
 from app.db.repositories.products import ProductsRepository  
+from app.db.repositories.price_stats import PriceStatsRepository
+from app.db.repositories.similarity import SimilarityRepository
+from app.db.repositories.views import ViewsRepository
+from app.api.dependencies.views import count_view, get_viewer_key
 from app.api.dependencies.database import get_repository
 from app.models.product import ProductUpdate
 from app.models.user import UserInDB
+from app.services import trending_tracker
 
 router = APIRouter()
 
 @router.get("/", response_model=List[ProductPublic], name="products:get-all-products")
 def get_all_products(
+    ids: Optional[List[int]] = Query(None, max_items=100, title="Only return the products with these IDs."),
     product_repo: ProductsRepository = Depends(get_repository(ProductsRepository)),
 ) -> List[ProductPublic]:
-    all_products = product_repo.get_all_products()
+    if ids is not None:
+        all_products = product_repo.get_products_by_ids(ids=ids)
+    else:
+        all_products = product_repo.get_all_products()
     return [ProductPublic.from_orm(l) for l in all_products]
 
 @router.get("/{id}/", response_model=ProductPublic, name="products:get-product-by-id")
 def get_product_by_id(
     id:int,
+    response: Response,
+    viewer: str = Depends(get_viewer_key),
     product_repo: ProductsRepository = Depends(get_repository(ProductsRepository)),
+    views_repo: ViewsRepository = Depends(get_repository(ViewsRepository)),
 ) -> ProductPublic:
     product = product_repo.get_product_by_id(id=id)
 
     if not product:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="no product found with that id.")
 
-    return ProductPublic.from_orm(product)
+    trending_tracker.record(event_type="view", product_id=product.id)
+    set_etag(response, product.version)
+    product_public = ProductPublic.from_orm(product)
+    product_public.views = count_view(views_repo=views_repo, kind="product", item_id=product.id, viewer=viewer)
+    return product_public
+
+@router.get("/{id}/similar/", response_model=List[SimilarProduct], name="products:list-similar-products")
+def list_similar_products(
+    id: int = Path(..., ge=1),
+    limit: int = Query(10, ge=1, le=50),
+    product_repo: ProductsRepository = Depends(get_repository(ProductsRepository)),
+    similarity_repo: SimilarityRepository = Depends(get_repository(SimilarityRepository)),
+) -> List[SimilarProduct]:
+    if not product_repo.get_product_by_id(id=id):
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="no product found with that id.")
+
+    return [
+        SimilarProduct(**ProductInDB.from_orm(s.similar_product).dict(), score=s.score)
+        for s in similarity_repo.get_similar_products(product_id=id, limit=limit)
+    ]
+
+@router.get("/{id}/price-stats/", response_model=ProductPriceStats, name="products:get-product-price-stats")
+def get_product_price_stats(
+    id: int = Path(..., ge=1),
+    product_repo: ProductsRepository = Depends(get_repository(ProductsRepository)),
+    price_stats_repo: PriceStatsRepository = Depends(get_repository(PriceStatsRepository)),
+) -> ProductPriceStats:
+    product = product_repo.get_product_by_id(id=id)
+    if not product:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="no product found with that id.")
+
+    stats = price_stats_repo.get_price_stats(product_id=product.id, product_type=product.type)
+    return ProductPriceStats(product_id=product.id, product_type=product.type, **stats)
 
 @router.post("/", response_model=ProductPublic, name="products:create-product", status_code=HTTP_201_CREATED)
 def create_new_product(
@@ -44,14 +89,17 @@ def create_new_product(
 
 @router.put("/{id}/", response_model=ProductPublic, name="products:update-product-by-id")
 def update_product(
+    response: Response,
     id:int = Path(..., ge=1, title="The ID of the product to update."),
     current_user: UserInDB = Depends(get_current_active_user),
     product_update: ProductUpdate=Body(..., embed=True),
+    expected_version: Optional[int] = Depends(get_if_match_version),
     products_repo: ProductsRepository = Depends(get_repository(ProductsRepository)),
 ) -> ProductPublic:
-    updated_product = products_repo.update_product(id=id, product_update=product_update)
+    updated_product = products_repo.update_product(id=id, product_update=product_update, expected_version=expected_version)
     if not updated_product:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="no product found with that id.")
+    set_etag(response, updated_product.version)
 
     return ProductPublic.from_orm(updated_product)
 
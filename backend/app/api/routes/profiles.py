@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Path, Body, Depends, status
+from typing import List, Optional
+
+from fastapi import APIRouter, Path, Body, Depends, Query, Response, status
 from fastapi.exceptions import HTTPException
 
 from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.concurrency import get_if_match_version, set_etag
 from app.api.dependencies.database import get_repository
 from app.models.user import UserCreate, UserUpdate, UserInDB, UserPublic
 from app.models.profile import ProfileUpdate, ProfilePublic
@@ -11,10 +14,19 @@ from app.db.repositories.profiles import ProfilesRepository
 router = APIRouter()
 
 
+@router.get("/", response_model=List[ProfilePublic], name="profiles:get-profiles-by-usernames")
+def get_profiles_by_usernames(
+    usernames: List[str] = Query(..., max_items=100),
+    current_user: UserInDB = Depends(get_current_active_user),
+    profiles_repo: ProfilesRepository = Depends(get_repository(ProfilesRepository)),
+) -> List[ProfilePublic]:
+    profiles = profiles_repo.get_profiles_by_usernames(usernames=usernames)
+    return [ProfilePublic.from_orm(p) for p in profiles]
 
 
 @router.get("/{username}/", response_model=ProfilePublic, name="profiles:get-profile-by-username")
 def get_profile_by_username(
+    response: Response,
     username: str = Path(..., min_length=3, regex="^[a-zA-Z0-9_-]+$"),
     current_user: UserInDB = Depends(get_current_active_user),
     profiles_repo: ProfilesRepository = Depends(get_repository(ProfilesRepository)),
@@ -22,16 +34,22 @@ def get_profile_by_username(
     profile = profiles_repo.get_profile_by_username(username=username)
     if not profile:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No profile found with that username.")
+    set_etag(response, profile.version)
     return profile
 
 
 
 @router.put("/me/", response_model=ProfilePublic, name="profiles:update-own-profile")
 def update_own_profile(
+    response: Response,
     profile_update: ProfileUpdate = Body(..., embed=True),
+    expected_version: Optional[int] = Depends(get_if_match_version),
     current_user: UserInDB = Depends(get_current_active_user),
     profiles_repo: ProfilesRepository = Depends(get_repository(ProfilesRepository)),    
 ) -> ProfilePublic:
-    updated_profile = profiles_repo.update_profile(profile_update=profile_update, requesting_user=current_user)
+    updated_profile = profiles_repo.update_profile(
+        profile_update=profile_update, requesting_user=current_user, expected_version=expected_version,
+    )
+    set_etag(response, updated_profile.version)
     return updated_profile
 
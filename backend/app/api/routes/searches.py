@@ -0,0 +1,69 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, status
+
+from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.database import get_repository
+from app.api.dependencies.pagination import encode_cursor, get_cursor_from_query
+from app.db.repositories.saved_searches import SavedSearchesRepository
+from app.models.saved_search import SavedSearchCreate, SavedSearchMatchPage, SavedSearchPublic
+from app.models.trade import TradePublic
+from app.models.user import UserInDB
+
+router = APIRouter()
+
+
+@router.post(
+    "/", response_model=SavedSearchPublic, name="searches:create-saved-search", status_code=status.HTTP_201_CREATED,
+)
+def create_saved_search(
+    new_search: SavedSearchCreate = Body(..., embed=True),
+    current_user: UserInDB = Depends(get_current_active_user),
+    searches_repo: SavedSearchesRepository = Depends(get_repository(SavedSearchesRepository)),
+) -> SavedSearchPublic:
+    saved_search = searches_repo.create_saved_search(user_id=current_user.id, search_create=new_search)
+    return SavedSearchPublic.from_orm(saved_search)
+
+
+@router.get("/", response_model=List[SavedSearchPublic], name="searches:list-saved-searches")
+def list_saved_searches(
+    current_user: UserInDB = Depends(get_current_active_user),
+    searches_repo: SavedSearchesRepository = Depends(get_repository(SavedSearchesRepository)),
+) -> List[SavedSearchPublic]:
+    return [SavedSearchPublic.from_orm(s) for s in searches_repo.list_saved_searches_for_user(user_id=current_user.id)]
+
+
+@router.get("/{id}/matches/", response_model=SavedSearchMatchPage, name="searches:list-saved-search-matches")
+def list_saved_search_matches(
+    id: int = Path(..., ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[list] = Depends(get_cursor_from_query),
+    current_user: UserInDB = Depends(get_current_active_user),
+    searches_repo: SavedSearchesRepository = Depends(get_repository(SavedSearchesRepository)),
+) -> SavedSearchMatchPage:
+    if not searches_repo.get_saved_search_for_user(id=id, user_id=current_user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No saved search found with that id.")
+    try:
+        before_id = int(cursor[0]) if cursor else None
+    except (ValueError, TypeError, IndexError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+    trades = searches_repo.list_matched_trades(search_id=id, before_id=before_id, limit=limit + 1)
+    next_cursor = None
+    if len(trades) > limit:
+        trades = trades[:limit]
+        next_cursor = encode_cursor(trades[-1].id)
+
+    return SavedSearchMatchPage(trades=[TradePublic.from_orm(t) for t in trades], next_cursor=next_cursor)
+
+
+@router.delete("/{id}/", response_model=int, name="searches:delete-saved-search")
+def delete_saved_search(
+    id: int = Path(..., ge=1),
+    current_user: UserInDB = Depends(get_current_active_user),
+    searches_repo: SavedSearchesRepository = Depends(get_repository(SavedSearchesRepository)),
+) -> int:
+    saved_search = searches_repo.get_saved_search_for_user(id=id, user_id=current_user.id)
+    if not saved_search:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No saved search found with that id.")
+    return searches_repo.delete_saved_search(saved_search=saved_search)
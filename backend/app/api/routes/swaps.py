@@ -0,0 +1,49 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.database import get_repository
+from app.api.dependencies.pagination import encode_cursor, get_cursor_from_query
+from app.db.repositories.swaps import SwapsRepository
+from app.db.repositories.trades import TradeRepository
+from app.models.swap import SwapMatchPage, SwapMatchPublic
+from app.models.trade import TradePublic
+from app.models.user import UserInDB
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SwapMatchPage, name="swaps:list-swap-matches")
+def list_swap_matches(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[list] = Depends(get_cursor_from_query),
+    current_user: UserInDB = Depends(get_current_active_user),
+    swaps_repo: SwapsRepository = Depends(get_repository(SwapsRepository)),
+    trade_repo: TradeRepository = Depends(get_repository(TradeRepository)),
+) -> SwapMatchPage:
+    try:
+        before_id = int(cursor[0]) if cursor else None
+    except (ValueError, TypeError, IndexError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+    matches = swaps_repo.list_matches_for_user(user_id=current_user.id, before_id=before_id, limit=limit + 1)
+    next_cursor = None
+    if len(matches) > limit:
+        matches = matches[:limit]
+        next_cursor = encode_cursor(matches[-1].id)
+
+    # load every listing on the page in one query
+    trades = {t.id: t for t in trade_repo.get_trades_by_ids(ids=list({i for m in matches for i in m.trade_ids}))}
+    return SwapMatchPage(
+        matches=[
+            SwapMatchPublic(
+                id=m.id,
+                created_at=m.created_at,
+                length=m.length,
+                trades=[TradePublic.from_orm(trades[i]) for i in m.trade_ids],
+            )
+            for m in matches
+        ],
+        next_cursor=next_cursor,
+    )
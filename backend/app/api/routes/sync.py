@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.database import get_repository
+from app.api.dependencies.pagination import encode_cursor, get_cursor_from_query
+from app.db.repositories.sync import SyncRepository
+from app.models.offer import OfferInDB
+from app.models.product import ProductInDB
+from app.models.profile import ProfileInDB
+from app.models.sync import SyncChanges, Tombstone
+from app.models.trade import TradeInDB
+from app.models.user import UserInDB
+
+router = APIRouter()
+
+SYNC_KINDS = ("products", "trades", "sent_offers", "received_offers", "tombstones")
+
+
+def decode_sync_position(cursor: List[Any]) -> Dict:
+    try:
+        reset, changed_after, started_at, positions = cursor
+        after = {
+            "reset": bool(reset),
+            "changed_after": datetime.fromisoformat(changed_after) if changed_after else None,
+            "started_at": datetime.fromisoformat(started_at),
+        }
+        for kind in SYNC_KINDS:
+            if positions.get(kind):
+                updated_at, *key = positions[kind]
+                after[kind] = (datetime.fromisoformat(updated_at), *(int(k) for k in key))
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+    return after
+
+
+def encode_sync_position(position: Dict) -> str:
+    positions = {kind: position[kind] for kind in SYNC_KINDS if position.get(kind)}
+    return encode_cursor(position["reset"], position["changed_after"], position["started_at"], positions)
+
+
+@router.get("/", response_model=SyncChanges, name="sync:get-changes")
+def get_changes(
+    since: Optional[datetime] = Query(None),
+    limit: int = Query(500, ge=1, le=2000),
+    cursor: Optional[List[Any]] = Depends(get_cursor_from_query),
+    current_user: UserInDB = Depends(get_current_active_user),
+    sync_repo: SyncRepository = Depends(get_repository(SyncRepository)),
+) -> SyncChanges:
+    after = decode_sync_position(cursor) if cursor else None
+    changes = sync_repo.get_changes(user_id=current_user.id, since=since, after=after, limit=limit)
+    return SyncChanges(
+        watermark=changes["watermark"],
+        reset=changes["reset"],
+        products=[ProductInDB.from_orm(p) for p in changes["products"]],
+        trades=[TradeInDB.from_orm(t) for t in changes["trades"]],
+        offers=[OfferInDB.from_orm(o) for o in changes["offers"]],
+        profile=ProfileInDB.from_orm(changes["profile"]) if changes["profile"] else None,
+        tombstones=[Tombstone.from_orm(t) for t in changes["tombstones"]],
+        next_cursor=encode_sync_position(changes["next"]) if changes["next"] else None,
+    )
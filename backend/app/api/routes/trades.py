@@ -1,15 +1,26 @@
-from typing import List
-from fastapi import APIRouter, Path, Body, Depends
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Path, Body, Depends, Query, Response
 from fastapi.exceptions import HTTPException
-from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND
+from starlette.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
 from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.concurrency import get_if_match_version, set_etag
 from app.api.dependencies.database import get_repository
+from app.api.dependencies.pagination import encode_cursor, get_cursor_from_query
 from app.api.dependencies.trades import check_trade_modification_permissions, get_trade_by_id_from_path
+from app.api.dependencies.views import count_view, get_viewer_key
 from app.db.metadata import Trade
 from app.db.repositories.trades import TradeRepository
+from app.db.repositories.views import ViewsRepository
+from app.models.feed import FeedEntry, FeedPage
+from app.models.trending import TrendingFeed
 from app.models.user import UserInDB
+from app.services import trending_tracker
 
-from app.models.trade import TradeCreate, TradePublic, TradePublicByProduct, TradePublicByUser, TradeUpdate
+from app.models.product import ProductType
+from app.models.trade import (
+    Size, TradeBrowsePage, TradeCreate, TradeFacets, TradePublic, TradePublicByProduct, TradePublicByUser, TradeUpdate, WhatDo,
+)
 
 router = APIRouter()
 
@@ -22,17 +33,87 @@ def create_new_trade(
     created_trade = trade_repo.create_trade(trade_create=new_trade, user_id=current_user.id)
     return TradePublicByUser.from_orm(created_trade)    
 
+@router.get("/browse/", response_model=TradeBrowsePage, name="trades:browse-trades")
+def browse_trades(
+    what_do: Optional[List[WhatDo]] = Query(None),
+    size: Optional[List[Size]] = Query(None),
+    product_type: Optional[List[ProductType]] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[list] = Depends(get_cursor_from_query),
+    trade_repo: TradeRepository = Depends(get_repository(TradeRepository)),
+) -> TradeBrowsePage:
+    try:
+        before_id = int(cursor[0]) if cursor else None
+    except (ValueError, TypeError, IndexError):
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+    trades = trade_repo.browse_trades(
+        what_do=[w.value for w in what_do] if what_do else None,
+        sizes=[s.value for s in size] if size else None,
+        product_types=[t.value for t in product_type] if product_type else None,
+        min_price=min_price,
+        max_price=max_price,
+        before_id=before_id,
+        limit=limit + 1,
+    )
+    next_cursor = None
+    if len(trades) > limit:
+        trades = trades[:limit]
+        next_cursor = encode_cursor(trades[-1].id)
+
+    return TradeBrowsePage(
+        trades=[TradePublic.from_orm(t) for t in trades],
+        facets=TradeFacets(**trade_repo.get_facet_counts()),
+        next_cursor=next_cursor,
+    )
+
+@router.get("/feed/", response_model=FeedPage, name="trades:list-feed")
+def list_feed(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[list] = Depends(get_cursor_from_query),
+    trade_repo: TradeRepository = Depends(get_repository(TradeRepository)),
+) -> FeedPage:
+    after = None
+    if cursor:
+        try:
+            created_at, trade_id = cursor
+            after = (datetime.fromisoformat(created_at), int(trade_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+    entries = trade_repo.list_feed(after=after, limit=limit + 1)
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        last = entries[-1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.trade_id)
+
+    return FeedPage(entries=[FeedEntry.from_orm(e) for e in entries], next_cursor=next_cursor)
+
+@router.get("/trending/", response_model=TrendingFeed, name="trades:list-trending")
+def list_trending(limit: int = Query(20, ge=1, le=50)) -> TrendingFeed:
+    return trending_tracker.get_feed(limit=limit)
+
 @router.get("/{trade_id}/", response_model=TradePublic, name = "trades:get-trade-by-id")
 def get_trade_by_id(
+    response: Response,
     trade_id: int = Path(..., ge=1, title="The ID of the trade to retrieve."),
-    trade_repo: TradeRepository = Depends(get_repository(TradeRepository))
+    viewer: str = Depends(get_viewer_key),
+    trade_repo: TradeRepository = Depends(get_repository(TradeRepository)),
+    views_repo: ViewsRepository = Depends(get_repository(ViewsRepository)),
 ) -> TradePublic:
     trade = trade_repo.get_trade_by_id(id=trade_id)
 
     if not trade:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="no trade found with that id.")
 
-    return TradePublic.from_orm(trade)
+    trending_tracker.record(event_type="view", trade_id=trade.id, product_id=trade.product_id)
+    set_etag(response, trade.version)
+    trade_public = TradePublic.from_orm(trade)
+    trade_public.views = count_view(views_repo=views_repo, kind="trade", item_id=trade.id, viewer=viewer)
+    return trade_public
 
 @router.get("/users/{user_id}/", response_model=List[TradePublicByUser], name = "trades:get-trades-by-user")
 def get_trade_by_id(
@@ -60,9 +141,13 @@ def get_trade_by_id(
 
 @router.get("/", response_model=List[TradePublic], name="trades:get-all-trades")
 def get_all_trades(
+    ids: Optional[List[int]] = Query(None, max_items=100, title="Only return the trades with these IDs."),
     trade_repo: TradeRepository = Depends(get_repository(TradeRepository)),
 ) -> List[TradePublic]:
-    all_trades = trade_repo.get_all_trades()
+    if ids is not None:
+        all_trades = trade_repo.get_trades_by_ids(ids=ids)
+    else:
+        all_trades = trade_repo.get_all_trades()
     return [TradePublic.from_orm(l) for l in all_trades]
 
 @router.put(
@@ -72,11 +157,15 @@ def get_all_trades(
     dependencies=[Depends(check_trade_modification_permissions)],
     )
 def update_trade_by_id(
+    response: Response,
     trade: Trade = Depends(get_trade_by_id_from_path),
     trade_update: TradeUpdate=Body(..., embed=True),
+    expected_version: Optional[int] = Depends(get_if_match_version),
     trade_repo: TradeRepository = Depends(get_repository(TradeRepository))
 ) -> TradePublic:
-    return TradePublic.from_orm(trade_repo.update_trade(trade=trade, trade_update=trade_update))
+    updated_trade = trade_repo.update_trade(trade=trade, trade_update=trade_update, expected_version=expected_version)
+    set_etag(response, updated_trade.version)
+    return TradePublic.from_orm(updated_trade)
 
 
 @router.delete(
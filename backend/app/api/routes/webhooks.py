@@ -0,0 +1,52 @@
+from typing import List
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
+
+from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.database import get_repository
+from app.db.repositories.webhooks import WebhooksRepository
+from app.models.user import UserInDB
+from app.models.webhook import WebhookSubscriptionCreate, WebhookSubscriptionPublic
+from app.services.webhooks import UnsafeWebhookUrl, check_webhook_url
+
+router = APIRouter()
+
+
+@router.post(
+    "/",
+    response_model=WebhookSubscriptionPublic,
+    name="webhooks:create-subscription",
+    status_code=status.HTTP_201_CREATED,
+)
+def create_subscription(
+    new_subscription: WebhookSubscriptionCreate = Body(..., embed=True),
+    current_user: UserInDB = Depends(get_current_active_user),
+    webhooks_repo: WebhooksRepository = Depends(get_repository(WebhooksRepository)),
+) -> WebhookSubscriptionPublic:
+    try:
+        check_webhook_url(new_subscription.url)
+    except UnsafeWebhookUrl as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    subscription = webhooks_repo.create_subscription(user_id=current_user.id, subscription_create=new_subscription)
+    return WebhookSubscriptionPublic.from_orm(subscription)
+
+
+@router.get("/", response_model=List[WebhookSubscriptionPublic], name="webhooks:list-subscriptions")
+def list_subscriptions(
+    current_user: UserInDB = Depends(get_current_active_user),
+    webhooks_repo: WebhooksRepository = Depends(get_repository(WebhooksRepository)),
+) -> List[WebhookSubscriptionPublic]:
+    subscriptions = webhooks_repo.list_subscriptions_for_user(user_id=current_user.id)
+    return [WebhookSubscriptionPublic.from_orm(s) for s in subscriptions]
+
+
+@router.delete("/{id}/", response_model=int, name="webhooks:delete-subscription")
+def delete_subscription(
+    id: int = Path(..., ge=1),
+    current_user: UserInDB = Depends(get_current_active_user),
+    webhooks_repo: WebhooksRepository = Depends(get_repository(WebhooksRepository)),
+) -> int:
+    subscription = webhooks_repo.get_subscription_for_user(id=id, user_id=current_user.id)
+    if not subscription:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No webhook subscription found with that id.")
+    return webhooks_repo.delete_subscription(subscription=subscription)
@@ -0,0 +1,47 @@
+from typing import List
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
+
+from app.api.dependencies.auth import get_current_active_user
+from app.api.dependencies.database import get_repository
+from app.db.repositories.products import ProductsRepository
+from app.db.repositories.wishlist import WishlistRepository
+from app.models.swap import WishlistItemPublic
+from app.models.user import UserInDB
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[WishlistItemPublic], name="wishlist:list-wishlist")
+def list_wishlist(
+    current_user: UserInDB = Depends(get_current_active_user),
+    wishlist_repo: WishlistRepository = Depends(get_repository(WishlistRepository)),
+) -> List[WishlistItemPublic]:
+    return [WishlistItemPublic.from_orm(i) for i in wishlist_repo.list_items_for_user(user_id=current_user.id)]
+
+
+@router.post(
+    "/", response_model=WishlistItemPublic, name="wishlist:add-to-wishlist", status_code=status.HTTP_201_CREATED,
+)
+def add_to_wishlist(
+    product_id: int = Body(..., embed=True, ge=1),
+    current_user: UserInDB = Depends(get_current_active_user),
+    products_repo: ProductsRepository = Depends(get_repository(ProductsRepository)),
+    wishlist_repo: WishlistRepository = Depends(get_repository(WishlistRepository)),
+) -> WishlistItemPublic:
+    if not products_repo.get_product_by_id(id=product_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No product found with that id.")
+    item = wishlist_repo.add_item(user_id=current_user.id, product_id=product_id)
+    return WishlistItemPublic.from_orm(item)
+
+
+@router.delete("/{product_id}/", response_model=int, name="wishlist:remove-from-wishlist")
+def remove_from_wishlist(
+    product_id: int = Path(..., ge=1),
+    current_user: UserInDB = Depends(get_current_active_user),
+    wishlist_repo: WishlistRepository = Depends(get_repository(WishlistRepository)),
+) -> int:
+    item = wishlist_repo.get_item(user_id=current_user.id, product_id=product_id)
+    if not item:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="That product is not on your wishlist.")
+    return wishlist_repo.remove_item(item=item)
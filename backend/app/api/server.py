@@ -12,6 +12,7 @@ from app.core.config import DATABASE_URL
 
 
 from app.core import config  
+from app.core import tasks
 from app.api.routes import router as api_router
 
 def get_application():
@@ -25,6 +26,9 @@ def get_application():
         allow_headers=["*"],
     )
 
+    app.add_event_handler("startup", tasks.create_start_app_handler(app))
+    app.add_event_handler("shutdown", tasks.create_stop_app_handler(app))
+
     app.include_router(api_router, prefix="/api")
     return app
 
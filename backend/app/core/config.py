@@ -22,4 +22,42 @@ ACCESS_TOKEN_EXPIRE_MINUTES = config(
 )
 JWT_ALGORITHM = config("JWT_ALGORITHM", cast=str, default="HS256")
 JWT_AUDIENCE = config("JWT_AUDIENCE", cast=str, default="hairtrade:auth")
-JWT_TOKEN_PREFIX = config("JWT_TOKEN_PREFIX", cast=str, default="Bearer")
\ No newline at end of file
+JWT_TOKEN_PREFIX = config("JWT_TOKEN_PREFIX", cast=str, default="Bearer")
+
+# run the outbox worker inside each API process; turn off when running app.jobs.outbox_worker separately
+OUTBOX_WORKER_ENABLED = config("OUTBOX_WORKER_ENABLED", cast=bool, default=True)
+
+# webhooks may only be sent to https URLs on public addresses; set to true to also allow plain http in development
+WEBHOOK_ALLOW_HTTP = config("WEBHOOK_ALLOW_HTTP", cast=bool, default=False)
+
+# trending scores halve after this many hours without new activity
+TRENDING_HALF_LIFE_HOURS = config("TRENDING_HALF_LIFE_HOURS", cast=float, default=6)
+
+# authors with more followers than this are not fanned out to follower feeds; their trades are merged in on read
+FEED_FANOUT_MAX_FOLLOWERS = config("FEED_FANOUT_MAX_FOLLOWERS", cast=int, default=5000)
+
+# delta sync re-sends rows updated this long before the client's watermark, to cover transactions
+# that committed after a sync but were stamped before it
+SYNC_WATERMARK_OVERLAP_SECONDS = config("SYNC_WATERMARK_OVERLAP_SECONDS", cast=int, default=30)
+# tombstones older than this are pruned; clients whose watermark is older get a full resync
+SYNC_TOMBSTONE_RETENTION_DAYS = config("SYNC_TOMBSTONE_RETENTION_DAYS", cast=int, default=30)
+
+# change_log entries older than this are compacted down to the latest entry per row
+CHANGE_LOG_COMPACT_AFTER_DAYS = config("CHANGE_LOG_COMPACT_AFTER_DAYS", cast=int, default=7)
+# and delete entries are dropped altogether once they are this old
+CHANGE_LOG_RETENTION_DAYS = config("CHANGE_LOG_RETENTION_DAYS", cast=int, default=30)
+
+# offers still pending this long after their last change are expired by app.jobs.expire_stale
+OFFER_PENDING_TTL_DAYS = config("OFFER_PENDING_TTL_DAYS", cast=int, default=14)
+# trades older than this with nothing pending or accepted are archived; 0 turns archiving off
+TRADE_ARCHIVE_AFTER_DAYS = config("TRADE_ARCHIVE_AFTER_DAYS", cast=int, default=0)
+EXPIRY_BATCH_SIZE = config("EXPIRY_BATCH_SIZE", cast=int, default=200)
+# pause between batches so the job leaves room for user traffic
+EXPIRY_BATCH_PAUSE_SECONDS = config("EXPIRY_BATCH_PAUSE_SECONDS", cast=float, default=0.2)
+
+# batched backfills (app.services.backfill): how many primary key values each batch covers, the pause
+# between batches, and when to hold off until the database has caught up
+BACKFILL_BATCH_SIZE = config("BACKFILL_BATCH_SIZE", cast=int, default=5000)
+BACKFILL_PAUSE_SECONDS = config("BACKFILL_PAUSE_SECONDS", cast=float, default=0.1)
+BACKFILL_MAX_REPLICATION_LAG_SECONDS = config("BACKFILL_MAX_REPLICATION_LAG_SECONDS", cast=float, default=10)
+BACKFILL_MAX_ACTIVE_QUERIES = config("BACKFILL_MAX_ACTIVE_QUERIES", cast=int, default=50)
@@ -0,0 +1,31 @@
+from typing import Callable
+
+from fastapi import FastAPI
+
+from app import settings
+from app.core.config import OUTBOX_WORKER_ENABLED
+from app.services import offer_event_hub, outbox_worker, trending_tracker, view_counter, webhook_dispatcher
+from app.services import outbox_handlers  # noqa: F401 registers the outbox topic handlers
+
+
+def create_start_app_handler(app: FastAPI) -> Callable:
+    async def start_app() -> None:
+        await offer_event_hub.start(dsn=settings.db_url)
+        await trending_tracker.start()
+        await view_counter.start()
+        if OUTBOX_WORKER_ENABLED:
+            await webhook_dispatcher.start()
+            await outbox_worker.start()
+
+    return start_app
+
+
+def create_stop_app_handler(app: FastAPI) -> Callable:
+    async def stop_app() -> None:
+        await outbox_worker.stop()
+        await webhook_dispatcher.stop()
+        await view_counter.stop()
+        await trending_tracker.stop()
+        await offer_event_hub.stop()
+
+    return stop_app
@@ -1,8 +1,17 @@
 from sqlalchemy import *
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
 from .database import Base
+from app.models.product import ProductType
+from app.models.trade import Size, WhatDo
+
+# native Postgres enums: 4 bytes a value instead of the text, and compared as integers. Loaded back as
+# plain strings; values are appended with ALTER TYPE ... ADD VALUE in a migration.
+product_type_enum = Enum(*[t.value for t in ProductType], name="product_type")
+what_do_enum = Enum(*[w.value for w in WhatDo], name="trade_what_do")
+size_enum = Enum(*[s.value for s in Size], name="trade_size")
 
 class BaseColumn(object):
     @declared_attr
@@ -31,10 +40,18 @@ class Product(BaseColumn, Base):
     product_name = Column(Text, nullable=False,index=True)
     brand = Column(Text, nullable=True)
     description = Column(Text, nullable=True)
-    type = Column(Text, nullable=False, server_default="idk, a bottle")
+    type = Column(product_type_enum, nullable=False, server_default="idk, a bottle")
+    active_trade_count = Column(Integer, nullable=False, server_default="0")
+    # bumped by every ORM update and checked in its WHERE clause; served as the ETag
+    version = Column(Integer, nullable=False, server_default="1")
     users = relationship("Trade", back_populates="product",
         cascade="all, delete",
         passive_deletes=True,)
+    __table_args__ = (
+        Index('ix_product_type', 'type'),
+        Index('ix_product_updated_at', 'updated_at'),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
 class User(BaseColumn, Base):
     username = Column(Text, unique=True, nullable=False, index=True)      
@@ -44,6 +61,7 @@ class User(BaseColumn, Base):
     password = Column(Text, nullable=False)
     is_active = Column(Boolean(), nullable=False, server_default="True")
     is_superuser = Column(Boolean(), nullable=False, server_default="False") 
+    follower_count = Column(Integer, nullable=False, server_default="0")
     profile = relationship(
         "Profile", back_populates="user",
         uselist=False,
@@ -61,28 +79,368 @@ class User(BaseColumn, Base):
 
 class Trade(BaseColumn, Base):
     __tablename__='trade'
-    id = Column(Integer, primary_key=True, index=True, unique=True, autoincrement=True)
-    user_id=Column(ForeignKey('user.id'), primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id=Column(ForeignKey('user.id'), nullable=False)
     user = relationship("User", back_populates="products")
-    product_id = Column(ForeignKey('product.id'), primary_key=True)
+    product_id = Column(ForeignKey('product.id'), nullable=False)
     product = relationship("Product", back_populates="users")
-    what_do = Column(Text, nullable=False, server_default="trade") 
+    what_do = Column(what_do_enum, nullable=False, server_default="trade") 
     price = Column(Numeric(10,2), nullable=True) 
     comment = Column(Text,nullable=True)
-    size = Column(Text,nullable=True)
+    size = Column(size_enum,nullable=True)
+    offer_count = Column(Integer, nullable=False, server_default="0")
+    pending_offer_count = Column(Integer, nullable=False, server_default="0")
+    version = Column(Integer, nullable=False, server_default="1")
     user_offers = relationship("Offer", back_populates="trade",
         cascade="all, delete",
         passive_deletes=True,
     )
+    __table_args__ = (
+        Index('ix_trade_user_id', 'user_id'),
+        Index('ix_trade_user_id_created_at', 'user_id', 'created_at', 'id'),
+        Index('ix_trade_updated_at', 'updated_at'),
+        Index('ix_trade_created_at', 'created_at'),
+        Index('ix_trade_what_do_size_id', 'what_do', 'size', 'id'),
+        Index('ix_trade_what_do_price', 'what_do', 'price'),
+        # the swap matcher only ever walks listings that are up for trade
+        Index('ix_trade_swappable', 'user_id', 'product_id', 'id', postgresql_where=text("what_do = 'trade'")),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
 class Offer(TimestampColumn, Base):
+    """
+    Partitioned by status: offer_live holds pending and accepted offers, offer_closed (the default
+    partition) the rest. A partitioned table's primary key has to include the partition key, so status
+    is part of it; one offer per user per trade is kept by a unique index on each partition and by
+    OffersRepository.create_offer_for_trade across them. The mapper still identifies offers by
+    (user_id, trade_id).
+    """
     user_id=Column(ForeignKey('user.id', ondelete="CASCADE"), primary_key=True)
     trade_id = Column(ForeignKey('trade.id', ondelete="CASCADE"), primary_key=True)
-    status = Column(Text, nullable=False,server_default="pending", index=True)
+    status = Column(Text, nullable=False,server_default="pending", primary_key=True)
     user = relationship("User", back_populates="trades")
     trade = relationship("Trade", back_populates="user_offers")
+    # keyset pagination for the "my offers" / "offers on my trades" inboxes
+    __table_args__ = (
+        Index('ix_offer_user_id_created_at', 'user_id', 'created_at', 'trade_id'),
+        Index('ix_offer_trade_id_created_at', 'trade_id', 'created_at', 'user_id'),
+        # delta sync
+        Index('ix_offer_user_id_updated_at', 'user_id', 'updated_at'),
+        Index('ix_offer_trade_id_updated_at', 'trade_id', 'updated_at'),
+        # finding offers pending past their TTL without walking every pending offer
+        Index('ix_offer_pending_updated_at', 'updated_at', postgresql_where=text("status = 'pending'")),
+        {'postgresql_partition_by': 'LIST (status)'},
+    )
+    __mapper_args__ = {"primary_key": [user_id, trade_id]}
+
+
+class OfferEvent(Base):
+    """
+    Append-only history of offer status changes, one row per offer per transition. Never updated;
+    the offer table holds the current status and can be checked against the latest event.
+    """
+    __tablename__ = 'offer_event'
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    trade_id = Column(Integer, ForeignKey("trade.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    status = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    __table_args__ = (
+        Index('ix_offer_event_trade_id_id', 'trade_id', 'id'),
+    )
+
+
+class TradeArchive(Base):
+    """
+    Trades removed by app.jobs.expire_stale, kept as JSON snapshots of the trade row, its offers and
+    its offer history
+    """
+    __tablename__ = 'trade_archive'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    product_id = Column(Integer, nullable=False)
+    trade = Column(JSONB, nullable=False)
+    offers = Column(JSONB, nullable=False, server_default=text("'[]'"))
+    offer_events = Column(JSONB, nullable=False, server_default=text("'[]'"))
+    archived_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+
+class FeedEntry(Base):
+    """
+    Read model for the marketplace feed: one row per trade with exactly what the feed shows,
+    kept in step with trade and product writes by app.db.repositories.feed.FeedRepository
+    """
+    __tablename__ = 'feed_entry'
+    trade_id = Column(Integer, ForeignKey("trade.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    what_do = Column(Text, nullable=False)
+    size = Column(Text, nullable=True)
+    price = Column(Numeric(10,2), nullable=True)
+    product_id = Column(Integer, nullable=False)
+    product_name = Column(Text, nullable=False)
+    brand = Column(Text, nullable=True)
+    product_type = Column(Text, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    username = Column(Text, nullable=False)
+    __table_args__ = (
+        # covers the whole feed query so pages are served from the index alone
+        Index(
+            'ix_feed_entry_created_at_trade_id', text('created_at DESC'), text('trade_id DESC'),
+            postgresql_include=['what_do', 'size', 'price', 'product_id', 'product_name', 'brand', 'product_type', 'user_id', 'username'],
+        ),
+    )
+
+class Follow(Base):
+    __tablename__ = 'follow'
+    follower_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    followee_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    followee = relationship("User", foreign_keys=[followee_id])
+    __table_args__ = (
+        Index('ix_follow_followee_id', 'followee_id', 'follower_id'),
+    )
+
+class FeedInboxItem(Base):
+    """
+    A followed user's trade pushed into a follower's personal feed. Only authors with at most
+    FEED_FANOUT_MAX_FOLLOWERS followers are fanned out; bigger accounts are merged in on read.
+    """
+    __tablename__ = 'feed_inbox'
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    trade_id = Column(Integer, ForeignKey("trade.id", ondelete="CASCADE"), primary_key=True)
+    author_id = Column(Integer, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    __table_args__ = (
+        Index('ix_feed_inbox_user_id_created_at', 'user_id', text('created_at DESC'), text('trade_id DESC')),
+        Index('ix_feed_inbox_trade_id', 'trade_id'),
+    )
+
+class Tombstone(Base):
+    """
+    A record that a product, trade or offer was deleted, so delta sync can tell clients to drop it.
+    item_id is the trade id for offers, with user_id the offerer. visible_to lists the users allowed
+    to see the deletion, or is NULL when everyone is.
+    """
+    __tablename__ = 'tombstone'
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    kind = Column(Text, nullable=False)
+    item_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    visible_to = Column(ARRAY(Integer), nullable=True)
+    deleted_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    __table_args__ = (
+        Index('ix_tombstone_deleted_at', 'deleted_at'),
+    )
+
+class ChangeLogEntry(Base):
+    """
+    Append-only change stream for product, trade and offer, written by row triggers in the same
+    transaction as the change. Ordered by (txid, id); see app.db.repositories.changes.
+    data is the row after the change, NULL for deletes.
+    """
+    __tablename__ = 'change_log'
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    txid = Column(BigInteger, server_default=text("txid_current()"), nullable=False)
+    entity = Column(Text, nullable=False)
+    op = Column(Text, nullable=False)
+    entity_key = Column(JSONB, nullable=False)
+    data = Column(JSONB, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    __table_args__ = (
+        Index('ix_change_log_txid_id', 'txid', 'id'),
+        Index('ix_change_log_entity_key', 'entity', 'entity_key', 'id'),
+    )
+
+class TradeFacetCount(Base):
+    """
+    Number of trades per browse facet value, kept up to date by the trade and product repositories
+    """
+    __tablename__ = 'trade_facet_count'
+    facet = Column(Text, primary_key=True)
+    value = Column(Text, primary_key=True)
+    count = Column(Integer, nullable=False, server_default="0")
 
+class PriceRollupBucket(Base):
+    """
+    Trade price sketches per product and per product type (see app.services.sketches.LogBucketSketch),
+    one counter row per bucket, kept up to date by the trade and product repositories
+    """
+    __tablename__ = 'price_rollup_bucket'
+    scope = Column(Text, primary_key=True)
+    key = Column(Text, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, server_default="0")
+
+class TrendingScore(Base):
+    """
+    Checkpoint of the in-memory trending counters (app.services.trending), decayed to updated_at
+    """
+    __tablename__ = 'trending_score'
+    kind = Column(Text, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    score = Column(Float, nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+class ViewCount(Base):
+    """
+    Views per trade or product, flushed in batches by app.services.views.ViewCounter. unique_viewers
+    holds HyperLogLog registers (app.services.sketches.HyperLogLog).
+    """
+    __tablename__ = 'view_count'
+    kind = Column(Text, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    views = Column(BigInteger, nullable=False, server_default="0")
+    unique_viewers = Column(LargeBinary, nullable=True)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.current_timestamp())
+
+class OutboxMessage(Base):
+    """
+    Side effects to run after a write commits. Rows are added in the same transaction as the
+    domain change and drained by app.services.outbox.OutboxWorker.
+    """
+    __tablename__ = 'outbox'
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    topic = Column(Text, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    available_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    locked_until = Column(TIMESTAMP(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    last_error = Column(Text, nullable=True)
+    # the handlers that have already succeeded, so a retry only runs the ones that failed
+    handled = Column(ARRAY(Text), nullable=False, server_default="{}")
+    processed_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    failed_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    __table_args__ = (
+        Index('ix_outbox_pending', 'available_at', 'id', postgresql_where=text('processed_at IS NULL AND failed_at IS NULL')),
+    )
+
+class WebhookSubscription(BaseColumn, Base):
+    __tablename__ = 'webhook_subscription'
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    url = Column(Text, nullable=False)
+    secret = Column(Text, nullable=False)
+    # event types to deliver, e.g. "offer.accepted"; empty means all of them
+    events = Column(ARRAY(Text), nullable=False, server_default="{}")
+    is_active = Column(Boolean(), nullable=False, server_default="True")
+    # leased by the WebhookDispatcher delivering to it, so only one worker sends to an endpoint at a time
+    locked_until = Column(TIMESTAMP(timezone=True), nullable=True)
+    __table_args__ = (
+        Index('ix_webhook_subscription_user_id', 'user_id'),
+    )
+
+class WebhookDelivery(Base):
+    """
+    Webhook events waiting to be sent, one row per event per subscription. Written by the outbox
+    handlers and deleted by WebhookDispatcher once the event is delivered or dead-lettered.
+    """
+    __tablename__ = 'webhook_delivery'
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    subscription_id = Column(Integer, ForeignKey("webhook_subscription.id", ondelete="CASCADE"), nullable=False)
+    event = Column(JSONB, nullable=False)
+    __table_args__ = (
+        Index('ix_webhook_delivery_subscription_id_id', 'subscription_id', 'id'),
+    )
+
+class WebhookDeadLetter(Base):
+    """
+    Webhook batches that could not be delivered after every retry
+    """
+    __tablename__ = 'webhook_dead_letter'
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    subscription_id = Column(Integer, ForeignKey("webhook_subscription.id", ondelete="CASCADE"), nullable=False)
+    events = Column(JSONB, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+class WishlistItem(Base):
+    __tablename__ = 'wishlist_item'
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("product.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    product = relationship("Product")
+    __table_args__ = (
+        Index('ix_wishlist_item_product_id', 'product_id', 'user_id'),
+    )
+
+class SwapMatch(Base):
+    """
+    A precomputed swap cycle. trade_ids is rotated so the smallest id comes first, and the owner of
+    each trade gives it to the owner of the next one (the last goes to the first).
+    """
+    __tablename__ = 'swap_match'
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    length = Column(Integer, nullable=False)
+    cycle_key = Column(Text, nullable=False, unique=True)
+    trade_ids = Column(ARRAY(Integer), nullable=False)
+    members = relationship("SwapMatchMember", order_by="SwapMatchMember.position",
+        cascade="all, delete",
+        passive_deletes=True,
+    )
+
+class SwapMatchMember(Base):
+    """
+    One participant of a swap match, indexed so matches can be found and invalidated by user or trade
+    """
+    __tablename__ = 'swap_match_member'
+    match_id = Column(BigInteger, ForeignKey("swap_match.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    trade_id = Column(Integer, ForeignKey("trade.id", ondelete="CASCADE"), nullable=False)
+    receives_product_id = Column(Integer, nullable=False)
+    __table_args__ = (
+        Index('ix_swap_match_member_user_id', 'user_id', 'match_id'),
+        Index('ix_swap_match_member_trade_id', 'trade_id'),
+    )
+
+class SavedSearch(BaseColumn, Base):
+    """
+    A trade search a user wants to hear about. Each search is filed under a single anchor term, the
+    most selective attribute it sets (see app.db.repositories.saved_searches.search_anchor), so a new
+    trade only has to look at the searches filed under its own handful of terms.
+    """
+    __tablename__ = 'saved_search'
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, ForeignKey("product.id", ondelete="CASCADE"), nullable=True)
+    product_type = Column(Text, nullable=True)
+    size = Column(Text, nullable=True)
+    max_price = Column(Numeric(10,2), nullable=True)
+    anchor = Column(Text, nullable=False)
+    __table_args__ = (
+        Index('ix_saved_search_anchor', 'anchor'),
+        Index('ix_saved_search_user_id', 'user_id'),
+    )
+
+class SavedSearchMatch(Base):
+    __tablename__ = 'saved_search_match'
+    search_id = Column(Integer, ForeignKey("saved_search.id", ondelete="CASCADE"), primary_key=True)
+    trade_id = Column(Integer, ForeignKey("trade.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+
+class ProductSimilarity(Base):
+    """
+    Top-k most similar products per product, written by app.jobs.refresh_similar_products
+    """
+    __tablename__ = 'product_similarity'
+    product_id = Column(Integer, ForeignKey("product.id", ondelete="CASCADE"), primary_key=True)
+    similar_product_id = Column(Integer, ForeignKey("product.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, nullable=False)
+    similar_product = relationship("Product", foreign_keys=[similar_product_id])
+    __table_args__ = (
+        Index('ix_product_similarity_product_id_score', 'product_id', text('score DESC')),
+    )
 
+class JobCheckpoint(Base):
+    """
+    Where a background job got to, so the next run can pick up from there
+    """
+    __tablename__ = 'job_checkpoint'
+    name = Column(Text, primary_key=True)
+    state = Column(JSONB, nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.current_timestamp())
 
 #TODO add hair specific stuff like curl type, porosity etc. 
 class Profile(BaseColumn, Base):
@@ -92,6 +450,8 @@ class Profile(BaseColumn, Base):
     bio =  Column(Text, nullable=True, server_default=" ")
     image =  Column(Text, nullable=True)
     user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"))
+    version = Column(Integer, nullable=False, server_default="1")
     user = relationship("User", back_populates="profile")
     username = association_proxy("user", "username")
     email = association_proxy("user", "email")
+    __mapper_args__ = {"version_id_col": version}
@@ -0,0 +1,28 @@
+"""add offer inbox indexes
+
+Revision ID: 0b35c0814713
+Revises: bedfcb3b354d
+Create Date: 2026-10-19 09:12:41.204517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '0b35c0814713'
+down_revision = 'bedfcb3b354d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_offer_user_id_created_at', 'offer', ['user_id', 'created_at', 'trade_id'], unique=False)
+    op.create_index('ix_offer_trade_id_created_at', 'offer', ['trade_id', 'created_at', 'user_id'], unique=False)
+    op.create_index('ix_trade_user_id', 'trade', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trade_user_id', table_name='trade')
+    op.drop_index('ix_offer_trade_id_created_at', table_name='offer')
+    op.drop_index('ix_offer_user_id_created_at', table_name='offer')
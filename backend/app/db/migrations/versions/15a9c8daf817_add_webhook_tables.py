@@ -0,0 +1,51 @@
+"""add webhook tables
+
+Revision ID: 15a9c8daf817
+Revises: a495fe26f579
+Create Date: 2026-10-19 13:55:31.402286
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic
+revision = '15a9c8daf817'
+down_revision = 'a495fe26f579'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('webhook_subscription',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.Text(), nullable=False),
+    sa.Column('secret', sa.Text(), nullable=False),
+    sa.Column('events', postgresql.ARRAY(sa.Text()), server_default='{}', nullable=False),
+    sa.Column('is_active', sa.Boolean(), server_default='True', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_webhook_subscription_id'), 'webhook_subscription', ['id'], unique=False)
+    op.create_index('ix_webhook_subscription_user_id', 'webhook_subscription', ['user_id'], unique=False)
+    op.create_table('webhook_dead_letter',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('subscription_id', sa.Integer(), nullable=False),
+    sa.Column('events', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['subscription_id'], ['webhook_subscription.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('webhook_dead_letter')
+    op.drop_index('ix_webhook_subscription_user_id', table_name='webhook_subscription')
+    op.drop_index(op.f('ix_webhook_subscription_id'), table_name='webhook_subscription')
+    op.drop_table('webhook_subscription')
@@ -0,0 +1,88 @@
+"""add change log
+
+Revision ID: 2f7c5a0e8b91
+Revises: 9d4b7e2a15c8
+Create Date: 2026-10-19 20:26:41.502873
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic
+revision = '2f7c5a0e8b91'
+down_revision = '9d4b7e2a15c8'
+branch_labels = None
+depends_on = None
+
+# table -> the columns that identify one of its rows
+TRACKED_TABLES = {
+    'product': ['id'],
+    'trade': ['id'],
+    'offer': ['trade_id', 'user_id'],
+}
+
+# TG_ARGV holds the key columns
+CHANGE_LOG_FUNCTION_SQL = """
+    CREATE FUNCTION record_change() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        row_data jsonb;
+    BEGIN
+        row_data := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+        INSERT INTO change_log (entity, op, entity_key, data)
+        SELECT TG_TABLE_NAME, lower(TG_OP),
+               (SELECT jsonb_object_agg(k, row_data -> k) FROM unnest(TG_ARGV) AS k),
+               CASE WHEN TG_OP = 'DELETE' THEN NULL ELSE row_data END;
+        RETURN NULL;
+    END
+    $$
+"""
+
+
+def key_sql(table: str) -> str:
+    return "jsonb_build_object(" + ", ".join(f"'{c}', {table}.{c}" for c in TRACKED_TABLES[table]) + ")"
+
+
+def upgrade() -> None:
+    op.create_table('change_log',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('txid', sa.BigInteger(), server_default=sa.text('txid_current()'), nullable=False),
+    sa.Column('entity', sa.Text(), nullable=False),
+    sa.Column('op', sa.Text(), nullable=False),
+    sa.Column('entity_key', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # start the stream with the current rows so a new consumer can build its copy from the log alone
+    for table in TRACKED_TABLES:
+        op.execute(f"""
+            INSERT INTO change_log (entity, op, entity_key, data)
+            SELECT '{table}', 'insert', {key_sql(table)}, to_jsonb({table}) FROM {table}
+        """)
+    op.create_index('ix_change_log_txid_id', 'change_log', ['txid', 'id'], unique=False)
+    op.create_index('ix_change_log_entity_key', 'change_log', ['entity', 'entity_key', 'id'], unique=False)
+
+    op.execute(CHANGE_LOG_FUNCTION_SQL)
+    for table, key_columns in TRACKED_TABLES.items():
+        args = ", ".join(f"'{c}'" for c in key_columns)
+        op.execute(f"""
+            CREATE TRIGGER {table}_change_log AFTER INSERT OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION record_change({args})
+        """)
+        # skip no-op updates so the stream only carries real changes
+        op.execute(f"""
+            CREATE TRIGGER {table}_change_log_update AFTER UPDATE ON {table}
+            FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION record_change({args})
+        """)
+
+
+def downgrade() -> None:
+    for table in TRACKED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_change_log_update ON {table}")
+        op.execute(f"DROP TRIGGER {table}_change_log ON {table}")
+    op.execute("DROP FUNCTION record_change()")
+    op.drop_index('ix_change_log_entity_key', table_name='change_log')
+    op.drop_index('ix_change_log_txid_id', table_name='change_log')
+    op.drop_table('change_log')
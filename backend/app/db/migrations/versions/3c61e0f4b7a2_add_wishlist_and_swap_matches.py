@@ -0,0 +1,65 @@
+"""add wishlist and swap matches
+
+Revision ID: 3c61e0f4b7a2
+Revises: 15a9c8daf817
+Create Date: 2026-10-19 14:40:12.518093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic
+revision = '3c61e0f4b7a2'
+down_revision = '15a9c8daf817'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('wishlist_item',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'product_id')
+    )
+    op.create_index('ix_wishlist_item_product_id', 'wishlist_item', ['product_id', 'user_id'], unique=False)
+    op.create_table('swap_match',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('length', sa.Integer(), nullable=False),
+    sa.Column('cycle_key', sa.Text(), nullable=False),
+    sa.Column('trade_ids', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cycle_key')
+    )
+    op.create_table('swap_match_member',
+    sa.Column('match_id', sa.BigInteger(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('trade_id', sa.Integer(), nullable=False),
+    sa.Column('receives_product_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['match_id'], ['swap_match.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['trade_id'], ['trade.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('match_id', 'position')
+    )
+    op.create_index('ix_swap_match_member_user_id', 'swap_match_member', ['user_id', 'match_id'], unique=False)
+    op.create_index('ix_swap_match_member_trade_id', 'swap_match_member', ['trade_id'], unique=False)
+    op.create_index(
+        'ix_trade_swappable', 'trade', ['user_id', 'product_id', 'id'], unique=False,
+        postgresql_where=sa.text("what_do = 'trade'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trade_swappable', table_name='trade')
+    op.drop_index('ix_swap_match_member_trade_id', table_name='swap_match_member')
+    op.drop_index('ix_swap_match_member_user_id', table_name='swap_match_member')
+    op.drop_table('swap_match_member')
+    op.drop_table('swap_match')
+    op.drop_index('ix_wishlist_item_product_id', table_name='wishlist_item')
+    op.drop_table('wishlist_item')
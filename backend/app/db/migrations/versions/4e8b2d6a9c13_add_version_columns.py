@@ -0,0 +1,29 @@
+"""add version columns
+
+Revision ID: 4e8b2d6a9c13
+Revises: 7a3f1c9e5d20
+Create Date: 2026-10-19 23:05:41.207315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '4e8b2d6a9c13'
+down_revision = '7a3f1c9e5d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # a constant default is stored in the catalog, so this doesn't rewrite the tables
+    op.add_column('product', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('trade', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('profile', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('profile', 'version')
+    op.drop_column('trade', 'version')
+    op.drop_column('product', 'version')
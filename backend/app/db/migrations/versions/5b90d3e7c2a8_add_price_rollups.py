@@ -0,0 +1,46 @@
+"""add price rollups
+
+Revision ID: 5b90d3e7c2a8
+Revises: c47f19e2a0d5
+Create Date: 2026-10-19 16:48:30.615502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '5b90d3e7c2a8'
+down_revision = 'c47f19e2a0d5'
+branch_labels = None
+depends_on = None
+
+# must match app.services.sketches.LogBucketSketch with its default relative_accuracy of 0.01
+LOG_GAMMA = 'ln(1.01 / 0.99)'
+ZERO_BUCKET = -(2 ** 31)
+
+
+def upgrade() -> None:
+    op.create_table('price_rollup_bucket',
+    sa.Column('scope', sa.Text(), nullable=False),
+    sa.Column('key', sa.Text(), nullable=False),
+    sa.Column('bucket', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'key', 'bucket')
+    )
+    # seed from the trades that already have a price
+    op.execute(f"""
+        INSERT INTO price_rollup_bucket (scope, key, bucket, count)
+        SELECT scope, key, bucket, count(*) FROM (
+            SELECT unnest(ARRAY['product', 'type']) AS scope,
+                   unnest(ARRAY[trade.product_id::text, product.type]) AS key,
+                   CASE WHEN trade.price > 0 THEN ceil(ln(trade.price) / {LOG_GAMMA})::int ELSE {ZERO_BUCKET} END AS bucket
+            FROM trade JOIN product ON product.id = trade.product_id
+            WHERE trade.price IS NOT NULL
+        ) AS b
+        GROUP BY scope, key, bucket
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('price_rollup_bucket')
@@ -0,0 +1,41 @@
+"""add trade and product counters
+
+Revision ID: 64802cc64dd8
+Revises: d87732903ced
+Create Date: 2026-10-19 11:24:53.730912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '64802cc64dd8'
+down_revision = 'd87732903ced'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('trade', sa.Column('offer_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('trade', sa.Column('pending_offer_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('product', sa.Column('active_trade_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE trade SET offer_count = c.offer_count, pending_offer_count = c.pending_offer_count
+        FROM (
+            SELECT trade_id, count(*) AS offer_count, count(*) FILTER (WHERE status = 'pending') AS pending_offer_count
+            FROM offer GROUP BY trade_id
+        ) AS c
+        WHERE trade.id = c.trade_id
+    """)
+    op.execute("""
+        UPDATE product SET active_trade_count = c.trade_count
+        FROM (SELECT product_id, count(*) AS trade_count FROM trade GROUP BY product_id) AS c
+        WHERE product.id = c.product_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('product', 'active_trade_count')
+    op.drop_column('trade', 'pending_offer_count')
+    op.drop_column('trade', 'offer_count')
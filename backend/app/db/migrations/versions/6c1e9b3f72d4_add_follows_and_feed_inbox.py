@@ -0,0 +1,54 @@
+"""add follows and feed inbox
+
+Revision ID: 6c1e9b3f72d4
+Revises: f3a8d2c61e07
+Create Date: 2026-10-19 19:12:48.305917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '6c1e9b3f72d4'
+down_revision = 'f3a8d2c61e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('follower_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_trade_user_id_created_at', 'trade', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_table('follow',
+    sa.Column('follower_id', sa.Integer(), nullable=False),
+    sa.Column('followee_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['followee_id'], ['user.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['follower_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('follower_id', 'followee_id')
+    )
+    op.create_index('ix_follow_followee_id', 'follow', ['followee_id', 'follower_id'], unique=False)
+    op.create_table('feed_inbox',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('trade_id', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['trade_id'], ['trade.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'trade_id')
+    )
+    op.create_index(
+        'ix_feed_inbox_user_id_created_at', 'feed_inbox', ['user_id', sa.text('created_at DESC'), sa.text('trade_id DESC')],
+        unique=False,
+    )
+    op.create_index('ix_feed_inbox_trade_id', 'feed_inbox', ['trade_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feed_inbox_trade_id', table_name='feed_inbox')
+    op.drop_index('ix_feed_inbox_user_id_created_at', table_name='feed_inbox')
+    op.drop_table('feed_inbox')
+    op.drop_index('ix_follow_followee_id', table_name='follow')
+    op.drop_table('follow')
+    op.drop_index('ix_trade_user_id_created_at', table_name='trade')
+    op.drop_column('user', 'follower_count')
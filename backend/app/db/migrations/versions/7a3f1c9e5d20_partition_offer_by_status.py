@@ -0,0 +1,178 @@
+"""partition offer by status
+
+Revision ID: 7a3f1c9e5d20
+Revises: d61a0f7b3e59
+Create Date: 2026-10-19 22:30:12.884106
+
+Moves offer onto a table partitioned by LIST (status): offer_live holds pending and accepted offers,
+offer_closed (the default partition) everything else. The copy is done online: writes to the old
+table are mirrored into the new one by a trigger while existing rows are copied over in small
+committed batches, and only the final rename takes an exclusive lock.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '7a3f1c9e5d20'
+down_revision = 'd61a0f7b3e59'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# name -> (columns, where)
+OFFER_INDEXES = {
+    'ix_offer_user_id_created_at': ('user_id, created_at, trade_id', None),
+    'ix_offer_trade_id_created_at': ('trade_id, created_at, user_id', None),
+    'ix_offer_user_id_updated_at': ('user_id, updated_at', None),
+    'ix_offer_trade_id_updated_at': ('trade_id, updated_at', None),
+    'ix_offer_pending_updated_at': ('updated_at', "status = 'pending'"),
+}
+
+MIRROR_FUNCTION_SQL = """
+    CREATE FUNCTION mirror_offer() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            DELETE FROM offer_partitioned WHERE trade_id = OLD.trade_id AND user_id = OLD.user_id;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            INSERT INTO offer_partitioned (user_id, trade_id, status, created_at, updated_at)
+            VALUES (NEW.user_id, NEW.trade_id, NEW.status, NEW.created_at, NEW.updated_at);
+        END IF;
+        RETURN NULL;
+    END
+    $$
+"""
+
+# FOR SHARE makes a concurrent update wait for the batch to commit, after which the mirror trigger
+# replaces the copied row. A row updated while the batch waits is copied in its new version, which the
+# trigger has already written, so the insert skips it.
+BACKFILL_BATCH_SQL = """
+    WITH batch AS (
+        SELECT user_id, trade_id, status, created_at, updated_at FROM offer
+        WHERE (user_id, trade_id) > (:after_user_id, :after_trade_id)
+        ORDER BY user_id, trade_id
+        LIMIT :batch_size
+        FOR SHARE
+    ), copied AS (
+        INSERT INTO offer_partitioned (user_id, trade_id, status, created_at, updated_at)
+        SELECT batch.* FROM batch
+        WHERE NOT EXISTS (
+            SELECT 1 FROM offer_partitioned AS copy
+            WHERE copy.trade_id = batch.trade_id AND copy.user_id = batch.user_id
+        )
+        ON CONFLICT DO NOTHING
+    )
+    SELECT user_id, trade_id FROM batch ORDER BY user_id DESC, trade_id DESC LIMIT 1
+"""
+
+# row triggers on a partitioned table run on the partitions, so change_log has to name the root table
+RECORD_CHANGE_SQL = """
+    CREATE OR REPLACE FUNCTION record_change() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        row_data jsonb;
+    BEGIN
+        row_data := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+        INSERT INTO change_log (entity, op, entity_key, data)
+        SELECT {entity}, lower(TG_OP),
+               (SELECT jsonb_object_agg(k, row_data -> k) FROM unnest(TG_ARGV) AS k),
+               CASE WHEN TG_OP = 'DELETE' THEN NULL ELSE row_data END;
+        RETURN NULL;
+    END
+    $$
+"""
+
+
+def create_change_log_triggers() -> None:
+    op.execute("""
+        CREATE TRIGGER offer_change_log AFTER INSERT OR DELETE ON offer
+        FOR EACH ROW EXECUTE FUNCTION record_change('trade_id', 'user_id')
+    """)
+    op.execute("""
+        CREATE TRIGGER offer_change_log_update AFTER UPDATE ON offer
+        FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION record_change('trade_id', 'user_id')
+    """)
+
+
+def drop_change_log_triggers(table: str) -> None:
+    op.execute(f"DROP TRIGGER offer_change_log_update ON {table}")
+    op.execute(f"DROP TRIGGER offer_change_log ON {table}")
+
+
+def create_offer_indexes(table: str, suffix: str = '') -> None:
+    for name, (columns, where) in OFFER_INDEXES.items():
+        op.execute(f"CREATE INDEX {name}{suffix} ON {table} ({columns})" + (f" WHERE {where}" if where else ""))
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE offer_partitioned (
+            user_id integer NOT NULL REFERENCES "user" (id) ON DELETE CASCADE,
+            trade_id integer NOT NULL REFERENCES trade (id) ON DELETE CASCADE,
+            status text NOT NULL DEFAULT 'pending',
+            created_at timestamptz NOT NULL DEFAULT now(),
+            updated_at timestamptz DEFAULT now(),
+            CONSTRAINT offer_partitioned_pkey PRIMARY KEY (user_id, trade_id, status)
+        ) PARTITION BY LIST (status)
+    """)
+    op.execute("CREATE TABLE offer_live PARTITION OF offer_partitioned FOR VALUES IN ('pending', 'accepted')")
+    op.execute("CREATE TABLE offer_closed PARTITION OF offer_partitioned DEFAULT")
+    # one offer per user per trade within a partition; OffersRepository keeps it so across them
+    op.execute("CREATE UNIQUE INDEX ix_offer_live_trade_id_user_id ON offer_live (trade_id, user_id)")
+    op.execute("CREATE UNIQUE INDEX ix_offer_closed_trade_id_user_id ON offer_closed (trade_id, user_id)")
+    create_offer_indexes('offer_partitioned', suffix='_new')
+    op.execute(MIRROR_FUNCTION_SQL)
+    op.execute("CREATE TRIGGER offer_mirror AFTER INSERT OR UPDATE OR DELETE ON offer FOR EACH ROW EXECUTE FUNCTION mirror_offer()")
+
+    # commit the above so the trigger is live, then copy in batches that each commit on their own
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        after = (0, 0)
+        while True:
+            last = connection.execute(
+                sa.text(BACKFILL_BATCH_SQL),
+                {"after_user_id": after[0], "after_trade_id": after[1], "batch_size": BACKFILL_BATCH_SIZE},
+            ).first()
+            if last is None:
+                break
+            after = tuple(last)
+
+    op.execute("LOCK TABLE offer IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER offer_mirror ON offer")
+    op.execute("DROP FUNCTION mirror_offer()")
+    drop_change_log_triggers('offer')
+    op.execute("DROP TABLE offer")
+    op.execute("ALTER TABLE offer_partitioned RENAME TO offer")
+    op.execute("ALTER TABLE offer RENAME CONSTRAINT offer_partitioned_pkey TO offer_pkey")
+    for name in OFFER_INDEXES:
+        op.execute(f"ALTER INDEX {name}_new RENAME TO {name}")
+    op.execute(RECORD_CHANGE_SQL.format(entity="coalesce(pg_partition_root(TG_RELID)::text, TG_TABLE_NAME)"))
+    create_change_log_triggers()
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE TABLE offer_unpartitioned (
+            user_id integer NOT NULL REFERENCES "user" (id) ON DELETE CASCADE,
+            trade_id integer NOT NULL REFERENCES trade (id) ON DELETE CASCADE,
+            status text NOT NULL DEFAULT 'pending',
+            created_at timestamptz NOT NULL DEFAULT now(),
+            updated_at timestamptz DEFAULT now(),
+            CONSTRAINT offer_unpartitioned_pkey PRIMARY KEY (user_id, trade_id)
+        )
+    """)
+    op.execute("LOCK TABLE offer IN ACCESS EXCLUSIVE MODE")
+    op.execute("""
+        INSERT INTO offer_unpartitioned (user_id, trade_id, status, created_at, updated_at)
+        SELECT user_id, trade_id, status, created_at, updated_at FROM offer
+    """)
+    drop_change_log_triggers('offer')
+    op.execute("DROP TABLE offer")
+    op.execute("ALTER TABLE offer_unpartitioned RENAME TO offer")
+    op.execute("ALTER TABLE offer RENAME CONSTRAINT offer_unpartitioned_pkey TO offer_pkey")
+    op.execute("CREATE INDEX ix_offer_status ON offer (status)")
+    create_offer_indexes('offer')
+    op.execute(RECORD_CHANGE_SQL.format(entity="TG_TABLE_NAME"))
+    create_change_log_triggers()
@@ -0,0 +1,106 @@
+"""compact enum columns and trade pk
+
+Revision ID: 8b6f0d2e4a17
+Revises: 4e8b2d6a9c13
+Create Date: 2026-10-19 23:41:18.530962
+
+product.type, trade.what_do and trade.size become native enums, and trade's primary key becomes id
+alone (the unique index on id is promoted, so no new index is built). Changing the column types
+rewrites product and trade under an ACCESS EXCLUSIVE lock; the rewrite is done in one ALTER per
+table so each is only rewritten once. offer.status stays text: it is offer's partition key, which
+can't have its type changed in place.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '8b6f0d2e4a17'
+down_revision = '4e8b2d6a9c13'
+branch_labels = None
+depends_on = None
+
+# fixed here rather than imported, so the migration doesn't change when the app's enums do
+PRODUCT_TYPES = ['idk, a bottle', 'cream', 'spray', 'mousse', 'gel', 'oil', 'shampoo', 'conditioner', 'mask']
+WHAT_DO = ['trade', 'sell', 'give away']
+SIZES = ['sample', 'travel', 'regular', 'jumbo']
+
+# table, column, enum name, values, default
+ENUM_COLUMNS = [
+    ('product', 'type', 'product_type', PRODUCT_TYPES, 'idk, a bottle'),
+    ('trade', 'what_do', 'trade_what_do', WHAT_DO, 'trade'),
+    ('trade', 'size', 'trade_size', SIZES, None),
+]
+
+# every foreign key that points at trade's primary key, as (table, name, definition)
+TRADE_FOREIGN_KEYS_SQL = """
+    SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint
+    WHERE confrelid = 'trade'::regclass AND contype = 'f' AND conparentid = 0
+"""
+
+
+def check_values(table: str, column: str, values) -> None:
+    # a value outside the enum would fail the cast halfway through the rewrite; say which up front
+    unknown = op.get_bind().execute(
+        sa.text(f"SELECT DISTINCT {column} FROM {table} WHERE {column} <> ALL(:values)"), {"values": values},
+    ).scalars().all()
+    if unknown:
+        raise RuntimeError(f"{table}.{column} has values outside the enum: {unknown}")
+
+
+def alter_column_types(table: str, to_enum: bool) -> None:
+    clauses = []
+    for column_table, column, enum_name, _, default in ENUM_COLUMNS:
+        if column_table != table:
+            continue
+        new_type = enum_name if to_enum else 'text'
+        if default is not None:
+            clauses.append(f"ALTER COLUMN {column} DROP DEFAULT")
+        clauses.append(f"ALTER COLUMN {column} TYPE {new_type} USING {column}::{new_type}")
+        if default is not None:
+            clauses.append(f"ALTER COLUMN {column} SET DEFAULT '{default}'")
+    op.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
+
+
+def upgrade() -> None:
+    for table, column, enum_name, values, _ in ENUM_COLUMNS:
+        check_values(table, column, values)
+        op.execute(f"CREATE TYPE {enum_name} AS ENUM (" + ", ".join(f"'{v}'" for v in values) + ")")
+
+    # the predicate was written against text and can't be carried over to the enum; put it back after
+    op.drop_index('ix_trade_swappable', table_name='trade')
+    alter_column_types('product', to_enum=True)
+    alter_column_types('trade', to_enum=True)
+    op.create_index(
+        'ix_trade_swappable', 'trade', ['user_id', 'product_id', 'id'], unique=False,
+        postgresql_where=sa.text("what_do = 'trade'"),
+    )
+
+    # the foreign keys from offer, offer_event, feed_entry, ... already use ix_trade_id and keep it
+    op.execute("ALTER TABLE trade DROP CONSTRAINT trade_pkey")
+    op.execute("ALTER TABLE trade ADD CONSTRAINT trade_pkey PRIMARY KEY USING INDEX ix_trade_id")
+    op.execute("ANALYZE product")
+    op.execute("ANALYZE trade")
+
+
+def downgrade() -> None:
+    # the foreign keys now hang off trade_pkey, so they come off while the key is swapped back
+    foreign_keys = op.get_bind().execute(sa.text(TRADE_FOREIGN_KEYS_SQL)).all()
+    for table, name, _ in foreign_keys:
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+    op.execute("ALTER TABLE trade DROP CONSTRAINT trade_pkey")
+    op.execute("CREATE UNIQUE INDEX ix_trade_id ON trade (id)")
+    op.execute("ALTER TABLE trade ADD CONSTRAINT trade_pkey PRIMARY KEY (id, user_id, product_id)")
+    for table, name, definition in foreign_keys:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+
+    op.drop_index('ix_trade_swappable', table_name='trade')
+    alter_column_types('trade', to_enum=False)
+    alter_column_types('product', to_enum=False)
+    op.create_index(
+        'ix_trade_swappable', 'trade', ['user_id', 'product_id', 'id'], unique=False,
+        postgresql_where=sa.text("what_do = 'trade'"),
+    )
+    for _, _, enum_name, _, _ in ENUM_COLUMNS:
+        op.execute(f"DROP TYPE {enum_name}")
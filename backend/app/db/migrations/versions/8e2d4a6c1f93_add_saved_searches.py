@@ -0,0 +1,52 @@
+"""add saved searches
+
+Revision ID: 8e2d4a6c1f93
+Revises: 3c61e0f4b7a2
+Create Date: 2026-10-19 15:22:47.902115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = '8e2d4a6c1f93'
+down_revision = '3c61e0f4b7a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('saved_search',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('product_type', sa.Text(), nullable=True),
+    sa.Column('size', sa.Text(), nullable=True),
+    sa.Column('max_price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('anchor', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_saved_search_id'), 'saved_search', ['id'], unique=False)
+    op.create_index('ix_saved_search_anchor', 'saved_search', ['anchor'], unique=False)
+    op.create_index('ix_saved_search_user_id', 'saved_search', ['user_id'], unique=False)
+    op.create_table('saved_search_match',
+    sa.Column('search_id', sa.Integer(), nullable=False),
+    sa.Column('trade_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['search_id'], ['saved_search.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['trade_id'], ['trade.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('search_id', 'trade_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('saved_search_match')
+    op.drop_index('ix_saved_search_user_id', table_name='saved_search')
+    op.drop_index('ix_saved_search_anchor', table_name='saved_search')
+    op.drop_index(op.f('ix_saved_search_id'), table_name='saved_search')
+    op.drop_table('saved_search')
@@ -0,0 +1,43 @@
+"""add tombstones and sync indexes
+
+Revision ID: 9d4b7e2a15c8
+Revises: 6c1e9b3f72d4
+Create Date: 2026-10-19 19:48:03.118264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic
+revision = '9d4b7e2a15c8'
+down_revision = '6c1e9b3f72d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('tombstone',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('kind', sa.Text(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('visible_to', postgresql.ARRAY(sa.Integer()), nullable=True),
+    sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tombstone_deleted_at', 'tombstone', ['deleted_at'], unique=False)
+    op.create_index('ix_product_updated_at', 'product', ['updated_at'], unique=False)
+    op.create_index('ix_trade_updated_at', 'trade', ['updated_at'], unique=False)
+    op.create_index('ix_offer_user_id_updated_at', 'offer', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_offer_trade_id_updated_at', 'offer', ['trade_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_offer_trade_id_updated_at', table_name='offer')
+    op.drop_index('ix_offer_user_id_updated_at', table_name='offer')
+    op.drop_index('ix_trade_updated_at', table_name='trade')
+    op.drop_index('ix_product_updated_at', table_name='product')
+    op.drop_index('ix_tombstone_deleted_at', table_name='tombstone')
+    op.drop_table('tombstone')
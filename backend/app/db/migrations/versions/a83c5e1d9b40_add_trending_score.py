@@ -0,0 +1,30 @@
+"""add trending score
+
+Revision ID: a83c5e1d9b40
+Revises: 5b90d3e7c2a8
+Create Date: 2026-10-19 17:31:09.442871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = 'a83c5e1d9b40'
+down_revision = '5b90d3e7c2a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('trending_score',
+    sa.Column('kind', sa.Text(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('kind', 'item_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('trending_score')
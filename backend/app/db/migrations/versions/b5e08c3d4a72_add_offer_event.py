@@ -0,0 +1,40 @@
+"""add offer event
+
+Revision ID: b5e08c3d4a72
+Revises: 2f7c5a0e8b91
+Create Date: 2026-10-19 21:03:17.664120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = 'b5e08c3d4a72'
+down_revision = '2f7c5a0e8b91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('offer_event',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('trade_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['trade_id'], ['trade.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # earlier history was overwritten; start each existing offer's log at its current status
+    op.execute("""
+        INSERT INTO offer_event (trade_id, user_id, status, created_at)
+        SELECT trade_id, user_id, status, coalesce(updated_at, created_at) FROM offer
+        ORDER BY coalesce(updated_at, created_at), trade_id, user_id
+    """)
+    op.create_index('ix_offer_event_trade_id_id', 'offer_event', ['trade_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_offer_event_trade_id_id', table_name='offer_event')
+    op.drop_table('offer_event')
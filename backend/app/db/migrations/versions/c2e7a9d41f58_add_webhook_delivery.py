@@ -0,0 +1,36 @@
+"""add webhook delivery
+
+Revision ID: c2e7a9d41f58
+Revises: 8b6f0d2e4a17
+Create Date: 2026-10-20 09:12:44.310527
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic
+revision = 'c2e7a9d41f58'
+down_revision = '8b6f0d2e4a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('webhook_delivery',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('subscription_id', sa.Integer(), nullable=False),
+    sa.Column('event', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.ForeignKeyConstraint(['subscription_id'], ['webhook_subscription.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_webhook_delivery_subscription_id_id', 'webhook_delivery', ['subscription_id', 'id'], unique=False)
+    op.add_column('webhook_subscription', sa.Column('locked_until', sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('webhook_subscription', 'locked_until')
+    op.drop_index('ix_webhook_delivery_subscription_id_id', table_name='webhook_delivery')
+    op.drop_table('webhook_delivery')
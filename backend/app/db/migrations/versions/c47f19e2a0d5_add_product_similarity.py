@@ -0,0 +1,43 @@
+"""add product similarity
+
+Revision ID: c47f19e2a0d5
+Revises: 8e2d4a6c1f93
+Create Date: 2026-10-19 16:05:13.274410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic
+revision = 'c47f19e2a0d5'
+down_revision = '8e2d4a6c1f93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('product_similarity',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('similar_product_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['similar_product_id'], ['product.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('product_id', 'similar_product_id')
+    )
+    op.create_index(
+        'ix_product_similarity_product_id_score', 'product_similarity', ['product_id', sa.text('score DESC')], unique=False,
+    )
+    op.create_table('job_checkpoint',
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('state', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_checkpoint')
+    op.drop_index('ix_product_similarity_product_id_score', table_name='product_similarity')
+    op.drop_table('product_similarity')
@@ -0,0 +1,43 @@
+"""add expiry indexes and trade archive
+
+Revision ID: d61a0f7b3e59
+Revises: b5e08c3d4a72
+Create Date: 2026-10-19 21:41:55.207391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic
+revision = 'd61a0f7b3e59'
+down_revision = 'b5e08c3d4a72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('trade_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('trade', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('offers', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'[]'"), nullable=False),
+    sa.Column('offer_events', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'[]'"), nullable=False),
+    sa.Column('archived_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_trade_archive_user_id'), 'trade_archive', ['user_id'], unique=False)
+    op.create_index('ix_trade_created_at', 'trade', ['created_at'], unique=False)
+    op.create_index(
+        'ix_offer_pending_updated_at', 'offer', ['updated_at'], unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_offer_pending_updated_at', table_name='offer')
+    op.drop_index('ix_trade_created_at', table_name='trade')
+    op.drop_index(op.f('ix_trade_archive_user_id'), table_name='trade_archive')
+    op.drop_table('trade_archive')
@@ -0,0 +1,44 @@
+"""add trade browse indexes and facet counts
+
+Revision ID: d87732903ced
+Revises: 0b35c0814713
+Create Date: 2026-10-19 10:02:17.518210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = 'd87732903ced'
+down_revision = '0b35c0814713'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('trade_facet_count',
+    sa.Column('facet', sa.Text(), nullable=False),
+    sa.Column('value', sa.Text(), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('facet', 'value')
+    )
+    op.create_index('ix_trade_what_do_size_id', 'trade', ['what_do', 'size', 'id'], unique=False)
+    op.create_index('ix_trade_what_do_price', 'trade', ['what_do', 'price'], unique=False)
+    op.create_index('ix_product_type', 'product', ['type'], unique=False)
+    # seed the counters from whatever is already listed
+    op.execute("""
+        INSERT INTO trade_facet_count (facet, value, count)
+        SELECT 'what_do', what_do, count(*) FROM trade GROUP BY what_do
+        UNION ALL
+        SELECT 'size', size, count(*) FROM trade WHERE size IS NOT NULL GROUP BY size
+        UNION ALL
+        SELECT 'type', product.type, count(*) FROM trade JOIN product ON product.id = trade.product_id GROUP BY product.type
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_type', table_name='product')
+    op.drop_index('ix_trade_what_do_price', table_name='trade')
+    op.drop_index('ix_trade_what_do_size_id', table_name='trade')
+    op.drop_table('trade_facet_count')
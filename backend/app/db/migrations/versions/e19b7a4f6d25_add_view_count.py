@@ -0,0 +1,31 @@
+"""add view count
+
+Revision ID: e19b7a4f6d25
+Revises: a83c5e1d9b40
+Create Date: 2026-10-19 18:02:55.130827
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = 'e19b7a4f6d25'
+down_revision = 'a83c5e1d9b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('view_count',
+    sa.Column('kind', sa.Text(), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('views', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('unique_viewers', sa.LargeBinary(), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('kind', 'item_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('view_count')
@@ -0,0 +1,25 @@
+"""add outbox handled
+
+Revision ID: e5b1c8f3a962
+Revises: c2e7a9d41f58
+Create Date: 2026-10-20 10:03:27.918465
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic
+revision = 'e5b1c8f3a962'
+down_revision = 'c2e7a9d41f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('outbox', sa.Column('handled', postgresql.ARRAY(sa.Text()), server_default='{}', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('outbox', 'handled')
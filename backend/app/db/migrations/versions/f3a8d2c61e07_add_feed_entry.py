@@ -0,0 +1,51 @@
+"""add feed entry
+
+Revision ID: f3a8d2c61e07
+Revises: e19b7a4f6d25
+Create Date: 2026-10-19 18:37:21.740334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = 'f3a8d2c61e07'
+down_revision = 'e19b7a4f6d25'
+branch_labels = None
+depends_on = None
+
+FEED_COLUMNS = ['what_do', 'size', 'price', 'product_id', 'product_name', 'brand', 'product_type', 'user_id', 'username']
+
+
+def upgrade() -> None:
+    op.create_table('feed_entry',
+    sa.Column('trade_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('what_do', sa.Text(), nullable=False),
+    sa.Column('size', sa.Text(), nullable=True),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('product_name', sa.Text(), nullable=False),
+    sa.Column('brand', sa.Text(), nullable=True),
+    sa.Column('product_type', sa.Text(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['trade_id'], ['trade.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('trade_id')
+    )
+    op.execute("""
+        INSERT INTO feed_entry (trade_id, created_at, what_do, size, price, product_id, product_name, brand, product_type, user_id, username)
+        SELECT trade.id, trade.created_at, trade.what_do, trade.size, trade.price,
+               product.id, product.product_name, product.brand, product.type, "user".id, "user".username
+        FROM trade JOIN product ON product.id = trade.product_id JOIN "user" ON "user".id = trade.user_id
+    """)
+    op.create_index(
+        'ix_feed_entry_created_at_trade_id', 'feed_entry', [sa.text('created_at DESC'), sa.text('trade_id DESC')],
+        unique=False, postgresql_include=FEED_COLUMNS,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feed_entry_created_at_trade_id', table_name='feed_entry')
+    op.drop_table('feed_entry')
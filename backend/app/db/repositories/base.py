@@ -1,6 +1,62 @@
+import functools
+import logging
+from typing import Callable, Optional, TypeVar
+
 from databases import Database
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm.exc import StaleDataError
 from sqlalchemy.orm.session import Session
+from starlette.status import HTTP_412_PRECONDITION_FAILED
+
+VERSION_CONFLICT_DETAIL = "This was changed since you fetched it. Fetch it again and reapply your update."
+SERIALIZATION_FAILURE = "40001"
+SERIALIZATION_RETRIES = 3
+
+logger = logging.getLogger(__name__)
+
+Method = TypeVar("Method", bound=Callable)
+
+
+def retry_on_serialization_failure(method: Method) -> Method:
+    """
+    Roll back and run a repository method again when Postgres aborts it with a serialization failure,
+    as it does when a row the method updates or locks was moved to another partition by a concurrent
+    transaction (offer's status changes do that). The method has to do all its work in one
+    transaction that it commits itself, and re-read anything it decides on, since it starts over.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        for attempt in range(1, SERIALIZATION_RETRIES + 1):
+            try:
+                return method(self, *args, **kwargs)
+            except DBAPIError as e:
+                if getattr(e.orig, "pgcode", None) != SERIALIZATION_FAILURE or attempt == SERIALIZATION_RETRIES:
+                    raise
+                logger.info("%s hit a serialization failure, retrying: %s", method.__name__, e.orig)
+                self.db.rollback()
+
+    return wrapper
+
 
 class BaseRepository:
     def __init__(self, db: Session) -> None:
-        self.db = db
\ No newline at end of file
+        self.db = db
+
+    def check_version(self, *, record, expected_version: Optional[int]) -> None:
+        """
+        Refuse to update record if the client's copy (expected_version, from If-Match) is out of date
+        """
+        if expected_version is not None and record.version != expected_version:
+            raise HTTPException(status_code=HTTP_412_PRECONDITION_FAILED, detail=VERSION_CONFLICT_DETAIL)
+
+    def flush_versioned(self) -> None:
+        """
+        Write pending updates to versioned rows. The UPDATE only matches the version that was loaded,
+        so a row someone else changed in the meantime fails here and the update is refused.
+        """
+        try:
+            self.db.flush()
+        except StaleDataError:
+            self.db.rollback()
+            raise HTTPException(status_code=HTTP_412_PRECONDITION_FAILED, detail=VERSION_CONFLICT_DETAIL)
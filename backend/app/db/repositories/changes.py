@@ -0,0 +1,69 @@
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, text, tuple_
+
+from app.core.config import CHANGE_LOG_COMPACT_AFTER_DAYS, CHANGE_LOG_RETENTION_DAYS
+from app.db.metadata import ChangeLogEntry
+from app.db.repositories.base import BaseRepository
+
+# superseded entries past the compaction horizon, a batch at a time so no one statement holds locks for long
+COMPACT_BATCH_SQL = """
+    DELETE FROM change_log WHERE id IN (
+        SELECT old.id FROM change_log AS old
+        WHERE old.created_at < now() - make_interval(days => :compact_after_days)
+          AND EXISTS (
+            SELECT 1 FROM change_log AS newer
+            WHERE newer.entity = old.entity AND newer.entity_key = old.entity_key AND newer.id > old.id
+          )
+        LIMIT :batch_size
+    )
+"""
+
+
+class ChangesRepository(BaseRepository):
+    """
+    Reads the change_log stream. Entries are ordered by (txid, id): ids are handed out before commit,
+    so a transaction can commit a lower id after a higher one has been read. Only entries from
+    transactions older than every one still running are returned, and since txids only grow, an
+    entry can never appear behind a position a consumer has already passed.
+    """
+
+    def list_changes(
+        self,
+        *,
+        after: Optional[Tuple[int, int]] = None,
+        entities: Optional[List[str]] = None,
+        limit: int = 100,
+    ) -> List[ChangeLogEntry]:
+        query = self.db.query(ChangeLogEntry).filter(
+            ChangeLogEntry.txid < func.txid_snapshot_xmin(func.txid_current_snapshot()),
+        )
+        if after:
+            query = query.filter(tuple_(ChangeLogEntry.txid, ChangeLogEntry.id) > tuple_(*after))
+        if entities:
+            query = query.filter(ChangeLogEntry.entity.in_(entities))
+        return query.order_by(ChangeLogEntry.txid, ChangeLogEntry.id).limit(limit).all()
+
+    def compact(self, *, batch_size: int = 10000) -> Tuple[int, int]:
+        """
+        Keep only the newest entry for each row once entries are CHANGE_LOG_COMPACT_AFTER_DAYS old, then
+        drop delete entries older than CHANGE_LOG_RETENTION_DAYS. Reading from the start still rebuilds
+        every live row. Returns (superseded entries removed, delete entries removed).
+        """
+        superseded = 0
+        while True:
+            removed = self.db.execute(
+                text(COMPACT_BATCH_SQL),
+                {"compact_after_days": CHANGE_LOG_COMPACT_AFTER_DAYS, "batch_size": batch_size},
+            ).rowcount
+            self.db.commit()
+            superseded += removed
+            if removed < batch_size:
+                break
+        deletes = self.db.query(ChangeLogEntry).filter(
+            ChangeLogEntry.op == "delete",
+            ChangeLogEntry.created_at < func.now() - timedelta(days=CHANGE_LOG_RETENTION_DAYS),
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return superseded, deletes
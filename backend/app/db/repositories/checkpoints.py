@@ -0,0 +1,20 @@
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.metadata import JobCheckpoint
+from app.db.repositories.base import BaseRepository
+
+
+class CheckpointsRepository(BaseRepository):
+    def get_state(self, *, name: str) -> Optional[dict]:
+        return self.db.query(JobCheckpoint.state).filter(JobCheckpoint.name == name).scalar()
+
+    def save_state(self, *, name: str, state: dict) -> None:
+        self.db.execute(
+            insert(JobCheckpoint.__table__).
+                values(name=name, state=state).
+                on_conflict_do_update(index_elements=["name"], set_={"state": state, "updated_at": func.now()})
+        )
+        self.db.commit()
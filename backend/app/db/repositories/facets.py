@@ -0,0 +1,71 @@
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.metadata import Trade, TradeFacetCount
+from app.db.repositories.base import BaseRepository
+
+FACETS = ("what_do", "size", "type")
+
+
+def facet_value(value) -> Optional[str]:
+    # the pydantic enums (WhatDo, Size, ProductType) are str subclasses, but str() on them gives the member name
+    return getattr(value, "value", value)
+
+
+def trade_facets(*, what_do, size, product_type) -> Dict[str, Optional[str]]:
+    return {"what_do": facet_value(what_do), "size": facet_value(size), "type": facet_value(product_type)}
+
+
+class FacetsRepository(BaseRepository):
+    """
+    Maintains trade_facet_count. Adjustments are added to the caller's transaction and
+    committed with the trade/product write that caused them.
+    """
+
+    def adjust(self, *, facets: Dict[str, Optional[str]], delta: int) -> None:
+        self.adjust_many(deltas=Counter({(f, v): delta for f, v in facets.items() if v is not None}))
+
+    def adjust_many(self, *, deltas: Dict[tuple, int]) -> None:
+        # sorted so concurrent writers lock the counter rows in the same order
+        rows = [{"facet": f, "value": v, "count": d} for (f, v), d in sorted(deltas.items()) if d]
+        if not rows:
+            return
+        stmt = insert(TradeFacetCount).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TradeFacetCount.facet, TradeFacetCount.value],
+            set_={"count": TradeFacetCount.count + stmt.excluded.count},
+        )
+        self.db.execute(stmt)
+
+    def adjust_for_trades(self, *, trades: Iterable[Trade], delta: int) -> None:
+        deltas = Counter()
+        for trade in trades:
+            facets = trade_facets(what_do=trade.what_do, size=trade.size, product_type=trade.product.type)
+            for f, v in facets.items():
+                if v is not None:
+                    deltas[(f, v)] += delta
+        self.adjust_many(deltas=deltas)
+
+    def get_facet_counts(self) -> Dict[str, Dict[str, int]]:
+        counts = {facet: {} for facet in FACETS}
+        for row in self.db.query(TradeFacetCount).filter(TradeFacetCount.count > 0).all():
+            counts.setdefault(row.facet, {})[row.value] = row.count
+        return counts
+
+    def repair_facet_counts(self) -> None:
+        """
+        Rebuild every counter from the trade table
+        """
+        self.db.execute(text("""
+            DELETE FROM trade_facet_count;
+            INSERT INTO trade_facet_count (facet, value, count)
+            SELECT 'what_do', what_do::text, count(*) FROM trade GROUP BY what_do
+            UNION ALL
+            SELECT 'size', size::text, count(*) FROM trade WHERE size IS NOT NULL GROUP BY size
+            UNION ALL
+            SELECT 'type', product.type::text, count(*) FROM trade JOIN product ON product.id = trade.product_id GROUP BY product.type;
+        """))
+        self.db.commit()
@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Integer, bindparam, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.db.metadata import FeedEntry
+from app.db.repositories.base import BaseRepository
+
+UPSERT_FEED_ENTRIES_SQL = """
+    INSERT INTO feed_entry (trade_id, created_at, what_do, size, price, product_id, product_name, brand, product_type, user_id, username)
+    SELECT trade.id, trade.created_at, trade.what_do, trade.size, trade.price,
+           product.id, product.product_name, product.brand, product.type, "user".id, "user".username
+    FROM trade JOIN product ON product.id = trade.product_id JOIN "user" ON "user".id = trade.user_id
+    WHERE {where}
+    ON CONFLICT (trade_id) DO UPDATE SET
+        what_do = excluded.what_do, size = excluded.size, price = excluded.price, product_id = excluded.product_id,
+        product_name = excluded.product_name, brand = excluded.brand, product_type = excluded.product_type,
+        user_id = excluded.user_id, username = excluded.username
+"""
+
+
+class FeedRepository(BaseRepository):
+    """
+    Maintains feed_entry. Refreshes are added to the caller's transaction (flush the trade first) and
+    committed with the write that caused them; deleted trades drop out through the foreign key.
+    """
+
+    def refresh_trades(self, *, trade_ids: List[int]) -> None:
+        if not trade_ids:
+            return
+        self.db.execute(
+            text(UPSERT_FEED_ENTRIES_SQL.format(where="trade.id = ANY(:trade_ids)")).
+                bindparams(bindparam("trade_ids", type_=ARRAY(Integer))),
+            {"trade_ids": list(trade_ids)},
+        )
+
+    def refresh_product(self, *, product_id: int) -> None:
+        self.db.execute(text(UPSERT_FEED_ENTRIES_SQL.format(where="trade.product_id = :product_id")), {"product_id": product_id})
+
+    def list_entries(self, *, after: Optional[Tuple[datetime, int]] = None, limit: int = 20) -> List[FeedEntry]:
+        query = self.db.query(FeedEntry)
+        if after:
+            query = query.filter(tuple_(FeedEntry.created_at, FeedEntry.trade_id) < tuple_(*after))
+        return query.order_by(FeedEntry.created_at.desc(), FeedEntry.trade_id.desc()).limit(limit).all()
@@ -0,0 +1,206 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload
+
+from app.core.config import FEED_FANOUT_MAX_FOLLOWERS
+from app.db.metadata import Follow, Trade, User
+from app.db.repositories.base import BaseRepository
+
+# how many of a followee's recent trades are copied into a new follower's inbox
+FOLLOW_BACKFILL_LIMIT = 50
+
+FAN_OUT_TRADE_SQL = """
+    INSERT INTO feed_inbox (user_id, trade_id, author_id, created_at)
+    SELECT follow.follower_id, trade.id, trade.user_id, trade.created_at
+    FROM trade
+    JOIN "user" AS author ON author.id = trade.user_id
+    JOIN follow ON follow.followee_id = trade.user_id
+    WHERE trade.id = :trade_id AND author.follower_count <= :max_followers
+    ON CONFLICT DO NOTHING
+"""
+
+BACKFILL_INBOX_SQL = """
+    INSERT INTO feed_inbox (user_id, trade_id, author_id, created_at)
+    SELECT :follower_id, trade.id, trade.user_id, trade.created_at
+    FROM trade
+    WHERE trade.user_id = :followee_id
+    ORDER BY trade.created_at DESC, trade.id DESC
+    LIMIT :limit
+    ON CONFLICT DO NOTHING
+"""
+
+# an author dropping back to max_followers is fanned out again, so their followers' inboxes need the
+# trades that were only pulled in on read while they were over it
+BACKFILL_FOLLOWERS_SQL = """
+    INSERT INTO feed_inbox (user_id, trade_id, author_id, created_at)
+    SELECT follow.follower_id, recent.id, :followee_id, recent.created_at
+    FROM follow
+    CROSS JOIN (
+        SELECT trade.id, trade.created_at
+        FROM trade
+        WHERE trade.user_id = :followee_id
+        ORDER BY trade.created_at DESC, trade.id DESC
+        LIMIT :limit
+    ) AS recent
+    WHERE follow.followee_id = :followee_id
+    ON CONFLICT DO NOTHING
+"""
+
+# inbox rows for fanned-out authors, plus the newest trades of followed authors too big to fan out.
+# Each branch reads at most :limit rows from its own index before the merge.
+FEED_PAGE_SQL = """
+    (
+        SELECT feed_inbox.created_at, feed_inbox.trade_id
+        FROM feed_inbox
+        WHERE feed_inbox.user_id = :user_id {inbox_after}
+        ORDER BY feed_inbox.created_at DESC, feed_inbox.trade_id DESC
+        LIMIT :limit
+    )
+    UNION
+    (
+        SELECT recent.created_at, recent.id
+        FROM follow
+        JOIN "user" AS author ON author.id = follow.followee_id
+        CROSS JOIN LATERAL (
+            SELECT trade.created_at, trade.id
+            FROM trade
+            WHERE trade.user_id = follow.followee_id {trade_after}
+            ORDER BY trade.created_at DESC, trade.id DESC
+            LIMIT :limit
+        ) AS recent
+        WHERE follow.follower_id = :user_id AND author.follower_count > :max_followers
+    )
+    ORDER BY created_at DESC, trade_id DESC
+    LIMIT :limit
+"""
+
+
+class FollowsRepository(BaseRepository):
+    """
+    The follow graph and the personal feed built on it. New trades are pushed into followers'
+    inboxes by the trade.created outbox handler; authors with more than max_followers followers
+    are skipped there and pulled in when the feed is read instead. When an unfollow brings an
+    author back down to max_followers, their recent trades are copied into every follower's inbox.
+    """
+
+    def user_exists(self, *, user_id: int) -> bool:
+        return self.db.query(User.id).filter(User.id == user_id).first() is not None
+
+    def follow_user(self, *, follower_id: int, followee_id: int, max_followers: Optional[int] = None) -> bool:
+        """
+        Returns False if follower_id already followed followee_id
+        """
+        max_followers = FEED_FANOUT_MAX_FOLLOWERS if max_followers is None else max_followers
+        created = self.db.execute(
+            insert(Follow.__table__).
+                values(follower_id=follower_id, followee_id=followee_id).
+                on_conflict_do_nothing().
+                returning(Follow.followee_id)
+        ).first()
+        if not created:
+            return False
+        follower_count = self.db.execute(
+            text('UPDATE "user" SET follower_count = follower_count + 1 WHERE id = :id RETURNING follower_count'),
+            {"id": followee_id},
+        ).scalar()
+        if follower_count <= max_followers:
+            # so the feed isn't empty until the followee's next trade
+            self.db.execute(
+                text(BACKFILL_INBOX_SQL),
+                {"follower_id": follower_id, "followee_id": followee_id, "limit": FOLLOW_BACKFILL_LIMIT},
+            )
+        self.db.commit()
+        return True
+
+    def unfollow_user(self, *, follower_id: int, followee_id: int, max_followers: Optional[int] = None) -> bool:
+        """
+        Returns False if follower_id didn't follow followee_id
+        """
+        max_followers = FEED_FANOUT_MAX_FOLLOWERS if max_followers is None else max_followers
+        removed = self.db.query(Follow).\
+            filter(Follow.follower_id == follower_id, Follow.followee_id == followee_id).\
+            delete(synchronize_session=False)
+        if not removed:
+            return False
+        follower_count = self.db.execute(
+            text('UPDATE "user" SET follower_count = follower_count - 1 WHERE id = :id RETURNING follower_count'),
+            {"id": followee_id},
+        ).scalar()
+        self.db.execute(
+            text("DELETE FROM feed_inbox WHERE user_id = :follower_id AND author_id = :followee_id"),
+            {"follower_id": follower_id, "followee_id": followee_id},
+        )
+        # the row lock on the author serialises unfollows, so only one of them sees the crossing
+        if follower_count == max_followers:
+            self.db.execute(
+                text(BACKFILL_FOLLOWERS_SQL), {"followee_id": followee_id, "limit": FOLLOW_BACKFILL_LIMIT},
+            )
+        self.db.commit()
+        return True
+
+    def list_following(self, *, user_id: int) -> List[Follow]:
+        return self.db.query(Follow).options(joinedload(Follow.followee)).\
+            filter(Follow.follower_id == user_id).order_by(Follow.created_at.desc()).all()
+
+    def fan_out_trade(self, *, trade_id: int, max_followers: Optional[int] = None) -> int:
+        """
+        Push trade_id into the inbox of every follower of its author, unless the author has more than
+        max_followers followers. Safe to repeat. Returns the number of inboxes written.
+        """
+        max_followers = FEED_FANOUT_MAX_FOLLOWERS if max_followers is None else max_followers
+        result = self.db.execute(text(FAN_OUT_TRADE_SQL), {"trade_id": trade_id, "max_followers": max_followers})
+        self.db.commit()
+        return result.rowcount
+
+    def list_feed(
+        self,
+        *,
+        user_id: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 20,
+        max_followers: Optional[int] = None,
+    ) -> List[Trade]:
+        """
+        Trades from the users user_id follows, newest first, paged on (created_at, trade_id)
+        """
+        params = {
+            "user_id": user_id,
+            "limit": limit,
+            "max_followers": FEED_FANOUT_MAX_FOLLOWERS if max_followers is None else max_followers,
+        }
+        inbox_after, trade_after = "", ""
+        if after:
+            inbox_after = "AND (feed_inbox.created_at, feed_inbox.trade_id) < (:after_created_at, :after_id)"
+            trade_after = "AND (trade.created_at, trade.id) < (:after_created_at, :after_id)"
+            params.update(after_created_at=after[0], after_id=after[1])
+        rows = self.db.execute(
+            text(FEED_PAGE_SQL.format(inbox_after=inbox_after, trade_after=trade_after)), params,
+        ).all()
+        trade_ids = [trade_id for _, trade_id in rows]
+        if not trade_ids:
+            return []
+        trades = {
+            t.id: t for t in
+            self.db.query(Trade).options(joinedload(Trade.product)).filter(Trade.id.in_(trade_ids)).all()
+        }
+        # a trade deleted between the two queries is simply left out
+        return [trades[trade_id] for trade_id in trade_ids if trade_id in trades]
+
+    def repair_follower_counts(self) -> int:
+        """
+        Recompute user.follower_count from the follow table. Returns the number of users corrected.
+        """
+        result = self.db.execute(text("""
+            UPDATE "user" SET follower_count = c.follower_count
+            FROM (
+                SELECT "user".id AS user_id, count(follow.follower_id) AS follower_count
+                FROM "user" LEFT JOIN follow ON follow.followee_id = "user".id
+                GROUP BY "user".id
+            ) AS c
+            WHERE "user".id = c.user_id AND "user".follower_count <> c.follower_count
+        """))
+        self.db.commit()
+        return result.rowcount
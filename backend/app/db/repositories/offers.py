@@ -1,56 +1,365 @@
-from typing import List
+import json
+from datetime import datetime, timedelta
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
 
+from sqlalchemy import Integer, Text, bindparam, insert, text, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.orm.session import Session
 from sqlalchemy.sql.expression import false
-from app.db.metadata import Offer
+from app.db.metadata import Offer, OfferEvent, Trade, User
 
-from app.db.repositories.base import BaseRepository
+from app.db.repositories.base import BaseRepository, retry_on_serialization_failure
+from app.db.repositories.outbox import OutboxRepository
+from app.db.repositories.sync import SyncRepository
 from app.models.trade import TradeInDB
 from app.models.offer import OfferCreate, OfferUpdate, OfferInDB
 from app.models.user import UserInDB
 
+OFFER_EVENTS_CHANNEL = "offer_events"
+# the statuses stored in the offer_live partition; filtering on them keeps a query off offer_closed
+LIVE_OFFER_STATUSES = ("pending", "accepted")
+
+offer_table = Offer.__table__
+offer_event_table = OfferEvent.__table__
+
 
 class OffersRepository(BaseRepository):
+
+    def __init__(self, db: Session) -> None:
+        super().__init__(db)
+        self.outbox_repo = OutboxRepository(db)
+        self.sync_repo = SyncRepository(db)
+
+    def publish_offer_events(self, *, trade_id: int, user_ids: List[int], status: str) -> None:
+        """
+        Record that the offers from user_ids on trade_id moved to status: append them to offer_event,
+        NOTIFY listeners, and queue an offer.status_changed outbox message for the slower consumers
+        (webhooks). All of it only takes effect once the surrounding transaction commits, so call this
+        for every transition, before commit.
+        """
+        if not user_ids:
+            return
+        trade_owner_id, product_id = self.db.query(Trade.user_id, Trade.product_id).filter(Trade.id == trade_id).one()
+        status = getattr(status, "value", status)
+        # one multi-row INSERT however many offers moved; history rows are never rewritten
+        self.db.execute(
+            insert(offer_event_table).
+                values([{"trade_id": trade_id, "user_id": user_id, "status": status} for user_id in user_ids])
+        )
+        payloads = [
+            json.dumps({
+                "type": f"offer.{status}",
+                "trade_id": trade_id,
+                "trade_owner_id": trade_owner_id,
+                "product_id": product_id,
+                "user_id": user_id,
+                "status": status,
+            })
+            for user_id in user_ids
+        ]
+        self.db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(:payloads) AS payload").
+                bindparams(bindparam("payloads", type_=ARRAY(Text))),
+            {"channel": OFFER_EVENTS_CHANNEL, "payloads": payloads},
+        )
+        self.outbox_repo.add_message(
+            topic="offer.status_changed",
+            payload={
+                "type": f"offer.{status}",
+                "trade_id": trade_id,
+                "trade_owner_id": trade_owner_id,
+                "user_ids": list(user_ids),
+                "status": status,
+            },
+        )
+
+    def adjust_trade_counters(self, *, trade_id: int, offers: int = 0, pending: int = 0) -> None:
+        # done in SQL rather than on the loaded Trade so concurrent offers don't overwrite each other's counts
+        self.db.query(Trade).filter(Trade.id == trade_id).update(
+            {
+                Trade.offer_count: Trade.offer_count + offers,
+                Trade.pending_offer_count: Trade.pending_offer_count + pending,
+            },
+            synchronize_session=False,
+        )
+
     def create_offer_for_trade(self, *, new_offer: OfferCreate) -> Offer:
         created_offer = Offer(**new_offer.dict())
         self.db.add(created_offer)
+        try:
+            self.db.flush()
+        except IntegrityError:
+            # a concurrent request got there first: new offers always land in offer_live, whose unique
+            # (trade_id, user_id) index catches it; an existing closed offer is caught before we get here
+            self.db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Users aren't allowed create more than one offer for a product for trade.",
+            )
+        self.adjust_trade_counters(
+            trade_id=new_offer.trade_id, offers=1, pending=1 if new_offer.status == "pending" else 0,
+        )
+        self.publish_offer_events(trade_id=new_offer.trade_id, user_ids=[new_offer.user_id], status=new_offer.status)
         self.db.commit()
         self.db.refresh(created_offer)
         return created_offer
 
 
-    def list_offers_for_trade(self, *, trade: TradeInDB) -> List[Offer]:
-        offers = self.db.query(Offer).filter(Offer.trade_id == trade.id).all()
+    def list_offers_for_trade(self, *, trade: TradeInDB, live_only: bool = False) -> List[Offer]:
+        query = self.db.query(Offer).filter(Offer.trade_id == trade.id)
+        if live_only:
+            query = query.filter(Offer.status.in_(LIVE_OFFER_STATUSES))
+        offers = query.all()
         return offers
 
+    def has_accepted_offer(self, *, trade_id: int) -> bool:
+        return self.db.query(
+            self.db.query(Offer).filter(Offer.trade_id == trade_id, Offer.status == "accepted").exists()
+        ).scalar()
+
+    def list_offers_for_user(
+        self,
+        *,
+        user_id: int,
+        incoming: bool,
+        statuses: Optional[List[str]] = None,
+        after: Optional[Tuple[datetime, int, int]] = None,
+        limit: int = 20,
+    ) -> List[Offer]:
+        """
+        Offers made by the user (incoming=False) or on the user's trades (incoming=True), newest first.
+        Loads each offer's trade and product in the same query and pages on (created_at, trade_id, user_id).
+        """
+        query = self.db.query(Offer).join(Offer.trade).join(Trade.product).\
+            options(contains_eager(Offer.trade).contains_eager(Trade.product))
+        if incoming:
+            query = query.filter(Trade.user_id == user_id)
+        else:
+            query = query.filter(Offer.user_id == user_id)
+        if statuses:
+            query = query.filter(Offer.status.in_(statuses))
+        if after:
+            query = query.filter(tuple_(Offer.created_at, Offer.trade_id, Offer.user_id) < tuple_(*after))
+        return query.order_by(Offer.created_at.desc(), Offer.trade_id.desc(), Offer.user_id.desc()).\
+            limit(limit).all()
+
+    def list_events_for_trade(
+        self, *, trade_id: int, user_id: Optional[int] = None, after_id: Optional[int] = None, limit: int = 50,
+    ) -> List[OfferEvent]:
+        """
+        The trade's offer history, oldest first, optionally only the offer from user_id
+        """
+        query = self.db.query(OfferEvent).filter(OfferEvent.trade_id == trade_id)
+        if user_id is not None:
+            query = query.filter(OfferEvent.user_id == user_id)
+        if after_id is not None:
+            query = query.filter(OfferEvent.id > after_id)
+        return query.order_by(OfferEvent.id).limit(limit).all()
+
+    def find_status_mismatches(self) -> List[dict]:
+        """
+        Offers whose status differs from the latest event in their history (or that have none),
+        plus histories whose latest event says the offer is still live although the row is gone
+        """
+        return [dict(row) for row in self.db.execute(text("""
+            WITH latest AS (
+                SELECT DISTINCT ON (trade_id, user_id) trade_id, user_id, status
+                FROM offer_event
+                ORDER BY trade_id, user_id, id DESC
+            )
+            SELECT coalesce(offer.trade_id, latest.trade_id) AS trade_id,
+                   coalesce(offer.user_id, latest.user_id) AS user_id,
+                   offer.status AS offer_status, latest.status AS event_status
+            FROM offer FULL JOIN latest ON latest.trade_id = offer.trade_id AND latest.user_id = offer.user_id
+            WHERE offer.status IS DISTINCT FROM latest.status
+              AND NOT (offer.trade_id IS NULL AND latest.status = 'rescinded')
+        """)).mappings()]
+
     def get_offer_for_trade_from_user(self, *, trade: TradeInDB, user: UserInDB) -> Offer:
         offer_record = self.db.query(Offer).filter(Offer.trade_id == trade.id, Offer.user_id == user.id).first()
         if not offer_record:
             return None
         return offer_record
 
+    @retry_on_serialization_failure
     def accept_offer(self, *, offer: Offer, offer_update: OfferUpdate) -> Offer:
+        # checked before the call too; this catches a concurrent change that made us start over
+        if offer.status != "pending":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Can only accept offers that are currently pending."
+            )
         offer.status = offer_update.status   
 
         self.db.add(offer)
-        self.db.query(Offer).filter(Offer.trade_id == offer.trade_id, Offer.user_id != offer.user_id).\
-            update({Offer.status: "rejected"}, synchronize_session=False)
+        rejected_user_ids = self.db.execute(
+            update(offer_table).
+                where(
+                    offer_table.c.trade_id == offer.trade_id,
+                    offer_table.c.user_id != offer.user_id,
+                    # only pending offers can be outbid, which also keeps the update inside offer_live
+                    offer_table.c.status == "pending",
+                ).
+                values(status="rejected").
+                returning(offer_table.c.user_id)
+        ).scalars().all()
+        # every other offer is now rejected, so nothing on this trade is pending any more
+        self.db.query(Trade).filter(Trade.id == offer.trade_id).\
+            update({Trade.pending_offer_count: 0}, synchronize_session=False)
+        self.publish_offer_events(trade_id=offer.trade_id, user_ids=[offer.user_id], status="accepted")
+        self.publish_offer_events(trade_id=offer.trade_id, user_ids=rejected_user_ids, status="rejected")
         self.db.commit()
         self.db.refresh(offer)
         return offer
 
+    @retry_on_serialization_failure
     def cancel_offer(self, *, offer: Offer, offer_update: OfferUpdate) -> Offer:
+        if offer.status != "accepted":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Can only cancel offers that have been accepted.",
+            )
         offer.status = offer_update.status   
 
         self.db.add(offer)
-        self.db.query(Offer).filter(Offer.trade_id == offer.trade_id, Offer.user_id != offer.user_id, Offer.status == "rejected").\
-            update({Offer.status: "pending"}, synchronize_session=False)
+        # only reopen the offers that accepting this one rejected, not ones the owner rejected themselves:
+        # accept_offer writes their events in the accept's transaction, so with its created_at, after it
+        reopened_user_ids = self.db.execute(
+            text("""
+                WITH accepted AS (
+                    SELECT id, created_at FROM offer_event
+                    WHERE trade_id = :trade_id AND user_id = :user_id AND status = 'accepted'
+                    ORDER BY id DESC
+                    LIMIT 1
+                ), outbid AS (
+                    SELECT event.user_id FROM offer_event AS event JOIN accepted
+                        ON event.id > accepted.id AND event.created_at = accepted.created_at
+                    WHERE event.trade_id = :trade_id AND event.status = 'rejected'
+                )
+                UPDATE offer SET status = 'pending', updated_at = now()
+                FROM outbid
+                WHERE offer.trade_id = :trade_id AND offer.user_id = outbid.user_id AND offer.status = 'rejected'
+                RETURNING offer.user_id
+            """),
+            {"trade_id": offer.trade_id, "user_id": offer.user_id},
+        ).scalars().all()
+        self.adjust_trade_counters(trade_id=offer.trade_id, pending=len(reopened_user_ids))
+        self.publish_offer_events(trade_id=offer.trade_id, user_ids=[offer.user_id], status="cancelled")
+        self.publish_offer_events(trade_id=offer.trade_id, user_ids=reopened_user_ids, status="pending")
         self.db.commit()
         self.db.refresh(offer)
         return offer
 
+    @retry_on_serialization_failure
+    def reject_pending_offers(
+        self, *, trade_id: int, usernames: Optional[List[str]] = None, except_username: Optional[str] = None,
+    ) -> int:
+        """
+        Reject the pending offers on trade_id from usernames, or from everyone but except_username,
+        in one statement. Returns how many offers were rejected.
+        """
+        query = update(offer_table).where(
+            offer_table.c.trade_id == trade_id,
+            offer_table.c.status == "pending",
+            offer_table.c.user_id == User.id,
+        )
+        if usernames is not None:
+            query = query.where(User.username.in_(usernames))
+        if except_username is not None:
+            query = query.where(User.username != except_username)
+        rejected_user_ids = self.db.execute(
+            query.values(status="rejected").returning(offer_table.c.user_id)
+        ).scalars().all()
+        self.adjust_trade_counters(trade_id=trade_id, pending=-len(rejected_user_ids))
+        self.publish_offer_events(trade_id=trade_id, user_ids=rejected_user_ids, status="rejected")
+        self.db.commit()
+        return len(rejected_user_ids)
+
+    def get_trade_owners(self, *, trade_ids: List[int]) -> Dict[int, int]:
+        return dict(self.db.query(Trade.id, Trade.user_id).filter(Trade.id.in_(trade_ids)).all())
+
+    @retry_on_serialization_failure
+    def expire_pending_offers(self, *, trade_ids: List[int]) -> Dict[int, int]:
+        """
+        Expire every pending offer on trade_ids in one statement. Returns the number expired per trade.
+        """
+        expired = self.db.execute(
+            update(offer_table).
+                where(offer_table.c.trade_id.in_(trade_ids), offer_table.c.status == "pending").
+                values(status="expired").
+                returning(offer_table.c.trade_id, offer_table.c.user_id)
+        ).all()
+        by_trade = self.record_expired_offers(expired=expired)
+        self.db.commit()
+        return by_trade
+
+    @retry_on_serialization_failure
+    def expire_stale_offers(self, *, ttl: timedelta, batch_size: int) -> Dict[int, int]:
+        """
+        Expire up to batch_size offers that have been pending for longer than ttl, oldest first, and
+        commit. Offers locked by another transaction are skipped rather than waited for, so a batch
+        never queues behind user traffic. Returns the number expired per trade.
+        """
+        expired = self.db.execute(
+            text("""
+                WITH stale AS (
+                    SELECT trade_id, user_id FROM offer
+                    WHERE status = 'pending' AND updated_at < now() - :ttl
+                    ORDER BY updated_at
+                    LIMIT :batch_size
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE offer SET status = 'expired', updated_at = now()
+                FROM stale
+                WHERE offer.trade_id = stale.trade_id AND offer.user_id = stale.user_id
+                RETURNING offer.trade_id, offer.user_id
+            """),
+            {"ttl": ttl, "batch_size": batch_size},
+        ).all()
+        by_trade = self.record_expired_offers(expired=expired)
+        self.db.commit()
+        return by_trade
+
+    def record_expired_offers(self, *, expired: List[Tuple[int, int]]) -> Dict[int, int]:
+        """
+        Bring the pending counters and offer events in line with the (trade_id, user_id) offers that
+        were just expired. Trades are updated in id order so concurrent batches can't deadlock.
+        """
+        if not expired:
+            return {}
+        by_trade = Counter(trade_id for trade_id, _ in expired)
+        trade_ids = sorted(by_trade)
+        self.db.execute(
+            text("""
+                UPDATE trade SET pending_offer_count = pending_offer_count - c.expired, updated_at = now()
+                FROM (
+                    SELECT c.trade_id, c.expired FROM unnest(:trade_ids, :counts) AS c(trade_id, expired)
+                    JOIN trade ON trade.id = c.trade_id
+                    ORDER BY c.trade_id
+                    FOR UPDATE OF trade
+                ) AS c
+                WHERE trade.id = c.trade_id
+            """).bindparams(bindparam("trade_ids", type_=ARRAY(Integer)), bindparam("counts", type_=ARRAY(Integer))),
+            {"trade_ids": trade_ids, "counts": [by_trade[trade_id] for trade_id in trade_ids]},
+        )
+        for trade_id in trade_ids:
+            self.publish_offer_events(
+                trade_id=trade_id, user_ids=[user_id for t, user_id in expired if t == trade_id], status="expired",
+            )
+        return dict(by_trade)
+
+    @retry_on_serialization_failure
     def rescind_offer(self, *, offer:Offer):
+        self.adjust_trade_counters(
+            trade_id=offer.trade_id, offers=-1, pending=-1 if offer.status == "pending" else 0,
+        )
+        self.publish_offer_events(trade_id=offer.trade_id, user_ids=[offer.user_id], status="rescinded")
+        trade_owner_id = self.db.query(Trade.user_id).filter(Trade.id == offer.trade_id).scalar()
+        self.sync_repo.add_tombstones(
+            kind="offer", item_ids=[offer.trade_id], user_id=offer.user_id, visible_to=[offer.user_id, trade_owner_id],
+        )
         self.db.delete(offer)
         self.db.commit()
         return offer
\ No newline at end of file
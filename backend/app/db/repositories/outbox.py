@@ -0,0 +1,61 @@
+from typing import List, Optional
+
+from sqlalchemy import func, text
+
+from app.db.metadata import OutboxMessage
+from app.db.repositories.base import BaseRepository
+
+
+class OutboxRepository(BaseRepository):
+    def add_message(self, *, topic: str, payload: dict) -> None:
+        """
+        Queue a message in the caller's transaction; it is only visible to the worker once that commits
+        """
+        self.db.add(OutboxMessage(topic=topic, payload=payload))
+
+    def claim_batch(self, *, batch_size: int, lease_seconds: int, topics: Optional[List[str]] = None) -> List[dict]:
+        """
+        Lease up to batch_size due messages, on any of topics if given. SKIP LOCKED lets several
+        workers drain concurrently, and the lease means a message whose worker died is picked up
+        again once it runs out.
+        """
+        params = {"batch_size": batch_size, "lease_seconds": lease_seconds}
+        topic_filter = ""
+        if topics is not None:
+            topic_filter = "AND topic = ANY(:topics)"
+            params["topics"] = list(topics)
+        rows = self.db.execute(text(f"""
+            UPDATE outbox SET locked_until = now() + make_interval(secs => :lease_seconds), attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM outbox
+                WHERE processed_at IS NULL AND failed_at IS NULL AND available_at <= now()
+                  AND (locked_until IS NULL OR locked_until < now()) {topic_filter}
+                ORDER BY available_at, id
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, topic, payload, attempts, handled
+        """), params).mappings().all()
+        self.db.commit()
+        return sorted((dict(row) for row in rows), key=lambda row: row["id"])
+
+    def mark_processed(self, *, ids: List[int]) -> None:
+        if not ids:
+            return
+        self.db.query(OutboxMessage).filter(OutboxMessage.id.in_(ids)).update(
+            {OutboxMessage.processed_at: func.now(), OutboxMessage.locked_until: None}, synchronize_session=False,
+        )
+        self.db.commit()
+
+    def mark_failed(
+        self, *, id: int, error: str, retry_in_seconds: float, dead: bool, handled: Optional[List[str]] = None,
+    ) -> None:
+        values = {OutboxMessage.last_error: error, OutboxMessage.locked_until: None}
+        if handled is not None:
+            values[OutboxMessage.handled] = handled
+        if dead:
+            values[OutboxMessage.failed_at] = func.now()
+        else:
+            values[OutboxMessage.available_at] = func.now() + func.make_interval(0, 0, 0, 0, 0, 0, retry_in_seconds)
+        self.db.query(OutboxMessage).filter(OutboxMessage.id == id).update(values, synchronize_session=False)
+        self.db.commit()
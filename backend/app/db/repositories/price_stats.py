@@ -0,0 +1,97 @@
+from collections import Counter
+from typing import Dict, Iterable
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.metadata import PriceRollupBucket, Trade
+from app.db.repositories.base import BaseRepository
+from app.db.repositories.facets import facet_value
+from app.services.sketches import ZERO_BUCKET, LogBucketSketch
+
+PRODUCT_SCOPE = "product"
+TYPE_SCOPE = "type"
+
+
+class PriceStatsRepository(BaseRepository):
+    """
+    Maintains price_rollup_bucket. Like the facet counts, adjustments are added to the caller's
+    transaction and committed with the trade/product write that caused them.
+    """
+    sketch = LogBucketSketch()
+
+    def price_deltas(self, *, product_id: int, product_type, price, delta: int) -> Counter:
+        if price is None:
+            return Counter()
+        bucket = self.sketch.bucket_for(float(price))
+        return Counter({
+            (PRODUCT_SCOPE, str(product_id), bucket): delta,
+            (TYPE_SCOPE, facet_value(product_type), bucket): delta,
+        })
+
+    def adjust(self, *, product_id: int, product_type, price, delta: int) -> None:
+        self.adjust_many(deltas=self.price_deltas(product_id=product_id, product_type=product_type, price=price, delta=delta))
+
+    def adjust_many(self, *, deltas: Dict[tuple, int]) -> None:
+        # sorted so concurrent writers lock the bucket rows in the same order
+        rows = [{"scope": s, "key": k, "bucket": b, "count": d} for (s, k, b), d in sorted(deltas.items()) if d]
+        if not rows:
+            return
+        stmt = insert(PriceRollupBucket).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PriceRollupBucket.scope, PriceRollupBucket.key, PriceRollupBucket.bucket],
+            set_={"count": PriceRollupBucket.count + stmt.excluded.count},
+        )
+        self.db.execute(stmt)
+
+    def adjust_for_trades(self, *, trades: Iterable[Trade], delta: int, product_type=None) -> None:
+        deltas = Counter()
+        for trade in trades:
+            deltas.update(self.price_deltas(
+                product_id=trade.product_id,
+                product_type=product_type if product_type is not None else trade.product.type,
+                price=trade.price,
+                delta=delta,
+            ))
+        self.adjust_many(deltas=deltas)
+
+    def get_sketch(self, *, scope: str, key: str) -> LogBucketSketch:
+        rows = self.db.query(PriceRollupBucket.bucket, PriceRollupBucket.count).\
+            filter(PriceRollupBucket.scope == scope, PriceRollupBucket.key == key, PriceRollupBucket.count > 0).all()
+        return LogBucketSketch(dict(rows))
+
+    def get_price_stats(self, *, product_id: int, product_type) -> Dict[str, dict]:
+        """
+        Count, min, median, p90 and max from the product's and its type's sketches, rounded to cents
+        """
+        sketches = {
+            "product": self.get_sketch(scope=PRODUCT_SCOPE, key=str(product_id)),
+            "type": self.get_sketch(scope=TYPE_SCOPE, key=facet_value(product_type)),
+        }
+        return {
+            name: {stat: round(v, 2) if isinstance(v, float) else v for stat, v in sketch.summary().items()}
+            for name, sketch in sketches.items()
+        }
+
+    def repair_price_rollups(self) -> None:
+        """
+        Rebuild every sketch from the trade table
+        """
+        self.db.execute(text("""
+            DELETE FROM price_rollup_bucket;
+            INSERT INTO price_rollup_bucket (scope, key, bucket, count)
+            SELECT scope, key, bucket, count(*) FROM (
+                SELECT unnest(ARRAY[:product_scope, :type_scope]) AS scope,
+                       unnest(ARRAY[trade.product_id::text, product.type::text]) AS key,
+                       CASE WHEN trade.price > 0 THEN ceil(ln(trade.price) / :log_gamma)::int ELSE :zero_bucket END AS bucket
+                FROM trade JOIN product ON product.id = trade.product_id
+                WHERE trade.price IS NOT NULL
+            ) AS b
+            GROUP BY scope, key, bucket;
+        """), {
+            "product_scope": PRODUCT_SCOPE,
+            "type_scope": TYPE_SCOPE,
+            "log_gamma": self.sketch.log_gamma,
+            "zero_bucket": ZERO_BUCKET,
+        })
+        self.db.commit()
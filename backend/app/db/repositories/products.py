@@ -1,13 +1,29 @@
-from typing import List
+from typing import List, Optional
 from fastapi.exceptions import HTTPException
+from sqlalchemy import any_, func, text
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm.session import Session
 
 from starlette.status import HTTP_400_BAD_REQUEST
 from app.db.repositories.base import BaseRepository
+from app.db.repositories.feed import FeedRepository
+from app.db.repositories.facets import FacetsRepository, facet_value
+from app.db.repositories.price_stats import PriceStatsRepository
+from app.db.repositories.swaps import SwapsRepository
+from app.db.repositories.sync import SyncRepository
 from app.models.product import ProductCreate, ProductUpdate
-from app.db.metadata import Product
+from app.db.metadata import Product, Trade
 
 class ProductsRepository(BaseRepository):
 
+    def __init__(self, db: Session) -> None:
+        super().__init__(db)
+        self.facets_repo = FacetsRepository(db)
+        self.swaps_repo = SwapsRepository(db)
+        self.price_stats_repo = PriceStatsRepository(db)
+        self.feed_repo = FeedRepository(db)
+        self.sync_repo = SyncRepository(db)
+
     def get_product_by_id(self, *, id:int):
         product = self.db.query(Product).filter(Product.id == id).first()
         
@@ -16,6 +32,11 @@ class ProductsRepository(BaseRepository):
 
         return product
 
+    def get_products_by_ids(self, *, ids:List[int]) -> List[Product]:
+        if not ids:
+            return []
+        return self.db.query(Product).filter(Product.id == any_(array(ids))).all()
+
     def get_product_by_name(self, *, name:str):
         product = self.db.query(Product).filter(Product.product_name == name).first()
         
@@ -36,12 +57,15 @@ class ProductsRepository(BaseRepository):
     def get_all_products(self):
         return self.db.query(Product).all()
 
-    def update_product(self, *, id:int, product_update:ProductUpdate):
+    def update_product(self, *, id:int, product_update:ProductUpdate, expected_version: Optional[int] = None):
         target_product = self.get_product_by_id(id=id)
         if not target_product:
             return None
+        self.check_version(record=target_product, expected_version=expected_version)
 
         update_performed = False
+        old_type = facet_value(target_product.type)
+        old_feed_fields = (target_product.product_name, target_product.brand, old_type)
 
         for var,value in vars(product_update).items():
             if value or str(value) == 'False':
@@ -54,9 +78,24 @@ class ProductsRepository(BaseRepository):
                 status_code=HTTP_400_BAD_REQUEST, 
                 detail="No valid update parameters. No update performed",
             )
+        self.flush_versioned()
+
+        new_type = facet_value(target_product.type)
+        if new_type != old_type:
+            # every trade of this product moves to the new type facet
+            trade_count = self.db.query(func.count(Trade.id)).filter(Trade.product_id == id).scalar()
+            self.facets_repo.adjust_many(deltas={("type", old_type): -trade_count, ("type", new_type): trade_count})
+            # and its prices move to the new type's sketch
+            priced_trades = self.db.query(Trade).filter(Trade.product_id == id, Trade.price.isnot(None)).all()
+            self.price_stats_repo.adjust_for_trades(trades=priced_trades, delta=-1, product_type=old_type)
+            self.price_stats_repo.adjust_for_trades(trades=priced_trades, delta=1, product_type=new_type)
 
         try:
             self.db.add(target_product)
+            if (target_product.product_name, target_product.brand, new_type) != old_feed_fields:
+                # the feed shows these on every trade of the product
+                self.db.flush()
+                self.feed_repo.refresh_product(product_id=id)
             self.db.commit()
             self.db.refresh(target_product)
             return target_product
@@ -67,12 +106,35 @@ class ProductsRepository(BaseRepository):
                 detail="Invalid update params.",                
             )
 
+    def repair_trade_counts(self) -> int:
+        """
+        Recompute active_trade_count from the trade table and fix any product that drifted.
+        Returns the number of products that were corrected.
+        """
+        result = self.db.execute(text("""
+            UPDATE product SET active_trade_count = c.trade_count
+            FROM (
+                SELECT product.id AS product_id, count(trade.id) AS trade_count
+                FROM product LEFT JOIN trade ON trade.product_id = product.id
+                GROUP BY product.id
+            ) AS c
+            WHERE product.id = c.product_id AND product.active_trade_count <> c.trade_count
+        """))
+        self.db.commit()
+        return result.rowcount
+
     def delete_product_by_id(self, *, id:int) -> int:
         target_product = self.get_product_by_id(id=id)
         if not target_product:
             return None
 
         deleted_id = target_product.id
+        # the product's trades are deleted along with it
+        self.facets_repo.adjust_for_trades(trades=target_product.users, delta=-1)
+        self.swaps_repo.remove_matches_for_trades(trade_ids=[t.id for t in target_product.users])
+        self.price_stats_repo.adjust_for_trades(trades=target_product.users, delta=-1)
+        self.sync_repo.add_tombstones(kind="product", item_ids=[deleted_id])
+        self.sync_repo.add_tombstones(kind="trade", item_ids=[t.id for t in target_product.users])
         self.db.delete(target_product)
         self.db.commit()
 
@@ -1,3 +1,7 @@
+from typing import List, Optional
+from sqlalchemy import any_
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import contains_eager
 from app.db.repositories.base import BaseRepository
 from app.models.profile import ProfileCreate, ProfileInDB, ProfileUpdate
 from app.db.metadata import Profile, User
@@ -24,13 +28,23 @@ class ProfilesRepository(BaseRepository):
         if profile_record:
             return profile_record
 
-    def update_profile(self, *, profile_update: ProfileUpdate, requesting_user: UserInDB):
+    def get_profiles_by_usernames(self, *, usernames: List[str]) -> List[Profile]:
+        if not usernames:
+            return []
+        return self.db.query(Profile).join(Profile.user).options(contains_eager(Profile.user)).\
+            filter(User.username == any_(array(usernames))).all()
+
+    def update_profile(
+        self, *, profile_update: ProfileUpdate, requesting_user: UserInDB, expected_version: Optional[int] = None,
+    ):
         profile = self.db.query(Profile).filter(Profile.user_id == requesting_user.id).first()
+        self.check_version(record=profile, expected_version=expected_version)
         for var,value in vars(profile_update).items():
             if value or str(value) == 'False':
                 setattr(profile, var, value) 
         
         self.db.add(profile)
+        self.flush_versioned()
         self.db.commit()
         self.db.refresh(profile)
         return profile
\ No newline at end of file
@@ -0,0 +1,99 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import contains_eager, joinedload
+
+from app.db.metadata import SavedSearch, SavedSearchMatch, Trade
+from app.db.repositories.base import BaseRepository
+from app.db.repositories.facets import facet_value
+from app.models.saved_search import SavedSearchCreate
+
+# a search that sets no attributes is filed here and checked against every new trade
+MATCH_ALL = "*"
+
+
+def search_anchor(*, product_id: Optional[int], product_type: Optional[str], size: Optional[str]) -> str:
+    """
+    The term a saved search is filed under: its most selective attribute. A product narrows far
+    more than a type, and a type more than a size.
+    """
+    if product_id is not None:
+        return f"product:{product_id}"
+    if product_type is not None:
+        return f"type:{product_type}"
+    if size is not None:
+        return f"size:{size}"
+    return MATCH_ALL
+
+
+# Look up the searches filed under any of the new trade's terms, then check their other attributes.
+# The candidates are mostly real matches, so the work grows with the number of matches rather than
+# with the number of saved searches.
+MATCH_TRADE_SQL = text("""
+    WITH new_trade AS (
+        SELECT trade.id, trade.user_id, trade.product_id, trade.size::text AS size, trade.price, product.type::text AS type
+        FROM trade JOIN product ON product.id = trade.product_id
+        WHERE trade.id = :trade_id
+    ), matched AS (
+        INSERT INTO saved_search_match (search_id, trade_id)
+        SELECT s.id, t.id
+        FROM new_trade t
+        JOIN saved_search s ON s.anchor IN (
+            'product:' || t.product_id, 'type:' || t.type, 'size:' || coalesce(t.size, ''), :match_all
+        )
+        WHERE s.user_id <> t.user_id
+          AND (s.product_id IS NULL OR s.product_id = t.product_id)
+          AND (s.product_type IS NULL OR s.product_type = t.type)
+          AND (s.size IS NULL OR s.size = t.size)
+          AND (s.max_price IS NULL OR t.price IS NULL OR t.price <= s.max_price)
+        ON CONFLICT DO NOTHING
+        RETURNING search_id, trade_id
+    )
+    SELECT matched.search_id, saved_search.user_id
+    FROM matched JOIN saved_search ON saved_search.id = matched.search_id
+""")
+
+
+class SavedSearchesRepository(BaseRepository):
+    def create_saved_search(self, *, user_id: int, search_create: SavedSearchCreate) -> SavedSearch:
+        values = {
+            "product_id": search_create.product_id,
+            "product_type": facet_value(search_create.product_type),
+            "size": facet_value(search_create.size),
+        }
+        saved_search = SavedSearch(
+            **values, max_price=search_create.max_price, user_id=user_id, anchor=search_anchor(**values),
+        )
+        self.db.add(saved_search)
+        self.db.commit()
+        self.db.refresh(saved_search)
+        return saved_search
+
+    def list_saved_searches_for_user(self, *, user_id: int) -> List[SavedSearch]:
+        return self.db.query(SavedSearch).filter(SavedSearch.user_id == user_id).order_by(SavedSearch.id).all()
+
+    def get_saved_search_for_user(self, *, id: int, user_id: int) -> Optional[SavedSearch]:
+        return self.db.query(SavedSearch).filter(SavedSearch.id == id, SavedSearch.user_id == user_id).first()
+
+    def delete_saved_search(self, *, saved_search: SavedSearch) -> int:
+        deleted_id = saved_search.id
+        self.db.delete(saved_search)
+        self.db.commit()
+        return deleted_id
+
+    def match_trade(self, *, trade_id: int) -> List[Tuple[int, int]]:
+        """
+        Record the saved searches a new trade satisfies. Returns (search_id, user_id) for each match
+        that wasn't recorded before, so a retried outbox message doesn't notify twice.
+        """
+        matches = self.db.execute(MATCH_TRADE_SQL, {"trade_id": trade_id, "match_all": MATCH_ALL}).all()
+        self.db.commit()
+        return [(m.search_id, m.user_id) for m in matches]
+
+    def list_matched_trades(self, *, search_id: int, before_id: Optional[int] = None, limit: int = 20) -> List[Trade]:
+        query = self.db.query(Trade).join(SavedSearchMatch, SavedSearchMatch.trade_id == Trade.id).\
+            join(Trade.product).options(contains_eager(Trade.product), joinedload(Trade.user)).\
+            filter(SavedSearchMatch.search_id == search_id)
+        if before_id is not None:
+            query = query.filter(Trade.id < before_id)
+        return query.order_by(Trade.id.desc()).limit(limit).all()
@@ -0,0 +1,72 @@
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, bindparam, delete, insert, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import contains_eager
+
+from app.db.metadata import ProductSimilarity
+from app.db.repositories.base import BaseRepository
+
+# everyone who listed a product or made an offer on a trade of it, and when
+INTERACTIONS_SQL = text("""
+    SELECT offer.user_id, trade.product_id, extract(epoch FROM offer.created_at) AS seen_at
+    FROM offer JOIN trade ON trade.id = offer.trade_id
+    UNION ALL
+    SELECT trade.user_id, trade.product_id, extract(epoch FROM trade.created_at) AS seen_at
+    FROM trade
+""")
+
+
+class SimilarityRepository(BaseRepository):
+    def load_interactions(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (user_ids, product_ids, seen_at) as arrays, streamed from the server in chunks
+        """
+        result = self.db.execute(INTERACTIONS_SQL.execution_options(stream_results=True))
+        user_ids, product_ids, seen_at = [], [], []
+        for chunk in result.partitions(100_000):
+            chunk = np.array(chunk, dtype=np.float64).reshape(-1, 3)
+            user_ids.append(chunk[:, 0].astype(np.int64))
+            product_ids.append(chunk[:, 1].astype(np.int64))
+            seen_at.append(chunk[:, 2])
+        if not user_ids:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+        return np.concatenate(user_ids), np.concatenate(product_ids), np.concatenate(seen_at)
+
+    def replace_neighbours(self, *, neighbours: Iterable[Tuple[int, np.ndarray, np.ndarray]]) -> int:
+        """
+        Overwrite the stored neighbours of every product in neighbours. Does not commit.
+        """
+        neighbours = list(neighbours)
+        if not neighbours:
+            return 0
+        self.db.execute(
+            delete(ProductSimilarity.__table__).
+                where(ProductSimilarity.product_id.in_([product_id for product_id, _, _ in neighbours]))
+        )
+        rows = [
+            {"product_id": product_id, "similar_product_id": int(similar_id), "score": float(score)}
+            for product_id, similar_ids, scores in neighbours
+            for similar_id, score in zip(similar_ids, scores)
+        ]
+        if rows:
+            self.db.execute(insert(ProductSimilarity.__table__), rows)
+        return len(rows)
+
+    def remove_products_without_interest(self, *, product_ids: np.ndarray) -> None:
+        """
+        Drop the neighbours of products outside product_ids, i.e. nobody is interested in them any more
+        """
+        self.db.execute(
+            text("DELETE FROM product_similarity WHERE product_id <> ALL(:product_ids)").
+                bindparams(bindparam("product_ids", type_=ARRAY(Integer))),
+            {"product_ids": [int(p) for p in product_ids]},
+        )
+        self.db.commit()
+
+    def get_similar_products(self, *, product_id: int, limit: int = 10) -> List[ProductSimilarity]:
+        return self.db.query(ProductSimilarity).join(ProductSimilarity.similar_product).\
+            options(contains_eager(ProductSimilarity.similar_product)).\
+            filter(ProductSimilarity.product_id == product_id).\
+            order_by(ProductSimilarity.score.desc(), ProductSimilarity.similar_product_id).limit(limit).all()
@@ -0,0 +1,183 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Integer, bindparam, delete, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from app.db.metadata import SwapMatch, SwapMatchMember
+from app.db.repositories.base import BaseRepository
+
+# longest swap cycle worth suggesting; every extra hop multiplies the search by the wishlist fan-out
+MAX_CYCLE_LENGTH = 3
+# upper bound on new cycles recorded per update so one very popular listing can't stall the worker
+MAX_CYCLES_PER_UPDATE = 500
+
+# Walk the has -> wants graph outward from the given listings: the owner of a trade gives its product to
+# anyone who wishlisted it, and that person can give any of their own listings onward. A path closes into
+# a cycle when its first owner wishes for the last product.
+FIND_CYCLES_SQL = text("""
+    WITH RECURSIVE path(trade_ids, user_ids, product_ids) AS (
+        SELECT ARRAY[t.id], ARRAY[t.user_id], ARRAY[t.product_id]
+        FROM trade t
+        WHERE t.id = ANY(:trade_ids) AND t.what_do = 'trade'
+      UNION ALL
+        SELECT p.trade_ids || n.id, p.user_ids || n.user_id, p.product_ids || n.product_id
+        FROM path p
+        JOIN wishlist_item w ON w.product_id = p.product_ids[cardinality(p.product_ids)]
+        JOIN trade n ON n.user_id = w.user_id AND n.what_do = 'trade'
+        WHERE cardinality(p.trade_ids) < :max_length AND n.user_id <> ALL(p.user_ids)
+    )
+    SELECT p.trade_ids, p.user_ids, p.product_ids
+    FROM path p
+    JOIN wishlist_item w ON w.user_id = p.user_ids[1] AND w.product_id = p.product_ids[cardinality(p.product_ids)]
+    WHERE cardinality(p.trade_ids) >= 2
+    LIMIT :max_cycles
+""").bindparams(bindparam("trade_ids", type_=ARRAY(Integer)))
+
+
+def canonical_cycle(trade_ids: List[int], user_ids: List[int], product_ids: List[int]) -> Tuple[list, list, list]:
+    """
+    Rotate a cycle so it starts at its smallest trade id; the same swap found from any of its
+    listings then has the same cycle_key
+    """
+    start = trade_ids.index(min(trade_ids))
+    return tuple(values[start:] + values[:start] for values in (trade_ids, user_ids, product_ids))
+
+
+class SwapsRepository(BaseRepository):
+    def find_cycles(
+        self, *, trade_ids: List[int], max_length: int = MAX_CYCLE_LENGTH, max_cycles: int = MAX_CYCLES_PER_UPDATE,
+    ) -> List[Tuple[list, list, list]]:
+        """
+        Every swap cycle of up to max_length listings that runs through one of trade_ids
+        """
+        if not trade_ids:
+            return []
+        rows = self.db.execute(
+            FIND_CYCLES_SQL,
+            {"trade_ids": list(trade_ids), "max_length": max_length, "max_cycles": max_cycles},
+        ).all()
+        return list({
+            tuple(cycle[0]): cycle
+            for cycle in (canonical_cycle(list(r.trade_ids), list(r.user_ids), list(r.product_ids)) for r in rows)
+        }.values())
+
+    def save_cycles(self, *, cycles: List[Tuple[list, list, list]]) -> int:
+        """
+        Record cycles that aren't matched yet and return how many were new
+        """
+        if not cycles:
+            return 0
+        by_key = {",".join(map(str, trade_ids)): (trade_ids, user_ids, product_ids) for trade_ids, user_ids, product_ids in cycles}
+        created = self.db.execute(
+            insert(SwapMatch.__table__).
+                values([
+                    {"cycle_key": key, "length": len(trade_ids), "trade_ids": trade_ids}
+                    for key, (trade_ids, _, _) in sorted(by_key.items())
+                ]).
+                on_conflict_do_nothing(index_elements=["cycle_key"]).
+                returning(SwapMatch.id, SwapMatch.cycle_key)
+        ).all()
+
+        members = []
+        for match_id, key in created:
+            trade_ids, user_ids, product_ids = by_key[key]
+            for position, (trade_id, user_id) in enumerate(zip(trade_ids, user_ids)):
+                members.append({
+                    "match_id": match_id,
+                    "position": position,
+                    "user_id": user_id,
+                    "trade_id": trade_id,
+                    # each member receives the product listed just before theirs
+                    "receives_product_id": product_ids[position - 1],
+                })
+        if members:
+            self.db.execute(insert(SwapMatchMember.__table__), members)
+        self.db.commit()
+        return len(created)
+
+    def match_trades(self, *, trade_ids: List[int]) -> int:
+        """
+        Incremental update after listings were added or wishes changed: only cycles through
+        trade_ids can be new, so only those are searched
+        """
+        return self.save_cycles(cycles=self.find_cycles(
+            trade_ids=trade_ids, max_cycles=MAX_CYCLES_PER_UPDATE * len(trade_ids),
+        ))
+
+    def swappable_trade_ids_for_user(self, *, user_id: int) -> List[int]:
+        return self.db.execute(
+            text("SELECT id FROM trade WHERE user_id = :user_id AND what_do = 'trade'"), {"user_id": user_id},
+        ).scalars().all()
+
+    def remove_matches_for_trades(self, *, trade_ids: List[int]) -> None:
+        """
+        Drop every match a listing takes part in. Does not commit, so it lands with the listing change.
+        """
+        if not trade_ids:
+            return
+        self.db.execute(
+            delete(SwapMatch.__table__).where(SwapMatch.id.in_(
+                select(SwapMatchMember.match_id).where(SwapMatchMember.trade_id.in_(trade_ids))
+            ))
+        )
+
+    def remove_matches_for_wish(self, *, user_id: int, product_id: int) -> None:
+        """
+        Drop the matches that relied on user_id wanting product_id. Does not commit.
+        """
+        self.db.execute(
+            delete(SwapMatch.__table__).where(SwapMatch.id.in_(
+                select(SwapMatchMember.match_id).where(
+                    SwapMatchMember.user_id == user_id, SwapMatchMember.receives_product_id == product_id,
+                )
+            ))
+        )
+
+    def list_matches_for_user(self, *, user_id: int, before_id: Optional[int] = None, limit: int = 20) -> List[SwapMatch]:
+        query = self.db.query(SwapMatch).join(SwapMatchMember, SwapMatchMember.match_id == SwapMatch.id).\
+            filter(SwapMatchMember.user_id == user_id)
+        if before_id is not None:
+            query = query.filter(SwapMatch.id < before_id)
+        return query.order_by(SwapMatch.id.desc()).limit(limit).all()
+
+    def rebuild_matches(self, *, batch_size: int = 1000) -> int:
+        """
+        Recompute every match from scratch, walking the swappable listings in id order. A cycle belongs
+        to the batch holding its smallest trade id (its first trade, position 0), so each batch keeps
+        the matches it finds again, drops the rest of that id range and adds the new ones in a single
+        transaction. Readers keep seeing the old matches until a batch replaces them, and matches
+        that still hold keep their ids. Returns the number of matches recorded.
+        """
+        matched = 0
+        last_id = 0
+        while True:
+            trade_ids = self.db.execute(
+                text("SELECT id FROM trade WHERE what_do = 'trade' AND id > :last_id ORDER BY id LIMIT :batch_size"),
+                {"last_id": last_id, "batch_size": batch_size},
+            ).scalars().all()
+            batch = set(trade_ids)
+            cycles = [
+                cycle for cycle in self.find_cycles(
+                    trade_ids=trade_ids, max_cycles=MAX_CYCLES_PER_UPDATE * len(trade_ids),
+                )
+                if cycle[0][0] in batch
+            ]
+            # past the last batch, whatever is left above last_id is stale
+            starting_here = select(SwapMatchMember.match_id).where(
+                SwapMatchMember.position == 0, SwapMatchMember.trade_id > last_id,
+            )
+            if trade_ids:
+                starting_here = starting_here.where(SwapMatchMember.trade_id <= trade_ids[-1])
+            self.db.execute(
+                delete(SwapMatch.__table__).where(
+                    SwapMatch.id.in_(starting_here),
+                    SwapMatch.cycle_key.notin_([",".join(map(str, cycle[0])) for cycle in cycles]),
+                )
+            )
+            self.save_cycles(cycles=cycles)
+            # save_cycles doesn't commit when there is nothing to insert
+            self.db.commit()
+            matched += len(cycles)
+            if not trade_ids:
+                return matched
+            last_id = trade_ids[-1]
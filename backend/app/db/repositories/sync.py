@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, or_, text, tuple_
+
+from app.core.config import SYNC_TOMBSTONE_RETENTION_DAYS, SYNC_WATERMARK_OVERLAP_SECONDS
+from app.db.metadata import Offer, Product, Profile, Tombstone, Trade
+from app.db.repositories.base import BaseRepository
+
+
+class SyncRepository(BaseRepository):
+    """
+    Delta sync for clients that keep a local copy of the catalogue and their own offers. Changed rows
+    are found through updated_at indexes and deletions through the tombstone table, which the
+    repositories append to in the same transaction as the delete.
+    """
+
+    def add_tombstones(
+        self, *, kind: str, item_ids: List[int], user_id: Optional[int] = None, visible_to: Optional[List[int]] = None,
+    ) -> None:
+        if not item_ids:
+            return
+        self.db.bulk_insert_mappings(Tombstone, [
+            {"kind": kind, "item_id": item_id, "user_id": user_id, "visible_to": visible_to}
+            for item_id in item_ids
+        ])
+
+    def get_changes(
+        self, *, user_id: int, since: Optional[datetime] = None, after: Optional[Dict] = None, limit: int = 500,
+    ) -> Dict:
+        """
+        Everything user_id can see that changed after since, or all of it when since is missing or
+        older than the tombstone retention (reset=True: the client should replace what it has).
+
+        A page holds at most limit rows of each kind, each kind read in (updated_at, id) order. When
+        a kind is cut off, "next" holds the reset flag, the lower bound, when the first page was taken
+        and where each kind stopped; pass it back as after (since is then ignored) for the next page.
+        Later pages of a reset carry the deletions since the first page, which rows already sent may
+        have been caught by. The returned watermark is as
+        far as every kind has been sent: the oldest last updated_at among the kinds that were cut off,
+        or the time this page was taken once all are caught up. Send it back as since next time.
+        """
+        now = self.db.execute(text("SELECT now()")).scalar()
+        if after is None:
+            reset = since is None or since < now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+            # a transaction stamped before the last watermark may have committed after it; re-send that window
+            changed_after = None if reset else since - timedelta(seconds=SYNC_WATERMARK_OVERLAP_SECONDS)
+            after = {"reset": reset, "changed_after": changed_after, "started_at": now}
+        else:
+            reset, changed_after = after["reset"], after["changed_after"]
+
+        queries = {
+            "products": (self.db.query(Product), (Product.updated_at, Product.id)),
+            "trades": (self.db.query(Trade), (Trade.updated_at, Trade.id)),
+            "sent_offers": (
+                self.db.query(Offer).filter(Offer.user_id == user_id),
+                (Offer.updated_at, Offer.trade_id, Offer.user_id),
+            ),
+            # an offer on a user's own trade can't also be from them, so the two never overlap
+            "received_offers": (
+                self.db.query(Offer).join(Offer.trade).filter(Trade.user_id == user_id),
+                (Offer.updated_at, Offer.trade_id, Offer.user_id),
+            ),
+        }
+        tombstones = self.db.query(Tombstone).filter(
+            or_(Tombstone.visible_to.is_(None), Tombstone.visible_to.any(user_id)),
+        )
+        if reset:
+            # the client drops its copy, so only deletions since the first page matter (none on that page)
+            tombstones = tombstones.filter(Tombstone.deleted_at > after["started_at"])
+        queries["tombstones"] = (tombstones, (Tombstone.deleted_at, Tombstone.id))
+        profile = self.db.query(Profile).filter(Profile.user_id == user_id)
+        if changed_after is not None:
+            profile = profile.filter(Profile.updated_at > changed_after)
+
+        rows, cut_off, next_position = {}, [], dict(after)
+        for kind, (query, keys) in queries.items():
+            if changed_after is not None:
+                query = query.filter(keys[0] > changed_after)
+            position = after.get(kind)
+            if position:
+                query = query.filter(tuple_(*keys) > tuple_(*position))
+            # fetch one extra row to find out whether the kind was cut off
+            page = query.order_by(*keys).limit(limit + 1).all()
+            rows[kind] = page[:limit]
+            if rows[kind]:
+                position = tuple(getattr(rows[kind][-1], key.key) for key in keys)
+            next_position[kind] = position
+            if len(page) > limit:
+                cut_off.append(position[0])
+
+        return {
+            "watermark": min(cut_off) if cut_off else now,
+            "reset": reset,
+            "products": rows["products"],
+            "trades": rows["trades"],
+            "offers": rows["sent_offers"] + rows["received_offers"],
+            "profile": profile.first(),
+            "tombstones": rows["tombstones"],
+            "next": next_position if cut_off else None,
+        }
+
+    def prune_tombstones(self) -> int:
+        """
+        Delete tombstones past the retention window. Returns how many were removed.
+        """
+        removed = self.db.query(Tombstone).filter(
+            Tombstone.deleted_at < func.now() - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS),
+        ).delete(synchronize_session=False)
+        self.db.commit()
+        return removed
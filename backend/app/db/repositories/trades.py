@@ -1,18 +1,93 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 from fastapi.exceptions import HTTPException
+from sqlalchemy import Integer, any_, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlalchemy.orm.session import Session
 from starlette.status import HTTP_400_BAD_REQUEST
-from app.db.metadata import Trade
+from app.db.metadata import FeedEntry, Product, Trade
 from app.db.repositories.base import BaseRepository
+from app.db.repositories.feed import FeedRepository
+from app.db.repositories.facets import FacetsRepository, facet_value, trade_facets
+from app.db.repositories.outbox import OutboxRepository
+from app.db.repositories.price_stats import PriceStatsRepository
+from app.db.repositories.swaps import SwapsRepository
+from app.db.repositories.sync import SyncRepository
 from app.models.trade import TradeCreate, TradeUpdate
 
 
 class TradeRepository(BaseRepository):
+
+    def __init__(self, db: Session) -> None:
+        super().__init__(db)
+        self.facets_repo = FacetsRepository(db)
+        self.outbox_repo = OutboxRepository(db)
+        self.swaps_repo = SwapsRepository(db)
+        self.price_stats_repo = PriceStatsRepository(db)
+        self.feed_repo = FeedRepository(db)
+        self.sync_repo = SyncRepository(db)
+
+    def queue_trade_event(self, *, event_type: str, trade: Trade) -> None:
+        self.outbox_repo.add_message(
+            topic=event_type,
+            payload={
+                "type": event_type,
+                "trade_id": trade.id,
+                "user_id": trade.user_id,
+                "product_id": trade.product_id,
+                "what_do": facet_value(trade.what_do),
+                "size": facet_value(trade.size),
+                "price": float(trade.price) if trade.price is not None else None,
+            },
+        )
+
     def create_trade(self, *, trade_create: TradeCreate, user_id:int):
         created_trade = Trade(**trade_create.dict(), user_id=user_id)
+        product_type = self.db.query(Product.type).filter(Product.id == trade_create.product_id).scalar()
         self.db.add(created_trade)
+        self.adjust_product_trade_count(product_id=trade_create.product_id, delta=1)
+        self.facets_repo.adjust(
+            facets=trade_facets(what_do=created_trade.what_do, size=created_trade.size, product_type=product_type),
+            delta=1,
+        )
+        self.price_stats_repo.adjust(
+            product_id=created_trade.product_id, product_type=product_type, price=created_trade.price, delta=1,
+        )
+        # flush for the new trade's id
+        self.db.flush()
+        self.queue_trade_event(event_type="trade.created", trade=created_trade)
+        self.feed_repo.refresh_trades(trade_ids=[created_trade.id])
         self.db.commit()
         self.db.refresh(created_trade)
         return created_trade
 
+    def adjust_product_trade_count(self, *, product_id: int, delta: int) -> None:
+        self.db.query(Product).filter(Product.id == product_id).update(
+            {Product.active_trade_count: Product.active_trade_count + delta}, synchronize_session=False,
+        )
+
+    def repair_offer_counts(self) -> int:
+        """
+        Recompute offer_count / pending_offer_count from the offer table and fix any trade that drifted.
+        Returns the number of trades that were corrected.
+        """
+        result = self.db.execute(text("""
+            UPDATE trade SET offer_count = c.offer_count, pending_offer_count = c.pending_offer_count
+            FROM (
+                SELECT trade.id AS trade_id,
+                       count(offer.trade_id) AS offer_count,
+                       count(offer.trade_id) FILTER (WHERE offer.status = 'pending') AS pending_offer_count
+                FROM trade LEFT JOIN offer ON offer.trade_id = trade.id
+                GROUP BY trade.id
+            ) AS c
+            WHERE trade.id = c.trade_id
+              AND (trade.offer_count, trade.pending_offer_count) IS DISTINCT FROM (c.offer_count, c.pending_offer_count)
+        """))
+        self.db.commit()
+        return result.rowcount
+
     def get_trade_by_id(self,*,id:int):
         trade = self.db.query(Trade).filter(Trade.id == id).first()
         if not trade:
@@ -20,6 +95,12 @@ class TradeRepository(BaseRepository):
 
         return trade
 
+    def get_trades_by_ids(self, *, ids:List[int]) -> List[Trade]:
+        if not ids:
+            return []
+        return self.db.query(Trade).options(joinedload(Trade.product), joinedload(Trade.user)).\
+            filter(Trade.id == any_(array(ids))).all()
+
     def get_trades_by_user_id(self, *, user_id:int):
         trades = self.db.query(Trade).filter(Trade.user_id == user_id).all()
         if not trades:
@@ -42,14 +123,108 @@ class TradeRepository(BaseRepository):
     def get_all_trades(self):
         return self.db.query(Trade).all()
 
+    def browse_trades(
+        self,
+        *,
+        what_do: Optional[List[str]] = None,
+        sizes: Optional[List[str]] = None,
+        product_types: Optional[List[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        before_id: Optional[int] = None,
+        limit: int = 20,
+    ) -> List[Trade]:
+        """
+        Newest trades matching every given filter, paged on trade id
+        """
+        query = self.db.query(Trade).join(Trade.product).\
+            options(contains_eager(Trade.product), joinedload(Trade.user))
+        if what_do:
+            query = query.filter(Trade.what_do.in_(what_do))
+        if sizes:
+            query = query.filter(Trade.size.in_(sizes))
+        if product_types:
+            query = query.filter(Product.type.in_(product_types))
+        if min_price is not None:
+            query = query.filter(Trade.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Trade.price <= max_price)
+        if before_id is not None:
+            query = query.filter(Trade.id < before_id)
+        return query.order_by(Trade.id.desc()).limit(limit).all()
+
+    def list_feed(self, *, after: Optional[Tuple[datetime, int]] = None, limit: int = 20) -> List[FeedEntry]:
+        return self.feed_repo.list_entries(after=after, limit=limit)
+
+    def get_facet_counts(self) -> Dict[str, Dict[str, int]]:
+        return self.facets_repo.get_facet_counts()
+
     def delete_trade_by_id(self,*,trade:Trade):
         deleted_id = trade.id
+        self.facets_repo.adjust_for_trades(trades=[trade], delta=-1)
+        self.adjust_product_trade_count(product_id=trade.product_id, delta=-1)
+        self.price_stats_repo.adjust_for_trades(trades=[trade], delta=-1)
+        self.queue_trade_event(event_type="trade.deleted", trade=trade)
+        self.swaps_repo.remove_matches_for_trades(trade_ids=[trade.id])
+        self.sync_repo.add_tombstones(kind="trade", item_ids=[trade.id])
         self.db.delete(trade)
         self.db.commit()
         return deleted_id
 
-    def update_trade(self,*, trade:Trade, trade_update: TradeUpdate):
+    def archive_stale_trades(self, *, older_than: timedelta, batch_size: int) -> int:
+        """
+        Move up to batch_size trades created more than older_than ago, with no pending or accepted
+        offer, into trade_archive (with their offers and offer history) and delete them, then commit. Trades locked by
+        another transaction are skipped. Returns the number archived.
+        """
+        trade_ids = self.db.execute(
+            text("""
+                SELECT id FROM trade
+                WHERE created_at < now() - :older_than AND pending_offer_count = 0
+                  AND NOT EXISTS (SELECT 1 FROM offer WHERE offer.trade_id = trade.id AND offer.status = 'accepted')
+                ORDER BY created_at
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+            """),
+            {"older_than": older_than, "batch_size": batch_size},
+        ).scalars().all()
+        if not trade_ids:
+            self.db.commit()
+            return 0
+        self.db.execute(
+            text("""
+                INSERT INTO trade_archive (id, user_id, product_id, trade, offers, offer_events)
+                SELECT trade.id, trade.user_id, trade.product_id, to_jsonb(trade),
+                       coalesce((SELECT jsonb_agg(to_jsonb(offer)) FROM offer WHERE offer.trade_id = trade.id), '[]'),
+                       coalesce((
+                           SELECT jsonb_agg(to_jsonb(offer_event) ORDER BY offer_event.id)
+                           FROM offer_event WHERE offer_event.trade_id = trade.id
+                       ), '[]')
+                FROM trade WHERE trade.id = ANY(:trade_ids)
+                ON CONFLICT (id) DO NOTHING
+            """).bindparams(bindparam("trade_ids", type_=ARRAY(Integer))),
+            {"trade_ids": trade_ids},
+        )
+        # the same bookkeeping as delete_trade_by_id, once for the whole batch
+        trades = self.db.query(Trade).options(joinedload(Trade.product)).filter(Trade.id.in_(trade_ids)).all()
+        self.facets_repo.adjust_for_trades(trades=trades, delta=-1)
+        self.price_stats_repo.adjust_for_trades(trades=trades, delta=-1)
+        for product_id, removed in sorted(Counter(t.product_id for t in trades).items()):
+            self.adjust_product_trade_count(product_id=product_id, delta=-removed)
+        for trade in trades:
+            self.queue_trade_event(event_type="trade.deleted", trade=trade)
+        self.swaps_repo.remove_matches_for_trades(trade_ids=trade_ids)
+        self.sync_repo.add_tombstones(kind="trade", item_ids=trade_ids)
+        self.db.query(Trade).filter(Trade.id.in_(trade_ids)).delete(synchronize_session=False)
+        self.db.commit()
+        return len(trade_ids)
+
+    def update_trade(self,*, trade:Trade, trade_update: TradeUpdate, expected_version: Optional[int] = None):
+        self.check_version(record=trade, expected_version=expected_version)
         update_performed = False
+        was_swappable = facet_value(trade.what_do) == "trade"
+        old_price = trade.price
+        old_facets = trade_facets(what_do=trade.what_do, size=trade.size, product_type=trade.product.type)
 
         for var,value in vars(trade_update).items():
             if value or str(value) == 'False':
@@ -61,9 +236,28 @@ class TradeRepository(BaseRepository):
                 status_code=HTTP_400_BAD_REQUEST,
                 detail="No valid update parameters. No update performed",
             )
+        self.flush_versioned()
+
+        new_facets = trade_facets(what_do=trade.what_do, size=trade.size, product_type=trade.product.type)
+        if new_facets != old_facets:
+            self.facets_repo.adjust(facets=old_facets, delta=-1)
+            self.facets_repo.adjust(facets=new_facets, delta=1)
+        if trade.price != old_price:
+            self.price_stats_repo.adjust(
+                product_id=trade.product_id, product_type=trade.product.type, price=old_price, delta=-1,
+            )
+            self.price_stats_repo.adjust(
+                product_id=trade.product_id, product_type=trade.product.type, price=trade.price, delta=1,
+            )
+        if was_swappable and facet_value(trade.what_do) != "trade":
+            self.swaps_repo.remove_matches_for_trades(trade_ids=[trade.id])
 
         try:
             self.db.add(trade)
+            self.queue_trade_event(event_type="trade.updated", trade=trade)
+            # the feed row is rebuilt from the trade table, so the changes have to be there first
+            self.db.flush()
+            self.feed_repo.refresh_trades(trade_ids=[trade.id])
             self.db.commit()
             self.db.refresh(trade)
             return trade
@@ -72,4 +266,4 @@ class TradeRepository(BaseRepository):
             raise HTTPException(
                 status_code=HTTP_400_BAD_REQUEST, 
                 detail="Invalid update params.",                
-            )
\ No newline at end of file
+            )
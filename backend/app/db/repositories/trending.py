@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import delete, insert
+
+from app.db.metadata import TrendingScore
+from app.db.repositories.base import BaseRepository
+
+
+class TrendingRepository(BaseRepository):
+    def load_scores(self, *, kind: str) -> List[Tuple[int, float, datetime]]:
+        return self.db.query(TrendingScore.item_id, TrendingScore.score, TrendingScore.updated_at).\
+            filter(TrendingScore.kind == kind).all()
+
+    def save_scores(self, *, kind: str, scores: List[Tuple[int, float]], at: datetime) -> None:
+        """
+        Replace the checkpoint for kind in one transaction
+        """
+        self.db.execute(delete(TrendingScore.__table__).where(TrendingScore.kind == kind))
+        if scores:
+            self.db.execute(
+                insert(TrendingScore.__table__),
+                [{"kind": kind, "item_id": item_id, "score": score, "updated_at": at} for item_id, score in scores],
+            )
+        self.db.commit()
@@ -7,7 +7,7 @@ from app.db.repositories.base import BaseRepository
 from app.db.repositories.profiles import ProfilesRepository
 from app.models.profile import ProfileCreate, ProfilePublic
 from app.models.user import UserCreate, UserPublic, UserUpdate, UserInDB
-from app.db.metadata import User
+from app.db.metadata import Profile, User
 from app.services import auth_service
 
 class UsersRepository(BaseRepository):
@@ -46,11 +46,11 @@ class UsersRepository(BaseRepository):
         
         user_password_update = self.auth_service.create_salt_and_hashed_password(plaintext_password=new_user.password)
         created_user = User(**dict(new_user.dict(),**user_password_update.dict()))
+        # the user and their empty profile commit together
+        created_user.profile = Profile()
         self.db.add(created_user)
         self.db.commit()
         self.db.refresh(created_user)
-
-        self.profiles_repo.create_profile_for_user(profile_create=ProfileCreate(user_id=created_user.id))
         return created_user
 
     def authenticate_user(self, *, email: EmailStr, password: str):
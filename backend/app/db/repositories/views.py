@@ -0,0 +1,53 @@
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import BigInteger, Integer, LargeBinary, Text, bindparam, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from app.db.metadata import ViewCount
+from app.db.repositories.base import BaseRepository
+
+ViewKey = Tuple[str, int]
+
+MERGE_VIEWS_SQL = text("""
+    UPDATE view_count SET views = view_count.views + v.views, unique_viewers = v.unique_viewers, updated_at = now()
+    FROM unnest(:kinds, :item_ids, :views, :unique_viewers) AS v(kind, item_id, views, unique_viewers)
+    WHERE view_count.kind = v.kind AND view_count.item_id = v.item_id
+""").bindparams(
+    bindparam("kinds", type_=ARRAY(Text)),
+    bindparam("item_ids", type_=ARRAY(Integer)),
+    bindparam("views", type_=ARRAY(BigInteger)),
+    bindparam("unique_viewers", type_=ARRAY(LargeBinary)),
+)
+
+
+class ViewsRepository(BaseRepository):
+    def get_view_count(self, *, kind: str, item_id: int) -> Optional[ViewCount]:
+        return self.db.query(ViewCount).filter(ViewCount.kind == kind, ViewCount.item_id == item_id).first()
+
+    def lock_view_counts(self, *, keys: List[ViewKey]) -> Dict[ViewKey, Optional[bytes]]:
+        """
+        Make sure a row exists for every key and lock them all, in key order so concurrent flushes
+        from other workers can't deadlock. Returns each row's stored unique_viewers.
+        """
+        keys = sorted(keys)
+        self.db.execute(
+            insert(ViewCount.__table__).
+                values([{"kind": kind, "item_id": item_id} for kind, item_id in keys]).
+                on_conflict_do_nothing()
+        )
+        rows = self.db.query(ViewCount.kind, ViewCount.item_id, ViewCount.unique_viewers).\
+            filter(tuple_(ViewCount.kind, ViewCount.item_id).in_(keys)).\
+            order_by(ViewCount.kind, ViewCount.item_id).with_for_update().all()
+        return {(row.kind, row.item_id): row.unique_viewers for row in rows}
+
+    def add_views(self, *, counts: Dict[ViewKey, Tuple[int, bytes]]) -> None:
+        """
+        Add views and overwrite the merged unique_viewers for rows locked by lock_view_counts, in one statement
+        """
+        keys = sorted(counts)
+        self.db.execute(MERGE_VIEWS_SQL, {
+            "kinds": [kind for kind, _ in keys],
+            "item_ids": [item_id for _, item_id in keys],
+            "views": [counts[k][0] for k in keys],
+            "unique_viewers": [counts[k][1] for k in keys],
+        })
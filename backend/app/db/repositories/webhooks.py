@@ -0,0 +1,113 @@
+import json
+import secrets
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.db.metadata import WebhookDeadLetter, WebhookDelivery, WebhookSubscription
+from app.db.repositories.base import BaseRepository
+from app.models.webhook import WebhookSubscriptionCreate
+
+
+class WebhooksRepository(BaseRepository):
+    def create_subscription(self, *, user_id: int, subscription_create: WebhookSubscriptionCreate) -> WebhookSubscription:
+        subscription = WebhookSubscription(
+            user_id=user_id,
+            url=str(subscription_create.url),
+            secret=secrets.token_hex(32),
+            events=[e.value for e in subscription_create.events],
+        )
+        self.db.add(subscription)
+        self.db.commit()
+        self.db.refresh(subscription)
+        return subscription
+
+    def list_subscriptions_for_user(self, *, user_id: int) -> List[WebhookSubscription]:
+        return self.db.query(WebhookSubscription).filter(WebhookSubscription.user_id == user_id).\
+            order_by(WebhookSubscription.id).all()
+
+    def get_subscription_for_user(self, *, id: int, user_id: int) -> Optional[WebhookSubscription]:
+        return self.db.query(WebhookSubscription).\
+            filter(WebhookSubscription.id == id, WebhookSubscription.user_id == user_id).first()
+
+    def delete_subscription(self, *, subscription: WebhookSubscription) -> int:
+        deleted_id = subscription.id
+        self.db.delete(subscription)
+        self.db.commit()
+        return deleted_id
+
+    def add_deliveries(self, *, events: List[Tuple[int, dict]]) -> int:
+        """
+        Queue each (user_id, event) for every active subscription of user_id that wants event["type"],
+        in one INSERT, and commit. Returns how many deliveries were queued.
+        """
+        if not events:
+            return 0
+        queued = self.db.execute(
+            text("""
+                INSERT INTO webhook_delivery (subscription_id, event)
+                SELECT s.id, item -> 'event'
+                FROM jsonb_array_elements(CAST(:items AS jsonb)) WITH ORDINALITY AS i(item, n)
+                JOIN webhook_subscription AS s ON s.user_id = (item ->> 'user_id')::int
+                WHERE s.is_active AND (cardinality(s.events) = 0 OR item -> 'event' ->> 'type' = ANY(s.events))
+                ORDER BY i.n, s.id
+            """),
+            {"items": json.dumps([{"user_id": user_id, "event": event} for user_id, event in events])},
+        ).rowcount
+        self.db.commit()
+        return queued
+
+    def claim_deliveries(self, *, max_subscriptions: int, batch_size: int, lease_seconds: int) -> List[dict]:
+        """
+        Lease up to max_subscriptions subscriptions that have deliveries waiting and return each with
+        its oldest batch_size deliveries (delivery_ids and payloads, in order). The lease is on the
+        subscription so only one worker sends to an endpoint at a time; subscriptions served least
+        recently come first.
+        """
+        rows = self.db.execute(text("""
+            WITH claimed AS (
+                UPDATE webhook_subscription SET locked_until = now() + make_interval(secs => :lease_seconds)
+                WHERE id IN (
+                    SELECT s.id FROM webhook_subscription AS s
+                    WHERE (s.locked_until IS NULL OR s.locked_until < now())
+                      AND EXISTS (SELECT 1 FROM webhook_delivery AS d WHERE d.subscription_id = s.id)
+                    ORDER BY s.locked_until NULLS FIRST, s.id
+                    LIMIT :max_subscriptions
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, user_id, url, secret, events, is_active, created_at, updated_at
+            )
+            SELECT claimed.*, batch.delivery_ids, batch.payloads
+            FROM claimed CROSS JOIN LATERAL (
+                SELECT array_agg(d.id ORDER BY d.id) AS delivery_ids, jsonb_agg(d.event ORDER BY d.id) AS payloads
+                FROM (
+                    SELECT id, event FROM webhook_delivery
+                    WHERE subscription_id = claimed.id
+                    ORDER BY id
+                    LIMIT :batch_size
+                ) AS d
+            ) AS batch
+            ORDER BY claimed.id
+        """), {"max_subscriptions": max_subscriptions, "batch_size": batch_size, "lease_seconds": lease_seconds})
+        claimed = [dict(row) for row in rows.mappings()]
+        self.db.commit()
+        return claimed
+
+    def complete_deliveries(self, *, subscription_id: int, delivery_ids: List[int]) -> None:
+        """
+        Drop delivered (or dead-lettered) deliveries and release the subscription's lease, then commit
+        """
+        self.db.query(WebhookDelivery).filter(WebhookDelivery.id.in_(delivery_ids)).\
+            delete(synchronize_session=False)
+        # an expired lease rather than none, so the subscription goes to the back of claim_deliveries' queue;
+        # in SQL so updated_at keeps meaning the subscription was edited
+        self.db.execute(
+            text("UPDATE webhook_subscription SET locked_until = now() WHERE id = :id"), {"id": subscription_id},
+        )
+        self.db.commit()
+
+    def add_dead_letter(
+        self, *, subscription_id: int, delivery_ids: List[int], events: List[dict], attempts: int, error: str,
+    ) -> None:
+        self.db.add(WebhookDeadLetter(subscription_id=subscription_id, events=events, attempts=attempts, last_error=error))
+        self.complete_deliveries(subscription_id=subscription_id, delivery_ids=delivery_ids)
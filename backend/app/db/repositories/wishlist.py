@@ -0,0 +1,46 @@
+from typing import List
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.session import Session
+
+from app.db.metadata import WishlistItem
+from app.db.repositories.base import BaseRepository
+from app.db.repositories.outbox import OutboxRepository
+from app.db.repositories.swaps import SwapsRepository
+
+
+class WishlistRepository(BaseRepository):
+
+    def __init__(self, db: Session) -> None:
+        super().__init__(db)
+        self.swaps_repo = SwapsRepository(db)
+        self.outbox_repo = OutboxRepository(db)
+
+    def list_items_for_user(self, *, user_id: int) -> List[WishlistItem]:
+        return self.db.query(WishlistItem).options(joinedload(WishlistItem.product)).\
+            filter(WishlistItem.user_id == user_id).order_by(WishlistItem.created_at.desc()).all()
+
+    def get_item(self, *, user_id: int, product_id: int) -> WishlistItem:
+        return self.db.query(WishlistItem).options(joinedload(WishlistItem.product)).\
+            filter(WishlistItem.user_id == user_id, WishlistItem.product_id == product_id).first()
+
+    def add_item(self, *, user_id: int, product_id: int) -> WishlistItem:
+        created = self.db.execute(
+            insert(WishlistItem.__table__).
+                values(user_id=user_id, product_id=product_id).
+                on_conflict_do_nothing().
+                returning(WishlistItem.user_id)
+        ).first()
+        if created:
+            # the new wish can close cycles through any of the user's listings; the worker searches them
+            self.outbox_repo.add_message(topic="wishlist.added", payload={"user_id": user_id, "product_id": product_id})
+        self.db.commit()
+        return self.get_item(user_id=user_id, product_id=product_id)
+
+    def remove_item(self, *, item: WishlistItem) -> int:
+        removed_id = item.product_id
+        self.swaps_repo.remove_matches_for_wish(user_id=item.user_id, product_id=item.product_id)
+        self.db.delete(item)
+        self.db.commit()
+        return removed_id
@@ -0,0 +1,34 @@
+"""
+Check every offer's status against the latest entry in its offer_event history. Both are written in
+the same transaction, so any mismatch means a write path skipped OffersRepository.publish_offer_events
+(or manual SQL); the offending offers are logged for investigation rather than fixed.
+
+    python -m app.jobs.check_offer_events
+"""
+import logging
+
+from app.db.database import SessionLocal
+from app.db.repositories.offers import OffersRepository
+
+logger = logging.getLogger(__name__)
+
+
+def check_offer_events() -> int:
+    db = SessionLocal()
+    try:
+        mismatches = OffersRepository(db).find_status_mismatches()
+    finally:
+        db.close()
+
+    for mismatch in mismatches:
+        logger.warning(
+            "offer %s/%s is %s but its history ends at %s",
+            mismatch["trade_id"], mismatch["user_id"], mismatch["offer_status"], mismatch["event_status"],
+        )
+    logger.info("%s offers disagree with their event history", len(mismatches))
+    return len(mismatches)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    check_offer_events()
@@ -0,0 +1,29 @@
+"""
+Compact change_log: entries older than CHANGE_LOG_COMPACT_AFTER_DAYS are reduced to the newest one per
+row, and delete entries are dropped after CHANGE_LOG_RETENTION_DAYS. A consumer that falls further
+behind than the retention window may miss deletes and should rebuild from the start of the log.
+Run daily.
+
+    python -m app.jobs.compact_change_log
+"""
+import logging
+
+from app.db.database import SessionLocal
+from app.db.repositories.changes import ChangesRepository
+
+logger = logging.getLogger(__name__)
+
+
+def compact_change_log() -> None:
+    db = SessionLocal()
+    try:
+        superseded, deletes = ChangesRepository(db).compact()
+    finally:
+        db.close()
+
+    logger.info("removed %s superseded and %s expired delete entries from change_log", superseded, deletes)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    compact_change_log()
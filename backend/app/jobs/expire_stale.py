@@ -0,0 +1,86 @@
+"""
+Expire offers that have been pending for more than OFFER_PENDING_TTL_DAYS and, when
+TRADE_ARCHIVE_AFTER_DAYS is set, archive trades older than that with nothing pending or accepted.
+
+    python -m app.jobs.expire_stale [--every SECONDS] [--max-batches N]
+
+Work is done in batches of EXPIRY_BATCH_SIZE rows, each its own short transaction claimed with
+FOR UPDATE SKIP LOCKED, with EXPIRY_BATCH_PAUSE_SECONDS between batches. Rows a user is writing at
+the same moment are skipped and picked up by the next run. Progress is logged after every batch.
+Without --every it drains the backlog once and exits (for cron); with it, it runs as a scheduler.
+"""
+import argparse
+import logging
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from app.core.config import (
+    EXPIRY_BATCH_PAUSE_SECONDS, EXPIRY_BATCH_SIZE, OFFER_PENDING_TTL_DAYS, TRADE_ARCHIVE_AFTER_DAYS,
+)
+from app.db.database import SessionLocal
+from app.db.repositories.offers import OffersRepository
+from app.db.repositories.trades import TradeRepository
+
+logger = logging.getLogger(__name__)
+
+
+def run_batches(*, name: str, batch: Callable[[], int], max_batches: Optional[int] = None) -> Dict[str, float]:
+    """
+    Call batch until it returns less than a full batch, pausing in between. Returns the run's metrics.
+    """
+    started = time.perf_counter()
+    batches, rows = 0, 0
+    while max_batches is None or batches < max_batches:
+        done = batch()
+        batches += 1
+        rows += done
+        elapsed = time.perf_counter() - started
+        logger.info("%s: batch %s, %s rows (%s total, %.0f rows/s)", name, batches, done, rows, rows / elapsed if elapsed else 0)
+        if done < EXPIRY_BATCH_SIZE:
+            break
+        time.sleep(EXPIRY_BATCH_PAUSE_SECONDS)
+    return {"batches": batches, "rows": rows, "seconds": time.perf_counter() - started}
+
+
+def expire_stale(*, max_batches: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+    db = SessionLocal()
+    try:
+        offers_repo = OffersRepository(db)
+        trade_repo = TradeRepository(db)
+        metrics = {
+            "offers": run_batches(
+                name="expire offers",
+                batch=lambda: sum(offers_repo.expire_stale_offers(
+                    ttl=timedelta(days=OFFER_PENDING_TTL_DAYS), batch_size=EXPIRY_BATCH_SIZE,
+                ).values()),
+                max_batches=max_batches,
+            ),
+        }
+        if TRADE_ARCHIVE_AFTER_DAYS:
+            metrics["trades"] = run_batches(
+                name="archive trades",
+                batch=lambda: trade_repo.archive_stale_trades(
+                    older_than=timedelta(days=TRADE_ARCHIVE_AFTER_DAYS), batch_size=EXPIRY_BATCH_SIZE,
+                ),
+                max_batches=max_batches,
+            )
+    finally:
+        db.close()
+
+    for name, run in metrics.items():
+        logger.info("%s: %s rows in %s batches, %.1fs", name, run["rows"], run["batches"], run["seconds"])
+    return metrics
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--every", type=float, help="keep running, starting a new pass this many seconds after the last")
+    parser.add_argument("--max-batches", type=int, help="stop a pass after this many batches per kind")
+    args = parser.parse_args()
+    while True:
+        expire_stale(max_batches=args.max_batches)
+        if args.every is None:
+            break
+        time.sleep(args.every)
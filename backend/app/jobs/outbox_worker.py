@@ -0,0 +1,23 @@
+"""
+Standalone outbox worker, for deployments that set OUTBOX_WORKER_ENABLED=false on the API processes.
+
+    python -m app.jobs.outbox_worker
+"""
+import asyncio
+import logging
+
+from app.services import outbox_worker, webhook_dispatcher
+from app.services import outbox_handlers  # noqa: F401 registers the outbox topic handlers
+
+
+async def run() -> None:
+    await webhook_dispatcher.start()
+    try:
+        await outbox_worker.run_forever()
+    finally:
+        await webhook_dispatcher.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())
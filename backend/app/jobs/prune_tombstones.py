@@ -0,0 +1,27 @@
+"""
+Remove delta-sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS. Clients whose watermark is
+older than that get a full resync instead, so nothing they need is lost. Run daily.
+
+    python -m app.jobs.prune_tombstones
+"""
+import logging
+
+from app.db.database import SessionLocal
+from app.db.repositories.sync import SyncRepository
+
+logger = logging.getLogger(__name__)
+
+
+def prune_tombstones() -> int:
+    db = SessionLocal()
+    try:
+        removed = SyncRepository(db).prune_tombstones()
+    finally:
+        db.close()
+    logger.info("pruned %s tombstones", removed)
+    return removed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    prune_tombstones()
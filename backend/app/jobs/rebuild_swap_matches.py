@@ -0,0 +1,27 @@
+"""
+Recompute swap_match from scratch. Matches are maintained incrementally by the outbox handlers
+as listings and wishes change; this is for the initial backfill or after changing MAX_CYCLE_LENGTH.
+
+    python -m app.jobs.rebuild_swap_matches
+"""
+import logging
+
+from app.db.database import SessionLocal
+from app.db.repositories.swaps import SwapsRepository
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_swap_matches() -> None:
+    db = SessionLocal()
+    try:
+        matched = SwapsRepository(db).rebuild_matches()
+    finally:
+        db.close()
+
+    logger.info("recorded %s swap matches", matched)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    rebuild_swap_matches()
@@ -0,0 +1,75 @@
+"""
+Recompute the "similar products" served by GET /api/products/{id}/similar/.
+
+    python -m app.jobs.refresh_similar_products [--full]
+
+By default only products that gained interest since the last run are recomputed: the products of
+every user who listed something or made an offer after the stored watermark. Their neighbour lists
+are the ones whose co-occurrence counts changed. Other products' scores drift a little as
+popularity shifts and rescinded offers aren't noticed, so run with --full now and then.
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from app.db.database import SessionLocal
+from app.db.repositories.checkpoints import CheckpointsRepository
+from app.db.repositories.similarity import SimilarityRepository
+from app.services.recommender import build_interaction_matrix, top_k_similar
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = "refresh_similar_products"
+
+
+def refresh_similar_products(*, full: bool = False, k: int = 20, batch_size: int = 512) -> int:
+    db = SessionLocal()
+    try:
+        similarity_repo = SimilarityRepository(db)
+        checkpoints_repo = CheckpointsRepository(db)
+        started = time.perf_counter()
+
+        user_ids, product_ids, seen_at = similarity_repo.load_interactions()
+        if not len(user_ids):
+            return 0
+        matrix, products = build_interaction_matrix(user_ids, product_ids)
+
+        state = None if full else checkpoints_repo.get_state(name=CHECKPOINT)
+        if state is None:
+            columns = None
+            similarity_repo.remove_products_without_interest(product_ids=products)
+        else:
+            active_users = np.unique(user_ids[seen_at > state["watermark"]])
+            changed_products = np.unique(product_ids[np.isin(user_ids, active_users)])
+            columns = np.searchsorted(products, changed_products)
+
+        refreshed = 0
+        neighbours = top_k_similar(matrix, products, k=k, columns=columns, batch_size=batch_size)
+        while True:
+            batch = [row for _, row in zip(range(batch_size), neighbours)]
+            if not batch:
+                break
+            similarity_repo.replace_neighbours(neighbours=batch)
+            db.commit()
+            refreshed += len(batch)
+
+        checkpoints_repo.save_state(name=CHECKPOINT, state={"watermark": float(seen_at.max())})
+    finally:
+        db.close()
+
+    logger.info(
+        "refreshed neighbours of %s products from %s interactions in %.1fs",
+        refreshed, len(user_ids), time.perf_counter() - started,
+    )
+    return refreshed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="recompute every product, not just the changed ones")
+    parser.add_argument("-k", type=int, default=20, help="neighbours kept per product")
+    args = parser.parse_args()
+    refresh_similar_products(full=args.full, k=args.k)
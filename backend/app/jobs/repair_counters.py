@@ -0,0 +1,40 @@
+"""
+Consistency repair for the denormalized counters (trade.offer_count / pending_offer_count,
+product.active_trade_count, user.follower_count, trade_facet_count and price_rollup_bucket). The repositories keep
+them up to date on every write; this job only exists to catch drift, e.g. after manual SQL or a
+restored backup.
+
+    python -m app.jobs.repair_counters
+"""
+import logging
+
+from app.db.database import SessionLocal
+from app.db.repositories.facets import FacetsRepository
+from app.db.repositories.follows import FollowsRepository
+from app.db.repositories.price_stats import PriceStatsRepository
+from app.db.repositories.products import ProductsRepository
+from app.db.repositories.trades import TradeRepository
+
+logger = logging.getLogger(__name__)
+
+
+def repair_counters() -> None:
+    db = SessionLocal()
+    try:
+        fixed_trades = TradeRepository(db).repair_offer_counts()
+        fixed_products = ProductsRepository(db).repair_trade_counts()
+        fixed_users = FollowsRepository(db).repair_follower_counts()
+        FacetsRepository(db).repair_facet_counts()
+        PriceStatsRepository(db).repair_price_rollups()
+    finally:
+        db.close()
+
+    logger.info(
+        "repaired offer counts on %s trades, trade counts on %s products and follower counts on %s users",
+        fixed_trades, fixed_products, fixed_users,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    repair_counters()
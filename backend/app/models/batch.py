@@ -0,0 +1,39 @@
+from enum import Enum
+from typing import Any, List, Optional
+
+from pydantic import validator
+
+from app.core.config import API_PREFIX
+from app.models.core import CoreModel
+
+
+class BatchMethod(str, Enum):
+    get = "GET"
+    post = "POST"
+    put = "PUT"
+    delete = "DELETE"
+
+
+class BatchSubRequest(CoreModel):
+    """
+    One API call inside a batch. The path includes the api prefix and any query string,
+    e.g. "/api/trade/?ids=1&ids=2"
+    """
+    method: BatchMethod = BatchMethod.get
+    path: str
+    body: Optional[Any]
+
+    @validator("path")
+    def path_is_api_path(cls, path: str) -> str:
+        assert path.startswith(f"{API_PREFIX}/"), f"Batched paths must start with {API_PREFIX}/."
+        assert not path.startswith(f"{API_PREFIX}/batch"), "Batches can't be nested."
+        return path
+
+
+class BatchSubResponse(CoreModel):
+    status_code: int
+    body: Optional[Any]
+
+
+class BatchResponse(CoreModel):
+    responses: List[BatchSubResponse]
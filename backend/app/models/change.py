@@ -0,0 +1,46 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from app.models.core import CoreModel
+
+
+class ChangeEntity(str, Enum):
+    product = "product"
+    trade = "trade"
+    offer = "offer"
+
+
+class ChangeOp(str, Enum):
+    insert = "insert"
+    update = "update"
+    delete = "delete"
+
+
+class Change(CoreModel):
+    """
+    One row change. key identifies the row ({"id": ...}, or {"trade_id": ..., "user_id": ...} for
+    offers) and data is the whole row after the change, null for deletes.
+    """
+    id: int
+    txid: int
+    entity: ChangeEntity
+    op: ChangeOp
+    key: dict
+    data: Optional[dict]
+    created_at: datetime
+
+    @classmethod
+    def from_entry(cls, entry) -> "Change":
+        return cls(
+            id=entry.id, txid=entry.txid, entity=entry.entity, op=entry.op, key=entry.entity_key,
+            data=entry.data, created_at=entry.created_at,
+        )
+
+
+class ChangePage(CoreModel):
+    """
+    next_cursor is always set; pass it back to continue after the last change, even from an empty page
+    """
+    changes: List[Change]
+    next_cursor: Optional[str]
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import List, Optional
+
+from app.models.core import CoreModel
+from app.models.product import ProductType
+from app.models.trade import Size, WhatDo
+
+
+class FeedEntry(CoreModel):
+    """
+    One trade as the marketplace feed shows it, with its product and owner already denormalised
+    """
+    trade_id: int
+    created_at: datetime
+    what_do: WhatDo
+    size: Optional[Size]
+    price: Optional[float]
+    product_id: int
+    product_name: str
+    brand: Optional[str]
+    product_type: ProductType
+    user_id: int
+    username: str
+
+    class Config:
+        orm_mode = True
+
+
+class FeedPage(CoreModel):
+    entries: List[FeedEntry]
+    next_cursor: Optional[str]
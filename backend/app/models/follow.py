@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import List, Optional
+
+from app.models.core import CoreModel
+from app.models.trade import TradePublic
+
+
+class FollowedUser(CoreModel):
+    id: int
+    username: str
+    followed_at: Optional[datetime]
+
+
+class PersonalFeedPage(CoreModel):
+    trades: List[TradePublic]
+    next_cursor: Optional[str]
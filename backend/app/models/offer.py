@@ -1,9 +1,10 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 from enum import Enum
 
 from app.models.core import DateTimeModelMixin, CoreModel
 from app.models.user import UserPublic
-from app.models.trade import TradePublic
+from app.models.trade import TradePublic, TradePublicByUser
 
 
 class OfferStatus(str, Enum):
@@ -11,6 +12,7 @@ class OfferStatus(str, Enum):
     rejected = "rejected"
     pending = "pending"
     cancelled = "cancelled"
+    expired = "expired"
 
 
 class OfferBase(CoreModel):
@@ -43,3 +45,46 @@ class OfferPublic(OfferInDB):
     class Config:
         orm_mode = True
 
+
+
+class OfferInboxItem(OfferInDB):
+    """
+    An offer together with the trade (and product) it was made on
+    """
+    trade: TradePublicByUser
+
+    class Config:
+        orm_mode = True
+
+
+class OfferInboxPage(CoreModel):
+    offers: List[OfferInboxItem]
+    next_cursor: Optional[str]
+
+
+class OfferEventPublic(CoreModel):
+    """
+    One status change of the offer user_id made on trade_id. status is an OfferStatus, or "rescinded"
+    when the offer was withdrawn.
+    """
+    id: int
+    trade_id: int
+    user_id: int
+    status: str
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class OfferTimeline(CoreModel):
+    events: List[OfferEventPublic]
+    next_cursor: Optional[str]
+
+
+class OfferBulkResult(CoreModel):
+    """
+    How many offers a bulk action changed, in total and per trade
+    """
+    affected: int
+    by_trade: Dict[int, int] = {}
@@ -3,6 +3,7 @@ from typing import List, Optional
 from app.models.core import CoreModel
 from app.models.core import IDModelMixin
 from app.models.core import DateTimeModelMixin
+from app.models.views import ViewCounts
 
 class ProductType(str,Enum):
     dunno = "idk, a bottle"
@@ -32,13 +33,38 @@ class ProductUpdate(ProductBase):
 class ProductInDB(IDModelMixin,DateTimeModelMixin, ProductBase):
     product_name: str
     type: ProductType
+    active_trade_count: int = 0
 
     class Config:
         orm_mode = True
 
+class SimilarProduct(ProductInDB):
+    """
+    A product people interested in another product were also interested in; score is the cosine
+    similarity of their interest, from 0 to 1
+    """
+    score: float
+
+class PriceStats(CoreModel):
+    """
+    Prices are approximate: each is within 1% of a real listed price
+    """
+    count: int = 0
+    min: Optional[float]
+    median: Optional[float]
+    p90: Optional[float]
+    max: Optional[float]
+
+class ProductPriceStats(CoreModel):
+    product_id: int
+    product_type: ProductType
+    product: PriceStats
+    type: PriceStats
+
 class ProductPublic(ProductInDB):
     type: ProductType
     instances: "Optional[List[TradePublicByProduct]]"
+    views: Optional[ViewCounts]
     
     class Config:
         orm_mod = True
@@ -0,0 +1,37 @@
+from typing import List, Optional
+
+from pydantic import confloat
+
+from app.models.core import CoreModel, DateTimeModelMixin, IDModelMixin
+from app.models.product import ProductType
+from app.models.trade import Size, TradePublic
+
+
+class SavedSearchBase(CoreModel):
+    product_id: Optional[int]
+    product_type: Optional[ProductType]
+    size: Optional[Size]
+
+
+class SavedSearchCreate(SavedSearchBase):
+    """
+    Leave an attribute out to match any value of it
+    """
+    max_price: Optional[confloat(ge=0)]
+
+
+class SavedSearchInDB(IDModelMixin, DateTimeModelMixin, SavedSearchBase):
+    user_id: int
+    max_price: Optional[float]
+
+    class Config:
+        orm_mode = True
+
+
+class SavedSearchPublic(SavedSearchInDB):
+    pass
+
+
+class SavedSearchMatchPage(CoreModel):
+    trades: List[TradePublic]
+    next_cursor: Optional[str]
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import List, Optional
+
+from app.models.core import CoreModel
+from app.models.product import ProductInDB
+from app.models.trade import TradePublic
+
+
+class WishlistItemPublic(CoreModel):
+    product_id: int
+    created_at: Optional[datetime]
+    product: ProductInDB
+
+    class Config:
+        orm_mode = True
+
+
+class SwapMatchPublic(CoreModel):
+    """
+    A swap between len(trades) users: each trade's owner gives it to the owner of the
+    next trade, and the last trade goes to the owner of the first
+    """
+    id: int
+    created_at: Optional[datetime]
+    length: int
+    trades: List[TradePublic]
+
+
+class SwapMatchPage(CoreModel):
+    matches: List[SwapMatchPublic]
+    next_cursor: Optional[str]
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import List, Optional
+
+from app.models.core import CoreModel
+from app.models.offer import OfferInDB
+from app.models.product import ProductInDB
+from app.models.profile import ProfileInDB
+from app.models.trade import TradeInDB
+
+
+class Tombstone(CoreModel):
+    """
+    A deleted row. For offers item_id is the trade id and user_id the user who made the offer.
+    """
+    kind: str
+    item_id: int
+    user_id: Optional[int]
+    deleted_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class SyncChanges(CoreModel):
+    """
+    Rows changed since the requested watermark. When reset is true the client's copy is too old to
+    patch and should be replaced with these rows. Either way, apply the rows and then the tombstones.
+    Rows may repeat between syncs, so apply them as upserts. When next_cursor is set some kinds were
+    cut off at the page limit: fetch it for the rest (a reset covers this page and the ones after it,
+    whose tombstones drop rows deleted since the first).
+    """
+    watermark: datetime
+    reset: bool
+    products: List[ProductInDB] = []
+    trades: List[TradeInDB] = []
+    offers: List[OfferInDB] = []
+    profile: Optional[ProfileInDB]
+    tombstones: List[Tombstone] = []
+    next_cursor: Optional[str]
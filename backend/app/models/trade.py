@@ -1,6 +1,7 @@
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional
 from app.models.core import CoreModel, DateTimeModelMixin, IDModelMixin
+from app.models.views import ViewCounts
 
 
 
@@ -32,6 +33,8 @@ class TradeUpdate(TradeBase):
 class TradeInDB(DateTimeModelMixin, IDModelMixin, TradeBase):
     user_id: int
     product_id: int
+    offer_count: int = 0
+    pending_offer_count: int = 0
 
     class Config:
         orm_mode = True
@@ -39,6 +42,7 @@ class TradeInDB(DateTimeModelMixin, IDModelMixin, TradeBase):
 class TradePublic(TradeInDB):
     product: "ProductInDB"
     user: "UserInDB"
+    views: Optional[ViewCounts]
 
     class Config:
         orm_mode = True
@@ -55,6 +59,19 @@ class TradePublicByProduct(TradeInDB):
     class Config:
         orm_mode = True
 
+class TradeFacets(CoreModel):
+    """
+    How many trades are listed under each what_do, size and product type
+    """
+    what_do: Dict[str, int] = {}
+    size: Dict[str, int] = {}
+    type: Dict[str, int] = {}
+
+class TradeBrowsePage(CoreModel):
+    trades: List[TradePublic]
+    facets: TradeFacets
+    next_cursor: Optional[str]
+
 from app.models.product import ProductInDB
 from app.models.user import UserInDB
 TradePublicByUser.update_forward_refs()
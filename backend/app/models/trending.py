@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import List, Optional
+
+from app.models.core import CoreModel
+from app.models.product import ProductInDB
+from app.models.trade import TradePublic
+
+
+class TrendingTrade(TradePublic):
+    score: float
+
+
+class TrendingProduct(ProductInDB):
+    score: float
+
+
+class TrendingFeed(CoreModel):
+    """
+    Scores are decayed activity counts; they halve every TRENDING_HALF_LIFE_HOURS without new activity
+    """
+    trades: List[TrendingTrade] = []
+    products: List[TrendingProduct] = []
+    generated_at: Optional[datetime]
@@ -0,0 +1,9 @@
+from app.models.core import CoreModel
+
+
+class ViewCounts(CoreModel):
+    """
+    unique_viewers is a HyperLogLog estimate, accurate to a few percent
+    """
+    views: int = 0
+    unique_viewers: int = 0
@@ -0,0 +1,45 @@
+from enum import Enum
+from typing import List
+
+from pydantic import HttpUrl
+
+from app.models.core import CoreModel, DateTimeModelMixin, IDModelMixin
+
+
+class WebhookEvent(str, Enum):
+    offer_pending = "offer.pending"
+    offer_accepted = "offer.accepted"
+    offer_rejected = "offer.rejected"
+    offer_cancelled = "offer.cancelled"
+    offer_rescinded = "offer.rescinded"
+    offer_expired = "offer.expired"
+    trade_created = "trade.created"
+    trade_updated = "trade.updated"
+    trade_deleted = "trade.deleted"
+    search_matched = "search.matched"
+
+
+class WebhookSubscriptionCreate(CoreModel):
+    """
+    Leave events empty to receive every event type
+    """
+    url: HttpUrl
+    events: List[WebhookEvent] = []
+
+
+class WebhookSubscriptionInDB(IDModelMixin, DateTimeModelMixin, CoreModel):
+    user_id: int
+    url: str
+    secret: str
+    events: List[str] = []
+    is_active: bool = True
+
+    class Config:
+        orm_mode = True
+
+
+class WebhookSubscriptionPublic(WebhookSubscriptionInDB):
+    """
+    The secret is returned so the receiver can check the X-HairTrade-Signature header
+    """
+    pass
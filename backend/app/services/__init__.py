@@ -1,3 +1,16 @@
+from app.core.config import TRENDING_HALF_LIFE_HOURS
 from app.services.authentication import AuthService
+from app.services.notifications import OfferEventHub
+from app.services.outbox import OutboxWorker
+from app.services.trending import TrendingTracker
+from app.services.views import ViewCounter
+from app.services.webhooks import WebhookDispatcher
 
 auth_service = AuthService()
+offer_event_hub = OfferEventHub()
+outbox_worker = OutboxWorker()
+webhook_dispatcher = WebhookDispatcher()
+trending_tracker = TrendingTracker(half_life=TRENDING_HALF_LIFE_HOURS * 3600)
+view_counter = ViewCounter()
+
+offer_event_hub.add_listener(trending_tracker.record_offer_event)
@@ -0,0 +1,146 @@
+import logging
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    BACKFILL_BATCH_SIZE, BACKFILL_MAX_ACTIVE_QUERIES, BACKFILL_MAX_REPLICATION_LAG_SECONDS, BACKFILL_PAUSE_SECONDS,
+)
+from app.db.database import SessionLocal
+from app.db.repositories.checkpoints import CheckpointsRepository
+
+logger = logging.getLogger(__name__)
+
+# pg_stat_replication is empty without replicas, and its lag columns are NULL without pg_monitor
+REPLICATION_LAG_SQL = "SELECT coalesce(extract(epoch FROM max(replay_lag)), 0) FROM pg_stat_replication"
+ACTIVE_QUERIES_SQL = """
+    SELECT count(*) FROM pg_stat_activity
+    WHERE state = 'active' AND backend_type = 'client backend' AND pid <> pg_backend_pid()
+"""
+
+
+class Backfill:
+    """
+    Runs an UPDATE (or INSERT ... SELECT) over a large table in short transactions, one range of its
+    integer key at a time, instead of one statement that locks every row and writes all its WAL at once.
+    sql is run with :start and :end bound to each range and must only touch rows in it; the table's
+    key is read once, so rows added later are the application's to fill in.
+
+    Each batch commits together with its checkpoint in job_checkpoint under backfill:name, so a run
+    that is stopped picks up at the next range and a finished one does nothing. Between batches it
+    waits while replicas are more than max_replication_lag seconds behind or more than
+    max_active_queries other queries are running. Statements should be idempotent (WHERE col IS
+    NULL), since a batch can run again if the checkpoint is lost, for example inside a migration.
+
+        Backfill(
+            name="trade-search-text",
+            table="trade",
+            sql="UPDATE trade SET search_text = ... WHERE id >= :start AND id < :end AND search_text IS NULL",
+        ).run()
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        table: str,
+        sql: str,
+        key: str = "id",
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        pause_seconds: float = BACKFILL_PAUSE_SECONDS,
+        max_replication_lag: float = BACKFILL_MAX_REPLICATION_LAG_SECONDS,
+        max_active_queries: int = BACKFILL_MAX_ACTIVE_QUERIES,
+    ) -> None:
+        self.name = f"backfill:{name}"
+        self.table = table
+        self.sql = text(sql)
+        self.key = key
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.max_replication_lag = max_replication_lag
+        self.max_active_queries = max_active_queries
+
+    def start(self, db: Session) -> Dict:
+        """
+        The saved progress, or a fresh state covering the table's current key range
+        """
+        state = CheckpointsRepository(db).get_state(name=self.name)
+        if state is not None:
+            return state
+        low, high = db.execute(text(f"SELECT min({self.key}), max({self.key}) FROM {self.table}")).one()
+        db.rollback()
+        return {"start": low, "next": low, "end": high, "rows": 0, "batches": 0, "done": low is None}
+
+    def wait_for_capacity(self, db: Session) -> None:
+        while True:
+            lag = db.execute(text(REPLICATION_LAG_SQL)).scalar()
+            active = db.execute(text(ACTIVE_QUERIES_SQL)).scalar()
+            # don't sit in a transaction while waiting
+            db.rollback()
+            if lag <= self.max_replication_lag and active <= self.max_active_queries:
+                return
+            logger.info("%s: waiting, replication lag %.1fs, %s active queries", self.name, lag, active)
+            time.sleep(max(self.pause_seconds, 1.0))
+
+    def run_batch(self, db: Session, state: Dict) -> Dict:
+        """
+        Apply sql to the next key range and save the new position in the same transaction
+        """
+        end = min(state["next"] + self.batch_size, state["end"] + 1)
+        rows = db.execute(self.sql, {"start": state["next"], "end": end}).rowcount
+        state = {
+            **state,
+            "next": end,
+            "rows": state["rows"] + max(rows, 0),
+            "batches": state["batches"] + 1,
+            "done": end > state["end"],
+        }
+        CheckpointsRepository(db).save_state(name=self.name, state=state)
+        return state
+
+    def run(self, *, db: Optional[Session] = None, max_batches: Optional[int] = None) -> Dict:
+        """
+        Work through the remaining ranges, or max_batches of them. Returns the saved progress.
+        """
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            state = self.start(db)
+            started, batches = time.perf_counter(), 0
+            while not state["done"] and (max_batches is None or batches < max_batches):
+                self.wait_for_capacity(db)
+                state = self.run_batch(db, state)
+                batches += 1
+                elapsed = time.perf_counter() - started
+                covered = (state["next"] - state["start"]) / (state["end"] - state["start"] + 1)
+                logger.info(
+                    "%s: batch %s, up to %s %s of %s (%.0f%%), %s rows (%.0f batches/s)",
+                    self.name, state["batches"], self.key, state["next"], state["end"], min(covered, 1) * 100,
+                    state["rows"], batches / elapsed if elapsed else 0,
+                )
+                if not state["done"]:
+                    time.sleep(self.pause_seconds)
+            if state["done"]:
+                logger.info("%s: done, %s rows in %s batches", self.name, state["rows"], state["batches"])
+            return state
+        finally:
+            if own_session:
+                db.close()
+
+
+def run_in_migration(backfill: Backfill, *, max_batches: Optional[int] = None) -> Dict:
+    """
+    Run backfill from an Alembic revision. The migration's transaction is committed first (so the
+    schema change it depends on is visible and its locks are released) and each batch commits on
+    its own; the rest of the revision runs in a new transaction afterwards.
+    """
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        db = Session(bind=op.get_bind())
+        try:
+            return backfill.run(db=db, max_batches=max_batches)
+        finally:
+            db.close()
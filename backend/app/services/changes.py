@@ -0,0 +1,64 @@
+import logging
+import time
+from typing import Callable, List, Optional
+
+from app.db.database import SessionLocal
+from app.db.repositories.changes import ChangesRepository
+from app.db.repositories.checkpoints import CheckpointsRepository
+from app.models.change import Change
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeConsumer:
+    """
+    Follows the change_log from a position saved in job_checkpoint under name, so a restarted consumer
+    picks up where it stopped. The position is saved after handler returns, so a batch can be handed
+    over again after a crash: handlers must be idempotent (upserting by key is enough).
+
+        def index(changes): ...
+        ChangeConsumer(name="search-indexer", handler=index, entities=["trade"]).run()
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        handler: Callable[[List[Change]], None],
+        entities: Optional[List[str]] = None,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.name = f"changes:{name}"
+        self.handler = handler
+        self.entities = entities
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+    def poll_once(self) -> int:
+        """
+        Hand the next batch to the handler and advance the saved position. Returns the batch size.
+        """
+        db = SessionLocal()
+        try:
+            checkpoints_repo = CheckpointsRepository(db)
+            state = checkpoints_repo.get_state(name=self.name) or {}
+            after = (state["txid"], state["id"]) if state else None
+            entries = ChangesRepository(db).list_changes(after=after, entities=self.entities, limit=self.batch_size)
+            if not entries:
+                return 0
+            changes = [Change.from_entry(e) for e in entries]
+            self.handler(changes)
+            checkpoints_repo.save_state(name=self.name, state={"txid": changes[-1].txid, "id": changes[-1].id})
+            return len(changes)
+        finally:
+            db.close()
+
+    def run(self) -> None:
+        while True:
+            try:
+                if self.poll_once() < self.batch_size:
+                    time.sleep(self.poll_interval)
+            except Exception as e:
+                logger.warning("change consumer %s failed, retrying: %s", self.name, e)
+                time.sleep(self.poll_interval)
@@ -0,0 +1,10 @@
+from app.db.database import SessionLocal
+from app.db.repositories.follows import FollowsRepository
+
+
+def fan_out_trade(*, trade_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return FollowsRepository(db).fan_out_trade(trade_id=trade_id)
+    finally:
+        db.close()
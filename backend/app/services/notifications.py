@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+
+import asyncpg
+
+from app.db.repositories.offers import OFFER_EVENTS_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+class OfferEventHub:
+    """
+    Holds one LISTEN connection per worker and fans offer events out to the websocket / SSE
+    clients subscribed in this process. Each event goes to the trade owner and the offering user only.
+    """
+
+    def __init__(self, *, channel: str = OFFER_EVENTS_CHANNEL, queue_size: int = 100, reconnect_delay: float = 1.0) -> None:
+        self.channel = channel
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._listeners: List[Callable[[dict], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, *, dsn: str) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen_forever(dsn))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @asynccontextmanager
+    async def subscription(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[user_id].discard(queue)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def add_listener(self, listener: Callable[[dict], None]) -> None:
+        """
+        Also hand every event to listener, e.g. to count it. Listeners run on the event loop and must not block.
+        """
+        self._listeners.append(listener)
+
+    def dispatch(self, event: dict) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("offer event listener failed")
+        for user_id in {event.get("trade_owner_id"), event.get("user_id")}:
+            for queue in self._subscribers.get(user_id, ()):
+                if queue.full():
+                    # a slow client loses its oldest events rather than holding up everyone else
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("ignoring malformed %s payload: %s", channel, payload)
+            return
+        self.dispatch(event)
+
+    async def _listen_forever(self, dsn: str) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(self.channel, self._on_notify)
+                await closed.wait()
+                logger.warning("LISTEN connection for %s closed, reconnecting", self.channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("LISTEN connection for %s failed: %s", self.channel, e)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.reconnect_delay)
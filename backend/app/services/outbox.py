@@ -0,0 +1,155 @@
+import asyncio
+import inspect
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import SessionLocal
+from app.db.repositories.outbox import OutboxRepository
+
+logger = logging.getLogger(__name__)
+
+OutboxHandler = Callable[[dict], Union[None, Awaitable[None]]]
+
+
+class OutboxWorker:
+    """
+    Drains the outbox table in batches and runs the handlers registered for each message's topic.
+    Handlers get the message payload and open their own session if they need one; they may be
+    plain functions (run in the threadpool) or coroutines. A failing message is retried with
+    exponential backoff and dead-lettered (failed_at set) after max_attempts. The handlers that
+    succeeded are recorded by name in outbox.handled, so a retry only runs the ones that haven't;
+    a worker that dies mid-message runs them all again, so handlers still have to tolerate seeing
+    a message twice. A message whose topic has no handlers is dead-lettered rather than dropped.
+    Pass topics to have the worker claim only messages on those topics.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        lease_seconds: int = 60,
+        max_attempts: int = 8,
+        base_retry_seconds: float = 2.0,
+        max_retry_seconds: float = 15 * 60,
+        topics: Optional[List[str]] = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_retry_seconds = base_retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.topics = topics
+        self.handlers: Dict[str, List[OutboxHandler]] = defaultdict(list)
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, topic: str) -> Callable[[OutboxHandler], OutboxHandler]:
+        def decorator(handler: OutboxHandler) -> OutboxHandler:
+            self.handlers[topic].append(handler)
+            return handler
+
+        return decorator
+
+    @staticmethod
+    def handler_name(handler: OutboxHandler) -> str:
+        return f"{handler.__module__}.{handler.__qualname__}"
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.base_retry_seconds * 2 ** (attempts - 1), self.max_retry_seconds)
+
+    async def drain_once(self) -> int:
+        """
+        Claim and process one batch. Returns how many messages were claimed.
+        """
+        messages = await run_in_threadpool(self._claim_batch)
+        processed_ids = []
+        for message in messages:
+            handlers = self.handlers.get(message["topic"])
+            if not handlers:
+                logger.warning(
+                    "outbox message %s has no handler for %s, dead-lettering", message["id"], message["topic"],
+                )
+                await run_in_threadpool(
+                    self._mark_failed, message["id"], f"no handler registered for {message['topic']}", 0, True, None,
+                )
+                continue
+            handled = list(message["handled"])
+            try:
+                for handler in handlers:
+                    name = self.handler_name(handler)
+                    if name in handled:
+                        continue
+                    if inspect.iscoroutinefunction(handler):
+                        await handler(message["payload"])
+                    else:
+                        await run_in_threadpool(handler, message["payload"])
+                    handled.append(name)
+                processed_ids.append(message["id"])
+            except Exception as e:
+                dead = message["attempts"] >= self.max_attempts
+                logger.warning(
+                    "outbox message %s (%s) failed on attempt %s%s: %s",
+                    message["id"], message["topic"], message["attempts"], ", dead-lettering" if dead else "", e,
+                )
+                await run_in_threadpool(
+                    self._mark_failed, message["id"], repr(e), self.retry_delay(message["attempts"]), dead, handled,
+                )
+        await run_in_threadpool(self._mark_processed, processed_ids)
+        return len(messages)
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                claimed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("outbox drain failed: %s", e)
+                claimed = 0
+            # keep going straight away while there is a backlog
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _claim_batch(self):
+        db = SessionLocal()
+        try:
+            return OutboxRepository(db).claim_batch(
+                batch_size=self.batch_size, lease_seconds=self.lease_seconds, topics=self.topics,
+            )
+        finally:
+            db.close()
+
+    def _mark_processed(self, ids) -> None:
+        db = SessionLocal()
+        try:
+            OutboxRepository(db).mark_processed(ids=ids)
+        finally:
+            db.close()
+
+    def _mark_failed(
+        self, id: int, error: str, retry_in_seconds: float, dead: bool, handled: Optional[List[str]],
+    ) -> None:
+        db = SessionLocal()
+        try:
+            OutboxRepository(db).mark_failed(
+                id=id, error=error, retry_in_seconds=retry_in_seconds, dead=dead, handled=handled,
+            )
+        finally:
+            db.close()
@@ -0,0 +1,58 @@
+"""
+Handlers for the outbox topics written by the repositories. Importing this module registers
+them on app.services.outbox_worker.
+"""
+from typing import List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.services import outbox_worker, webhook_dispatcher
+from app.services.follows import fan_out_trade
+from app.services.saved_searches import match_saved_searches
+from app.services.swaps import match_swaps_for_trades, match_swaps_for_user
+from app.services.webhooks import queue_webhook_deliveries
+
+
+async def enqueue_webhooks(*, events: List[Tuple[int, dict]]) -> None:
+    # queued in webhook_delivery before the outbox message counts as handled, so nothing is lost in between
+    if await run_in_threadpool(queue_webhook_deliveries, events=events):
+        webhook_dispatcher.wake()
+
+
+@outbox_worker.register("offer.status_changed")
+async def deliver_offer_webhooks(payload: dict) -> None:
+    await enqueue_webhooks(events=[(payload["trade_owner_id"], payload)])
+
+
+@outbox_worker.register("trade.created")
+@outbox_worker.register("trade.updated")
+@outbox_worker.register("trade.deleted")
+async def deliver_trade_webhooks(payload: dict) -> None:
+    await enqueue_webhooks(events=[(payload["user_id"], payload)])
+
+
+@outbox_worker.register("trade.created")
+@outbox_worker.register("trade.updated")
+def match_swaps_for_listing(payload: dict) -> None:
+    # matches a listing leaves are removed in the same transaction as the change; only new ones are found here
+    if payload["what_do"] == "trade":
+        match_swaps_for_trades(trade_ids=[payload["trade_id"]])
+
+
+@outbox_worker.register("wishlist.added")
+def match_swaps_for_wish(payload: dict) -> None:
+    match_swaps_for_user(user_id=payload["user_id"])
+
+
+@outbox_worker.register("trade.created")
+async def notify_saved_searches(payload: dict) -> None:
+    matches = await run_in_threadpool(match_saved_searches, trade_id=payload["trade_id"])
+    await enqueue_webhooks(events=[
+        (user_id, {"type": "search.matched", "search_id": search_id, "trade_id": payload["trade_id"]})
+        for search_id, user_id in matches
+    ])
+
+
+@outbox_worker.register("trade.created")
+def fan_out_to_followers(payload: dict) -> None:
+    fan_out_trade(trade_id=payload["trade_id"])
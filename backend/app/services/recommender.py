@@ -0,0 +1,58 @@
+"""
+Item-item similarity from co-interest. A user is interested in a product if they listed it or made
+an offer on a trade of it; two products are similar when the same users are interested in both.
+"""
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+def build_interaction_matrix(user_ids: np.ndarray, product_ids: np.ndarray) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Binary users x products matrix. Returns it with the product id of each column.
+    """
+    products, columns = np.unique(product_ids, return_inverse=True)
+    users, rows = np.unique(user_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, columns)), shape=(len(users), len(products)),
+    )
+    # repeated (user, product) pairs were summed; interest is yes or no
+    matrix.data[:] = 1
+    return matrix, products
+
+
+def top_k_similar(
+    matrix: sparse.csr_matrix,
+    products: np.ndarray,
+    *,
+    k: int = 20,
+    columns: Optional[np.ndarray] = None,
+    batch_size: int = 512,
+) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    Cosine similarity between product columns, yielding (product_id, neighbour_ids, scores) with at
+    most k neighbours each, best first. Only the given columns are computed when columns is set.
+
+    Similarities are computed batch_size products at a time as one sparse product, so memory stays
+    bounded by the batch rather than the full products x products matrix.
+    """
+    counts = np.asarray(matrix.sum(axis=0)).ravel()
+    normalized = (matrix @ sparse.diags(1 / np.sqrt(np.maximum(counts, 1)))).tocsr()
+    by_product = normalized.T.tocsr()
+    if columns is None:
+        columns = np.arange(len(products))
+
+    for start in range(0, len(columns), batch_size):
+        batch = columns[start:start + batch_size]
+        scores = (by_product[batch] @ normalized).tocsr()
+        for i, column in enumerate(batch):
+            row = slice(scores.indptr[i], scores.indptr[i + 1])
+            neighbours, row_scores = scores.indices[row], scores.data[row]
+            not_self = neighbours != column
+            neighbours, row_scores = neighbours[not_self], row_scores[not_self]
+            if len(row_scores) > k:
+                best = np.argpartition(-row_scores, k)[:k]
+                neighbours, row_scores = neighbours[best], row_scores[best]
+            order = np.argsort(-row_scores, kind="stable")
+            yield int(products[column]), products[neighbours[order]], row_scores[order]
@@ -0,0 +1,12 @@
+from typing import List, Tuple
+
+from app.db.database import SessionLocal
+from app.db.repositories.saved_searches import SavedSearchesRepository
+
+
+def match_saved_searches(*, trade_id: int) -> List[Tuple[int, int]]:
+    db = SessionLocal()
+    try:
+        return SavedSearchesRepository(db).match_trade(trade_id=trade_id)
+    finally:
+        db.close()
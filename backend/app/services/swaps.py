@@ -0,0 +1,21 @@
+from typing import List
+
+from app.db.database import SessionLocal
+from app.db.repositories.swaps import SwapsRepository
+
+
+def match_swaps_for_trades(*, trade_ids: List[int]) -> int:
+    db = SessionLocal()
+    try:
+        return SwapsRepository(db).match_trades(trade_ids=trade_ids)
+    finally:
+        db.close()
+
+
+def match_swaps_for_user(*, user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        swaps_repo = SwapsRepository(db)
+        return swaps_repo.match_trades(trade_ids=swaps_repo.swappable_trade_ids_for_user(user_id=user_id))
+    finally:
+        db.close()
@@ -0,0 +1,234 @@
+import asyncio
+import heapq
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import SessionLocal
+from app.db.repositories.products import ProductsRepository
+from app.db.repositories.trades import TradeRepository
+from app.db.repositories.trending import TrendingRepository
+from app.models.product import ProductInDB
+from app.models.trade import TradePublic
+from app.models.trending import TrendingFeed, TrendingProduct, TrendingTrade
+
+logger = logging.getLogger(__name__)
+
+TRADE = "trade"
+PRODUCT = "product"
+
+# how much each kind of activity counts towards a score
+EVENT_WEIGHTS = {"view": 1.0, "offer.pending": 3.0, "offer.accepted": 5.0}
+
+
+class DecayedSpaceSaving:
+    """
+    Space-Saving heavy hitters over exponentially time-decayed weights, in at most capacity entries.
+
+    Scores use forward decay: a weight added at time t is stored as weight * e^(rate * (t - landmark)),
+    so existing entries never need touching as time passes and the current score is the stored one
+    times e^(-rate * (now - landmark)). The landmark moves forward before the exponent gets large.
+
+    When full, a new key replaces the smallest entry and inherits its score, so scores can be
+    overestimated by at most that inherited amount (kept in errors), which is the usual Space-Saving
+    guarantee. A lazily cleaned min-heap finds the smallest entry without scanning.
+    """
+
+    def __init__(self, *, capacity: int = 2000, half_life: float = 6 * 3600, clock: Callable[[], float] = time.time) -> None:
+        self.capacity = capacity
+        self.rate = math.log(2) / half_life
+        self.clock = clock
+        self.clear()
+
+    def clear(self) -> None:
+        self.landmark = self.clock()
+        self.scores: Dict[int, float] = {}
+        self.errors: Dict[int, float] = {}
+        self._heap: List[Tuple[float, int]] = []
+
+    def _rescale(self, now: float) -> None:
+        factor = math.exp(-self.rate * (now - self.landmark))
+        self.scores = {key: score * factor for key, score in self.scores.items()}
+        self.errors = {key: error * factor for key, error in self.errors.items()}
+        self.landmark = now
+        self._rebuild_heap()
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(score, key) for key, score in self.scores.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[int, float]:
+        while True:
+            score, key = heapq.heappop(self._heap)
+            # entries for keys that have since grown or been evicted are stale
+            if self.scores.get(key) == score:
+                return key, score
+
+    def add(self, key: int, weight: float = 1.0, now: Optional[float] = None) -> None:
+        now = self.clock() if now is None else now
+        if self.rate * (now - self.landmark) > 50:
+            self._rescale(now)
+        weight *= math.exp(self.rate * (now - self.landmark))
+
+        if key in self.scores:
+            self.scores[key] += weight
+        elif len(self.scores) < self.capacity:
+            self.scores[key] = weight
+            self.errors[key] = 0.0
+        else:
+            evicted, floor = self._pop_min()
+            del self.scores[evicted], self.errors[evicted]
+            self.scores[key] = floor + weight
+            self.errors[key] = floor
+
+        heapq.heappush(self._heap, (self.scores[key], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def top(self, k: int, now: Optional[float] = None) -> List[Tuple[int, float]]:
+        now = self.clock() if now is None else now
+        factor = math.exp(-self.rate * (now - self.landmark))
+        return [(key, score * factor) for key, score in heapq.nlargest(k, self.scores.items(), key=lambda item: item[1])]
+
+    def load(self, items: Iterable[Tuple[int, float, float]]) -> None:
+        """
+        Add (key, score, scored_at) entries, e.g. from a checkpoint, decayed from scored_at
+        """
+        for key, score, scored_at in items:
+            self.add(key, score * math.exp(-self.rate * max(self.landmark - scored_at, 0)), now=self.landmark)
+
+
+class TrendingTracker:
+    """
+    Trending trades and products scored from offer activity and views. Offer events arrive through
+    the LISTEN connection of app.services.offer_event_hub, so every API process sees all of them;
+    views are counted by the process that served them, which with a load balancer in front is an
+    even sample. The feed served to clients is a snapshot rebuilt every refresh_seconds in the
+    background, so reading it never touches the database. The counters are checkpointed to
+    trending_score every checkpoint_seconds and on stop, and replaced by the checkpoint on startup.
+    """
+
+    def __init__(
+        self,
+        *,
+        half_life: float = 6 * 3600,
+        capacity: int = 2000,
+        feed_size: int = 50,
+        refresh_seconds: float = 10.0,
+        checkpoint_seconds: float = 60.0,
+    ) -> None:
+        self.counters = {
+            TRADE: DecayedSpaceSaving(capacity=capacity, half_life=half_life),
+            PRODUCT: DecayedSpaceSaving(capacity=capacity, half_life=half_life),
+        }
+        self.feed_size = feed_size
+        self.refresh_seconds = refresh_seconds
+        self.checkpoint_seconds = checkpoint_seconds
+        self.feed = TrendingFeed()
+        self._task: Optional[asyncio.Task] = None
+        # views are recorded from the threadpool that runs the sync routes, offer events from the event loop
+        self._lock = threading.Lock()
+
+    def record(self, *, event_type: str, trade_id: Optional[int] = None, product_id: Optional[int] = None) -> None:
+        weight = EVENT_WEIGHTS.get(event_type)
+        if weight is None:
+            return
+        with self._lock:
+            if trade_id is not None:
+                self.counters[TRADE].add(trade_id, weight)
+            if product_id is not None:
+                self.counters[PRODUCT].add(product_id, weight)
+
+    def record_offer_event(self, event: dict) -> None:
+        self.record(event_type=event.get("type"), trade_id=event.get("trade_id"), product_id=event.get("product_id"))
+
+    def get_feed(self, *, limit: int) -> TrendingFeed:
+        return TrendingFeed(
+            trades=self.feed.trades[:limit], products=self.feed.products[:limit], generated_at=self.feed.generated_at,
+        )
+
+    async def start(self) -> None:
+        if self._task is None:
+            try:
+                await run_in_threadpool(self.load_checkpoint)
+            except Exception:
+                logger.exception("could not load the trending checkpoint, starting from zero")
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await run_in_threadpool(self.save_checkpoint)
+
+    async def refresh(self) -> None:
+        self.feed = await run_in_threadpool(self.build_feed)
+
+    async def _run_forever(self) -> None:
+        last_checkpoint = time.monotonic()
+        while True:
+            try:
+                await self.refresh()
+                if time.monotonic() - last_checkpoint >= self.checkpoint_seconds:
+                    await run_in_threadpool(self.save_checkpoint)
+                    last_checkpoint = time.monotonic()
+            except Exception:
+                logger.exception("trending refresh failed")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def build_feed(self) -> TrendingFeed:
+        with self._lock:
+            top_trades = self.counters[TRADE].top(self.feed_size)
+            top_products = self.counters[PRODUCT].top(self.feed_size)
+        db = SessionLocal()
+        try:
+            trades = {t.id: t for t in TradeRepository(db).get_trades_by_ids(ids=[i for i, _ in top_trades])}
+            products = {p.id: p for p in ProductsRepository(db).get_products_by_ids(ids=[i for i, _ in top_products])}
+            # items deleted since they were counted are skipped
+            return TrendingFeed(
+                trades=[
+                    TrendingTrade(**TradePublic.from_orm(trades[i]).dict(), score=round(score, 3))
+                    for i, score in top_trades if i in trades
+                ],
+                products=[
+                    TrendingProduct(**ProductInDB.from_orm(products[i]).dict(), score=round(score, 3))
+                    for i, score in top_products if i in products
+                ],
+                generated_at=datetime.now(timezone.utc),
+            )
+        finally:
+            db.close()
+
+    def load_checkpoint(self) -> None:
+        db = SessionLocal()
+        try:
+            trending_repo = TrendingRepository(db)
+            for kind, counter in self.counters.items():
+                rows = trending_repo.load_scores(kind=kind)
+                with self._lock:
+                    # after a stop and start in the same process the checkpoint already holds these counts
+                    counter.clear()
+                    counter.load((item_id, score, updated_at.timestamp()) for item_id, score, updated_at in rows)
+        finally:
+            db.close()
+
+    def save_checkpoint(self) -> None:
+        now = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            trending_repo = TrendingRepository(db)
+            for kind, counter in self.counters.items():
+                with self._lock:
+                    scores = counter.top(counter.capacity, now=now.timestamp())
+                trending_repo.save_scores(kind=kind, scores=scores, at=now)
+        finally:
+            db.close()
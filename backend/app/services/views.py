@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import SessionLocal
+from app.db.repositories.views import ViewKey, ViewsRepository
+from app.models.views import ViewCounts
+from app.services.sketches import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Write-behind view counts. Views are added up in memory per worker, with a HyperLogLog of the
+    viewers per item, and written every flush_seconds as one batch: the touched rows are locked in
+    key order, the stored HyperLogLogs merged with the pending ones, and all counts added in a
+    single UPDATE. A crashed worker loses at most the views of its last flush_seconds (or
+    max_pending items, which triggers an early flush); a clean shutdown flushes everything.
+    """
+
+    def __init__(self, *, flush_seconds: float = 5.0, max_pending: int = 5000) -> None:
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._pending: Dict[ViewKey, Tuple[int, HyperLogLog]] = {}
+        # views are recorded from the threadpool that runs the sync routes
+        self._lock = threading.Lock()
+        self._flush_now = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, *, kind: str, item_id: int, viewer: str) -> None:
+        with self._lock:
+            views, viewers = self._pending.get((kind, item_id)) or (0, HyperLogLog())
+            viewers.add(viewer)
+            self._pending[(kind, item_id)] = (views + 1, viewers)
+            full = len(self._pending) >= self.max_pending
+        if full and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._flush_now.set)
+
+    def get_counts(self, *, kind: str, item_id: int, stored_views: int = 0, stored_viewers: Optional[bytes] = None) -> ViewCounts:
+        """
+        The stored counts plus whatever this worker hasn't flushed yet
+        """
+        viewers = HyperLogLog(stored_viewers)
+        with self._lock:
+            pending_views, pending_viewers = self._pending.get((kind, item_id)) or (0, None)
+            if pending_viewers is not None:
+                viewers.merge(pending_viewers)
+        return ViewCounts(views=stored_views + pending_views, unique_viewers=viewers.count())
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        db = SessionLocal()
+        try:
+            views_repo = ViewsRepository(db)
+            stored = views_repo.lock_view_counts(keys=list(pending))
+            counts = {}
+            for key, (views, viewers) in pending.items():
+                merged = HyperLogLog(stored.get(key))
+                merged.merge(viewers)
+                counts[key] = (views, merged.to_bytes())
+            views_repo.add_views(counts=counts)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # put the views back so the next flush retries them
+            with self._lock:
+                for key, (views, viewers) in pending.items():
+                    newer_views, newer_viewers = self._pending.get(key) or (0, HyperLogLog())
+                    newer_viewers.merge(viewers)
+                    self._pending[key] = (newer_views + views, newer_viewers)
+            raise
+        finally:
+            db.close()
+        return len(pending)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._flush_now = asyncio.Event()
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await run_in_threadpool(self.flush)
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                logger.exception("flushing view counts failed, will retry")
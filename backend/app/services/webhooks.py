@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import socket
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import WEBHOOK_ALLOW_HTTP
+from app.db.database import SessionLocal
+from app.db.repositories.webhooks import WebhooksRepository
+from app.models.webhook import WebhookSubscriptionInDB
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-HairTrade-Signature"
+
+
+def sign_body(*, body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class UnsafeWebhookUrl(ValueError):
+    pass
+
+
+def check_webhook_url(url: str) -> None:
+    """
+    Refuse URLs the server shouldn't be made to POST to: anything but https (plain http too when
+    WEBHOOK_ALLOW_HTTP is set), and hosts that resolve to a loopback, private, link-local or other
+    non-public address. Raises UnsafeWebhookUrl. This resolves the host, so keep it off the event loop.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != "https" and not (WEBHOOK_ALLOW_HTTP and parts.scheme == "http"):
+        raise UnsafeWebhookUrl("Webhook URLs must use https.")
+    if not parts.hostname:
+        raise UnsafeWebhookUrl("Webhook URLs must include a host.")
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or 443, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise UnsafeWebhookUrl(f"Could not resolve {parts.hostname}.")
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise UnsafeWebhookUrl(f"{parts.hostname} resolves to a non-public address.")
+
+
+def queue_webhook_deliveries(*, events: List[Tuple[int, dict]]) -> int:
+    """
+    Queue each (user_id, event) for the user's subscriptions that want it. Returns how many were queued.
+    """
+    db = SessionLocal()
+    try:
+        return WebhooksRepository(db).add_deliveries(events=events)
+    finally:
+        db.close()
+
+
+class WebhookDispatcher:
+    """
+    Delivers the webhook_delivery rows queued by queue_webhook_deliveries, off the request path. Each
+    pass leases up to max_subscriptions subscriptions with events waiting, so only one worker sends
+    to an endpoint at a time and receivers see its events in order, and POSTs the oldest batch_size
+    events of each as {"events": [...]}. All endpoints share one pooled AsyncClient and at most
+    max_concurrency requests run at once. Failed batches are retried with exponential backoff and
+    then moved to webhook_dead_letter.
+
+    Rows are only deleted once their batch has been delivered or dead-lettered, so a crash or deploy
+    loses nothing: the subscriptions a dead worker had leased are picked up again when lease_seconds
+    runs out (keep it above max_attempts * timeout plus the backoff), and receivers may see that
+    batch twice.
+
+    The target URL is checked again (url_check) before each batch, since the host's DNS can have
+    changed since it was subscribed; redirects are not followed.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 50,
+        batch_size: int = 100,
+        max_subscriptions: int = 200,
+        poll_interval: float = 1.0,
+        batch_window: float = 0.25,
+        lease_seconds: int = 120,
+        max_attempts: int = 5,
+        base_retry_seconds: float = 1.0,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        url_check: Callable[[str], None] = check_webhook_url,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.max_subscriptions = max_subscriptions
+        self.poll_interval = poll_interval
+        self.batch_window = batch_window
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_retry_seconds = base_retry_seconds
+        self.timeout = timeout
+        self.transport = transport
+        self.url_check = url_check
+        self.stats = {"requests": 0, "delivered_events": 0, "dead_lettered_events": 0}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def _open(self) -> None:
+        if self._client is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._wakeup = asyncio.Event()
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+                follow_redirects=False,
+            )
+
+    async def start(self) -> None:
+        self._open()
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        """
+        Finish the pass in progress and close the client; whatever is still queued stays in the table
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def wake(self) -> None:
+        """
+        Start the next pass now rather than at the next poll, for events this process just queued
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_forever(self) -> None:
+        while not self._stopping:
+            try:
+                sent = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("webhook dispatch failed: %s", e)
+                sent = 0
+            # keep going straight away while some endpoint has a backlog
+            if sent < self.batch_size and not self._stopping:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                # let events that arrive together go out in one batch
+                await asyncio.sleep(self.batch_window)
+
+    async def drain_once(self) -> int:
+        """
+        Claim and send one batch for each of up to max_subscriptions endpoints. Returns the size of the
+        largest batch, which is batch_size while any endpoint still has a backlog.
+        """
+        self._open()
+        claimed = await run_in_threadpool(self._claim)
+        batches = [
+            (WebhookSubscriptionInDB(**row), row["delivery_ids"], row["payloads"])
+            for row in claimed if row["delivery_ids"]
+        ]
+        await asyncio.gather(*(self._deliver(target, ids, events) for target, ids, events in batches))
+        return max((len(ids) for _, ids, _ in batches), default=0)
+
+    def retry_delay(self, attempt: int) -> float:
+        return self.base_retry_seconds * 2 ** (attempt - 1)
+
+    async def _deliver(self, target: WebhookSubscriptionInDB, delivery_ids: List[int], events: List[dict]) -> None:
+        try:
+            await run_in_threadpool(self.url_check, target.url)
+        except UnsafeWebhookUrl as e:
+            # not worth retrying: nothing is sent to the address until the subscription is fixed
+            await self._give_up(target, delivery_ids, events, 0, str(e))
+            return
+        body = json.dumps({"events": events}).encode()
+        headers = {"Content-Type": "application/json", SIGNATURE_HEADER: sign_body(body=body, secret=target.secret)}
+        error = None
+        attempt = 0
+        for attempt in range(1, self.max_attempts + 1):
+            async with self._semaphore:
+                try:
+                    self.stats["requests"] += 1
+                    res = await self._client.post(target.url, content=body, headers=headers)
+                    if res.status_code < 300:
+                        self.stats["delivered_events"] += len(events)
+                        await run_in_threadpool(self._complete, target.id, delivery_ids)
+                        return
+                    error = f"HTTP {res.status_code}"
+                    # the receiver rejected the payload itself; retrying won't change its mind
+                    if 400 <= res.status_code < 500 and res.status_code not in (408, 429):
+                        break
+                except httpx.HTTPError as e:
+                    error = repr(e)
+            if attempt < self.max_attempts:
+                await asyncio.sleep(self.retry_delay(attempt))
+        await self._give_up(target, delivery_ids, events, attempt, error)
+
+    async def _give_up(
+        self, target: WebhookSubscriptionInDB, delivery_ids: List[int], events: List[dict], attempt: int, error: str,
+    ) -> None:
+        logger.warning("dead-lettering %s webhook events for subscription %s: %s", len(events), target.id, error)
+        self.stats["dead_lettered_events"] += len(events)
+        await run_in_threadpool(self._dead_letter, target.id, delivery_ids, events, attempt, error)
+
+    def _claim(self) -> List[dict]:
+        db = SessionLocal()
+        try:
+            return WebhooksRepository(db).claim_deliveries(
+                max_subscriptions=self.max_subscriptions, batch_size=self.batch_size, lease_seconds=self.lease_seconds,
+            )
+        finally:
+            db.close()
+
+    def _complete(self, subscription_id: int, delivery_ids: List[int]) -> None:
+        db = SessionLocal()
+        try:
+            WebhooksRepository(db).complete_deliveries(subscription_id=subscription_id, delivery_ids=delivery_ids)
+        finally:
+            db.close()
+
+    def _dead_letter(self, subscription_id: int, delivery_ids: List[int], events: List[dict], attempts: int, error: str) -> None:
+        db = SessionLocal()
+        try:
+            WebhooksRepository(db).add_dead_letter(
+                subscription_id=subscription_id, delivery_ids=delivery_ids, events=events, attempts=attempts, error=error,
+            )
+        finally:
+            db.close()
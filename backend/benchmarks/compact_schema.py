@@ -0,0 +1,159 @@
+"""
+Footprint and latency of the enum columns and single-column trade key against the text columns and
+(id, user_id, product_id) key they replaced.
+
+    python -m benchmarks.compact_schema --rows 2000000
+
+Builds two copies of the same synthetic trades: schemabench_text, laid out like trade was (text
+what_do / size / type, three-column primary key), and schemabench_enum, laid out like it is now
+(the product_type / trade_what_do / trade_size enums, primary key on id). Both get the browse
+indexes trade has. Then it reports heap and index sizes and times:
+
+  * filtered counts on what_do and size (the browse facets)
+  * a GROUP BY on type (the facet repair)
+  * point lookups by id (every offer and feed join)
+
+The tables are dropped afterwards unless --keep is given. Record runs in compact_schema.md.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal
+
+TABLES = ("schemabench_text", "schemabench_enum")
+
+SETUP_SQL = [
+    "DROP TABLE IF EXISTS schemabench_text, schemabench_enum",
+    """
+    CREATE TABLE schemabench_text (
+        id integer NOT NULL, user_id integer NOT NULL, product_id integer NOT NULL,
+        what_do text NOT NULL, size text, type text NOT NULL, price numeric(10, 2),
+        PRIMARY KEY (id, user_id, product_id)
+    )
+    """,
+    "CREATE UNIQUE INDEX schemabench_text_id ON schemabench_text (id)",
+    """
+    INSERT INTO schemabench_text
+    SELECT n, 1 + (random() * 50000)::int, 1 + (random() * 5000)::int,
+           (ARRAY['trade', 'sell', 'give away'])[1 + floor(random() * 3)::int],
+           (ARRAY['sample', 'travel', 'regular', 'jumbo', NULL])[1 + floor(random() * 5)::int],
+           (ARRAY['idk, a bottle', 'cream', 'spray', 'mousse', 'gel', 'oil', 'shampoo', 'conditioner', 'mask'])
+               [1 + floor(random() * 9)::int],
+           round((random() * 80)::numeric, 2)
+    FROM generate_series(1, :rows) AS n
+    """,
+    """
+    CREATE TABLE schemabench_enum (
+        id integer PRIMARY KEY, user_id integer NOT NULL, product_id integer NOT NULL,
+        what_do trade_what_do NOT NULL, size trade_size, type product_type NOT NULL, price numeric(10, 2)
+    )
+    """,
+    """
+    INSERT INTO schemabench_enum
+    SELECT id, user_id, product_id, what_do::trade_what_do, size::trade_size, type::product_type, price
+    FROM schemabench_text
+    """,
+]
+
+# the indexes trade has on these columns, built the same way on both copies
+INDEX_SQL = [
+    "CREATE INDEX {table}_what_do_size_id ON {table} (what_do, size, id)",
+    "CREATE INDEX {table}_what_do_price ON {table} (what_do, price)",
+    "CREATE INDEX {table}_type ON {table} (type)",
+]
+
+SIZES_SQL = """
+    SELECT c.relname, pg_relation_size(c.oid) AS bytes
+    FROM pg_class c
+    WHERE c.relname = :table
+       OR c.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid = CAST(:table AS regclass))
+    ORDER BY c.relname
+"""
+
+QUERIES = {
+    "count what_do + size": "SELECT count(*) FROM {table} WHERE what_do = 'sell' AND size = 'travel'",
+    "count what_do + price range": "SELECT count(*) FROM {table} WHERE what_do = 'sell' AND price BETWEEN 10 AND 20",
+    "group by type": "SELECT type, count(*) FROM {table} GROUP BY type",
+}
+
+
+def mb(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f}MB"
+
+
+def report(name: str, timings) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    print(f"{name:<44} n={len(timings)} median={statistics.median(timings) * 1000:.2f}ms p95={p95 * 1000:.2f}ms")
+
+
+def build(db, rows: int) -> None:
+    started = time.perf_counter()
+    for statement in SETUP_SQL:
+        db.execute(text(statement), {"rows": rows})
+    for table in TABLES:
+        for statement in INDEX_SQL:
+            db.execute(text(statement.format(table=table)))
+        db.execute(text(f"ANALYZE {table}"))
+    db.commit()
+    print(f"built {rows} rows per table in {time.perf_counter() - started:.1f}s")
+
+
+def report_sizes(db) -> None:
+    totals = {}
+    for table in TABLES:
+        sizes = db.execute(text(SIZES_SQL), {"table": table}).all()
+        totals[table] = sum(size for _, size in sizes)
+        for name, size in sizes:
+            print(f"  {name:<42} {mb(size):>10}")
+        print(f"  {table + ' total':<42} {mb(totals[table]):>10}")
+    saved = totals["schemabench_text"] - totals["schemabench_enum"]
+    print(f"enum layout saves {mb(saved)} ({saved / totals['schemabench_text']:.0%})")
+
+
+def time_queries(db, args) -> None:
+    for name, query in QUERIES.items():
+        for table in TABLES:
+            timings = []
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                db.execute(text(query.format(table=table))).all()
+                timings.append(time.perf_counter() - started)
+            report(f"{name}, {table}", timings)
+
+    ids = [random.randint(1, args.rows) for _ in range(args.lookups)]
+    for table in TABLES:
+        timings = []
+        for trade_id in ids:
+            started = time.perf_counter()
+            db.execute(text(f"SELECT * FROM {table} WHERE id = :id"), {"id": trade_id}).first()
+            timings.append(time.perf_counter() - started)
+        report(f"lookup by id, {table}", timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        build(db, args.rows)
+        report_sizes(db)
+        time_queries(db, args)
+        if not args.keep:
+            db.execute(text("DROP TABLE " + ", ".join(TABLES)))
+            db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Fan-out-on-write against fan-out-on-read for the personal feed, on a skewed follow graph.
+
+    python -m benchmarks.follow_feed --users 50000 --follows-per-user 50 --skew 4 --max-followers 5000
+
+Seeds followbench_* users whose followees are drawn so that a few accounts collect most of the
+follows (followee rank ~ users * random()^skew, so a larger --skew gives bigger celebrities), a few
+trades per user, and the inboxes those trades would have been fanned out to. Then it times:
+
+  * writes: fan_out_trade for new trades by authors in each follower-count tier
+  * reads: the hybrid feed (inbox plus celebrities merged on read) against a pure pull query that
+    joins follow to trade for every followee
+
+Pass --cleanup to remove the synthetic rows afterwards.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal
+from app.db.repositories.follows import FollowsRepository
+from app.db.repositories.trades import TradeRepository
+from app.models.trade import TradeCreate
+
+SEED_SQL = [
+    """
+    INSERT INTO "user" (username, email, salt, password)
+    SELECT 'followbench_' || n, 'followbench_' || n || '@bench.io', 'x', 'x' FROM generate_series(1, :users) AS n
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO product (product_name, type)
+    SELECT 'followbench_' || n, 'gel' FROM generate_series(1, 100) AS n
+    """,
+    """
+    CREATE TEMPORARY TABLE followbench_user AS
+    SELECT id, row_number() OVER (ORDER BY id) AS rank FROM "user" WHERE username LIKE 'followbench\\_%'
+    """,
+    """
+    INSERT INTO follow (follower_id, followee_id)
+    SELECT follower.id, followee.id
+    FROM followbench_user AS follower
+    CROSS JOIN LATERAL (
+        SELECT 1 + floor(:users * power(random(), :skew))::int AS rank
+        FROM generate_series(1, :follows_per_user) WHERE follower.id > 0
+    ) AS pick
+    JOIN followbench_user AS followee ON followee.rank = pick.rank
+    WHERE followee.id <> follower.id
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    UPDATE "user" SET follower_count = c.follower_count
+    FROM (SELECT followee_id, count(*) AS follower_count FROM follow GROUP BY followee_id) AS c
+    WHERE "user".id = c.followee_id AND "user".username LIKE 'followbench\\_%'
+    """,
+    """
+    INSERT INTO trade (user_id, product_id, what_do, created_at)
+    SELECT u.id, p.id, 'trade', now() - random() * interval '30 days'
+    FROM followbench_user AS u
+    CROSS JOIN LATERAL (
+        SELECT id FROM product WHERE product_name LIKE 'followbench\\_%' AND u.id > 0
+        ORDER BY random() LIMIT :trades_per_user
+    ) AS p
+    """,
+    """
+    INSERT INTO feed_inbox (user_id, trade_id, author_id, created_at)
+    SELECT follow.follower_id, trade.id, trade.user_id, trade.created_at
+    FROM trade
+    JOIN "user" AS author ON author.id = trade.user_id
+    JOIN follow ON follow.followee_id = trade.user_id
+    WHERE author.username LIKE 'followbench\\_%' AND author.follower_count <= :max_followers
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+CLEANUP_SQL = [
+    """DELETE FROM trade WHERE user_id IN (SELECT id FROM "user" WHERE username LIKE 'followbench\\_%')""",
+    """DELETE FROM "user" WHERE username LIKE 'followbench\\_%'""",
+    """DELETE FROM product WHERE product_name LIKE 'followbench\\_%'""",
+]
+
+# what the feed would cost without inboxes: every followee's trades, merged on each read
+PULL_FEED_SQL = """
+    SELECT trade.id
+    FROM follow
+    CROSS JOIN LATERAL (
+        SELECT trade.id, trade.created_at FROM trade
+        WHERE trade.user_id = follow.followee_id
+        ORDER BY trade.created_at DESC, trade.id DESC
+        LIMIT :limit
+    ) AS trade
+    WHERE follow.follower_id = :user_id
+    ORDER BY trade.created_at DESC, trade.id DESC
+    LIMIT :limit
+"""
+
+# follower-count tiers the write timings are grouped by
+TIERS = [(0, 10), (10, 100), (100, 1000), (1000, 10000), (10000, None)]
+
+
+def seed(db, args) -> None:
+    already_seeded = db.execute(text("""SELECT count(*) FROM "user" WHERE username LIKE 'followbench\\_%'""")).scalar()
+    if already_seeded:
+        print(f"using {already_seeded} existing followbench users")
+        return
+    started = time.perf_counter()
+    params = {
+        "users": args.users,
+        "follows_per_user": args.follows_per_user,
+        "skew": args.skew,
+        "trades_per_user": args.trades_per_user,
+        "max_followers": args.max_followers,
+    }
+    for statement in SEED_SQL:
+        db.execute(text(statement), params)
+    db.commit()
+    db.execute(text("ANALYZE follow; ANALYZE trade; ANALYZE feed_inbox"))
+    db.commit()
+    print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+
+def report(name: str, timings) -> None:
+    if not timings:
+        print(f"{name:<34} n=0")
+        return
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    print(f"{name:<34} n={len(timings)} median={statistics.median(timings) * 1000:.1f}ms p95={p95 * 1000:.1f}ms")
+
+
+def time_writes(db, args, product_id: int) -> None:
+    trade_repo = TradeRepository(db)
+    follows_repo = FollowsRepository(db)
+    for low, high in TIERS:
+        bound = "AND follower_count < :high" if high is not None else ""
+        authors = db.execute(
+            text(f"""
+                SELECT id FROM "user"
+                WHERE username LIKE 'followbench\\_%' AND follower_count >= :low {bound}
+                ORDER BY random() LIMIT :samples
+            """),
+            {"low": low, "high": high, "samples": args.samples},
+        ).scalars().all()
+        timings, written = [], 0
+        for author_id in authors:
+            trade = trade_repo.create_trade(trade_create=TradeCreate(product_id=product_id), user_id=author_id)
+            started = time.perf_counter()
+            written += follows_repo.fan_out_trade(trade_id=trade.id, max_followers=args.max_followers)
+            timings.append(time.perf_counter() - started)
+            trade_repo.delete_trade_by_id(trade=trade)
+        label = f"{low}-{high}" if high is not None else f"{low}+"
+        report(f"fan out, {label} followers", timings)
+        if authors:
+            print(f"{'':<34} {written / len(authors):.0f} inbox rows per trade")
+
+
+def time_reads(db, args) -> None:
+    follows_repo = FollowsRepository(db)
+    # readers who follow the most accounts are where pulling on read hurts
+    readers = db.execute(
+        text("""
+            SELECT follower_id FROM follow
+            JOIN "user" ON "user".id = follow.follower_id AND "user".username LIKE 'followbench\\_%'
+            GROUP BY follower_id ORDER BY random() LIMIT :samples
+        """),
+        {"samples": args.samples},
+    ).scalars().all()
+    hybrid, pull = [], []
+    for user_id in readers:
+        started = time.perf_counter()
+        follows_repo.list_feed(user_id=user_id, limit=args.page_size, max_followers=args.max_followers)
+        hybrid.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        trade_ids = db.execute(text(PULL_FEED_SQL), {"user_id": user_id, "limit": args.page_size}).scalars().all()
+        TradeRepository(db).get_trades_by_ids(ids=trade_ids)
+        pull.append(time.perf_counter() - started)
+    report("read feed, inbox + celebrities", hybrid)
+    report("read feed, pull from every followee", pull)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--follows-per-user", type=int, default=50)
+    parser.add_argument("--skew", type=float, default=4.0)
+    parser.add_argument("--trades-per-user", type=int, default=3)
+    parser.add_argument("--max-followers", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        seed(db, args)
+        product_id = db.execute(text("SELECT id FROM product WHERE product_name LIKE 'followbench\\_%' LIMIT 1")).scalar()
+        time_writes(db, args, product_id)
+        time_reads(db, args)
+
+        if args.cleanup:
+            for statement in CLEANUP_SQL:
+                db.execute(text(statement))
+            db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Similar-products computation on synthetic co-interest data, no database needed.
+
+    python -m benchmarks.similar_products --offers 1000000 --users 200000 --products 50000
+
+Product popularity is Zipf-distributed like real listings. Times the matrix build, a full top-k pass
+and an incremental pass over the products touched by the newest 1% of offers.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.recommender import build_interaction_matrix, top_k_similar
+
+
+def timed(name: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{name:<34} {time.perf_counter() - started:8.2f}s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--offers", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("-k", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    user_ids = rng.integers(1, args.users + 1, args.offers)
+    product_ids = np.minimum(rng.zipf(1.3, args.offers), args.products)
+    product_ids = rng.permutation(args.products)[product_ids - 1] + 1
+
+    matrix, products = timed("build interaction matrix", lambda: build_interaction_matrix(user_ids, product_ids))
+    print(f"{matrix.shape[0]} users x {matrix.shape[1]} products, {matrix.nnz} interactions")
+
+    def run(columns=None):
+        return sum(1 for _ in top_k_similar(matrix, products, k=args.k, columns=columns, batch_size=args.batch_size))
+
+    computed = timed("full top-k", run)
+    print(f"{computed} products")
+
+    newest = slice(int(args.offers * 0.99), None)
+    changed = np.unique(product_ids[np.isin(user_ids, np.unique(user_ids[newest]))])
+    computed = timed("incremental top-k (newest 1%)", lambda: run(np.searchsorted(products, changed)))
+    print(f"{computed} products")
+
+
+if __name__ == "__main__":
+    main()
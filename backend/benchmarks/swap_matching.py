@@ -0,0 +1,132 @@
+"""
+Cost of incremental swap matching on a synthetic trade graph.
+
+    python -m benchmarks.swap_matching --users 100000 --products 20000 --listings-per-user 5 --wishes-per-user 5
+
+Seeds swapbench_* users, products, listings and wishes into the configured database (skipped if they
+are already there), then times match_trades for freshly created listings and the match removal done
+when a listing is deleted. Pass --cleanup to remove the synthetic rows afterwards.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal
+from app.db.repositories.swaps import SwapsRepository
+from app.db.repositories.trades import TradeRepository
+from app.models.trade import TradeCreate
+
+SEED_SQL = [
+    """
+    INSERT INTO "user" (username, email, salt, password)
+    SELECT 'swapbench_' || n, 'swapbench_' || n || '@bench.io', 'x', 'x' FROM generate_series(1, :users) AS n
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO product (product_name, type)
+    SELECT 'swapbench_' || n, 'gel' FROM generate_series(1, :products) AS n
+    """,
+    """
+    INSERT INTO trade (user_id, product_id, what_do)
+    SELECT u.id, p.id, 'trade'
+    FROM (SELECT id FROM "user" WHERE username LIKE 'swapbench\\_%') AS u
+    CROSS JOIN LATERAL (
+        SELECT id FROM product WHERE product_name LIKE 'swapbench\\_%' AND u.id > 0
+        ORDER BY random() LIMIT :listings_per_user
+    ) AS p
+    """,
+    """
+    INSERT INTO wishlist_item (user_id, product_id)
+    SELECT u.id, p.id
+    FROM (SELECT id FROM "user" WHERE username LIKE 'swapbench\\_%') AS u
+    CROSS JOIN LATERAL (
+        SELECT id FROM product WHERE product_name LIKE 'swapbench\\_%' AND u.id > 0
+        ORDER BY random() LIMIT :wishes_per_user
+    ) AS p
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+CLEANUP_SQL = [
+    """DELETE FROM trade WHERE user_id IN (SELECT id FROM "user" WHERE username LIKE 'swapbench\\_%')""",
+    """DELETE FROM "user" WHERE username LIKE 'swapbench\\_%'""",
+    """DELETE FROM product WHERE product_name LIKE 'swapbench\\_%'""",
+]
+
+
+def seed(db, args) -> None:
+    already_seeded = db.execute(text("""SELECT count(*) FROM "user" WHERE username LIKE 'swapbench\\_%'""")).scalar()
+    if already_seeded:
+        print(f"using {already_seeded} existing swapbench users")
+        return
+    started = time.perf_counter()
+    params = {
+        "users": args.users,
+        "products": args.products,
+        "listings_per_user": args.listings_per_user,
+        "wishes_per_user": args.wishes_per_user,
+    }
+    for statement in SEED_SQL:
+        db.execute(text(statement), params)
+    db.commit()
+    db.execute(text("ANALYZE trade; ANALYZE wishlist_item"))
+    db.commit()
+    print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+
+def report(name: str, timings) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    print(f"{name:<28} n={len(timings)} median={statistics.median(timings) * 1000:.1f}ms p95={p95 * 1000:.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--listings-per-user", type=int, default=3)
+    parser.add_argument("--wishes-per-user", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        seed(db, args)
+        user_ids = db.execute(text("""SELECT id FROM "user" WHERE username LIKE 'swapbench\\_%'""")).scalars().all()
+        product_ids = db.execute(text("SELECT id FROM product WHERE product_name LIKE 'swapbench\\_%'")).scalars().all()
+        trade_repo = TradeRepository(db)
+        swaps_repo = SwapsRepository(db)
+
+        match_timings, remove_timings, found = [], [], 0
+        for _ in range(args.samples):
+            trade = trade_repo.create_trade(
+                trade_create=TradeCreate(product_id=random.choice(product_ids)), user_id=random.choice(user_ids),
+            )
+            started = time.perf_counter()
+            found += swaps_repo.match_trades(trade_ids=[trade.id])
+            match_timings.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            swaps_repo.remove_matches_for_trades(trade_ids=[trade.id])
+            db.commit()
+            remove_timings.append(time.perf_counter() - started)
+            trade_repo.delete_trade_by_id(trade=trade)
+
+        report("match new listing", match_timings)
+        report("remove listing's matches", remove_timings)
+        print(f"{found} new swap cycles found for {args.samples} listings")
+
+        if args.cleanup:
+            for statement in CLEANUP_SQL:
+                db.execute(text(statement))
+            db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
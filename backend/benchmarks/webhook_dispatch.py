@@ -0,0 +1,91 @@
+"""
+Webhook dispatch throughput against the in-process receiver.
+
+    python -m benchmarks.webhook_dispatch --endpoints 200 --events 20000 --latency 0.05
+
+Queues the events in webhook_delivery for webhookbench_* subscriptions and times the dispatcher
+draining them, with one request per event (batch_size=1) and with the default batching, so the
+effect of batching and the concurrency limit can be seen without a real network. The synthetic
+user and its subscriptions are removed afterwards.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import text
+
+from app.db.database import SessionLocal
+from app.services.webhooks import WebhookDispatcher, queue_webhook_deliveries
+from benchmarks.webhook_receiver import WebhookReceiver
+
+SETUP_SQL = [
+    """
+    INSERT INTO "user" (username, email, salt, password)
+    VALUES ('webhookbench', 'webhookbench@bench.io', 'x', 'x')
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO webhook_subscription (user_id, url, secret)
+    SELECT id, 'https://receiver.test/' || n, 'benchmark'
+    FROM "user", generate_series(1, :endpoints) AS n
+    WHERE username = 'webhookbench'
+    """,
+]
+
+CLEANUP_SQL = """DELETE FROM "user" WHERE username = 'webhookbench'"""
+
+
+def allow_any_url(url: str) -> None:
+    pass
+
+
+async def run(*, user_id: int, events: int, latency: float, batch_size: int, max_concurrency: int) -> None:
+    receiver = WebhookReceiver(latency=latency)
+    dispatcher = WebhookDispatcher(
+        transport=httpx.ASGITransport(app=receiver),
+        batch_size=batch_size,
+        max_concurrency=max_concurrency,
+        url_check=allow_any_url,
+    )
+    # every subscription belongs to the one user, so each event is queued for every endpoint
+    queue_webhook_deliveries(events=[(user_id, {"type": "offer.pending", "trade_id": n}) for n in range(events)])
+    started = time.perf_counter()
+    while await dispatcher.drain_once():
+        pass
+    elapsed = time.perf_counter() - started
+    await dispatcher.stop()
+
+    print(
+        f"batch_size={batch_size:<4} events={len(receiver.events)} requests={dispatcher.stats['requests']} "
+        f"elapsed={elapsed:.2f}s events/s={len(receiver.events) / elapsed:,.0f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoints", type=int, default=100)
+    parser.add_argument("--events", type=int, default=100, help="events per endpoint")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated receiver latency in seconds")
+    parser.add_argument("--max-concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        for statement in SETUP_SQL:
+            db.execute(text(statement), {"endpoints": args.endpoints})
+        db.commit()
+        user_id = db.execute(text("""SELECT id FROM "user" WHERE username = 'webhookbench'""")).scalar()
+        for batch_size in (1, 100):
+            asyncio.run(run(
+                user_id=user_id, events=args.events, latency=args.latency,
+                batch_size=batch_size, max_concurrency=args.max_concurrency,
+            ))
+    finally:
+        db.execute(text(CLEANUP_SQL))
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+A stand-in webhook receiver for tests and benchmarks.
+
+Records every batch it is sent and answers with fail_with (if set) instead of 200, so the
+dispatcher can be exercised through httpx.ASGITransport without a network.
+"""
+import asyncio
+import json
+from typing import List, Optional
+
+
+class WebhookReceiver:
+    def __init__(self, *, fail_with: Optional[int] = None, latency: float = 0.0) -> None:
+        self.fail_with = fail_with
+        self.latency = latency
+        self.batches: List[dict] = []
+
+    @property
+    def events(self) -> List[dict]:
+        return [event for batch in self.batches for event in batch["events"]]
+
+    async def __call__(self, scope, receive, send) -> None:
+        assert scope["type"] == "http"
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        status_code = self.fail_with or 200
+        if status_code < 300:
+            self.batches.append({
+                "path": scope["path"],
+                "headers": {k.decode(): v.decode() for k, v in scope["headers"]},
+                "body": body,
+                "events": json.loads(body)["events"],
+            })
+
+        await send({"type": "http.response.start", "status": status_code, "headers": [(b"content-length", b"0")]})
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,49 @@
+import pytest
+
+from sqlalchemy import text
+from sqlalchemy.orm import session
+
+from app.db.metadata import JobCheckpoint
+from app.services.backfill import Backfill
+
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def backfill_table(apply_migrations: None, db: session.Session):
+    db.execute(text("CREATE TABLE backfill_test (id integer PRIMARY KEY, doubled integer)"))
+    db.execute(text("INSERT INTO backfill_test (id) SELECT generate_series(1, 95)"))
+    db.commit()
+    yield "backfill_test"
+    db.rollback()
+    db.execute(text("DROP TABLE backfill_test"))
+    db.query(JobCheckpoint).filter(JobCheckpoint.name.like("backfill:test-%")).delete(synchronize_session=False)
+    db.commit()
+
+
+class TestBackfill:
+    async def test_backfill_resumes_from_checkpoint(self, backfill_table: str, db: session.Session) -> None:
+        def make_backfill() -> Backfill:
+            return Backfill(
+                name="test-doubled",
+                table=backfill_table,
+                sql="UPDATE backfill_test SET doubled = id * 2 WHERE id >= :start AND id < :end AND doubled IS NULL",
+                batch_size=10,
+                pause_seconds=0,
+            )
+
+        state = make_backfill().run(db=db, max_batches=3)
+        assert not state["done"]
+        assert state["rows"] == 30
+        assert db.execute(text("SELECT count(*) FROM backfill_test WHERE doubled IS NOT NULL")).scalar() == 30
+
+        # a new runner with the same name carries on from the saved range
+        state = make_backfill().run(db=db)
+        assert state["done"]
+        assert state["rows"] == 95
+        assert state["batches"] == 10
+        assert db.execute(text("SELECT count(*) FROM backfill_test WHERE doubled = id * 2")).scalar() == 95
+
+        # and once finished it doesn't run again
+        assert make_backfill().run(db=db)["batches"] == 10
@@ -0,0 +1,57 @@
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+
+from app.models.batch import BatchResponse
+from app.models.product import ProductInDB, ProductPublic
+from app.models.user import UserInDB, UserPublic
+
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestBatchRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.post(app.url_path_for("batch:run-batch"), json={})
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+
+class TestRunBatch:
+    async def test_authenticated_user_can_batch_several_calls(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB, test_product: ProductInDB,
+    ) -> None:
+        requests = [
+            {"path": app.url_path_for("users:get-current-user")},
+            {"path": app.url_path_for("products:get-product-by-id", id=test_product.id)},
+            {"path": app.url_path_for("products:get-product-by-id", id=999999)},
+        ]
+        res = await authorized_client.post(app.url_path_for("batch:run-batch"), json={"requests": requests})
+        assert res.status_code == status.HTTP_200_OK
+        batch = BatchResponse(**res.json())
+        assert [r.status_code for r in batch.responses] == [200, 200, 404]
+        assert UserPublic(**batch.responses[0].body).username == test_user.username
+        assert ProductPublic(**batch.responses[1].body).id == test_product.id
+
+    async def test_sub_requests_are_authenticated_with_the_batch_token(
+        self, app: FastAPI, client: AsyncClient,
+    ) -> None:
+        requests = [{"path": app.url_path_for("users:get-current-user")}]
+        res = await client.post(app.url_path_for("batch:run-batch"), json={"requests": requests})
+        assert res.status_code == status.HTTP_200_OK
+        assert BatchResponse(**res.json()).responses[0].status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.parametrize(
+        "requests, status_code",
+        (
+            ([], 422),
+            ([{"path": "/not/the/api/"}], 422),
+            ([{"path": "/api/batch/"}], 422),
+            ([{"path": "/api/products/", "method": "PATCH"}], 422),
+        ),
+    )
+    async def test_invalid_batches_raise_error(
+        self, app: FastAPI, client: AsyncClient, requests: list, status_code: int,
+    ) -> None:
+        res = await client.post(app.url_path_for("batch:run-batch"), json={"requests": requests})
+        assert res.status_code == status_code
@@ -0,0 +1,94 @@
+from typing import Callable, List, Optional, Tuple
+
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+from sqlalchemy.orm import session
+
+from app.db.metadata import User
+from app.db.repositories.trades import TradeRepository
+from app.db.repositories.users import UsersRepository
+from app.models.change import Change, ChangePage
+from app.models.product import ProductInDB
+from app.models.trade import Size, TradeCreate
+from app.models.user import UserCreate, UserInDB
+from app.services.changes import ChangeConsumer
+
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def test_superuser(db: session.Session) -> UserInDB:
+    new_user = UserCreate(email="ada@lovelace.io", username="adalovelace", password="analyticalengine")
+    user_repo = UsersRepository(db)
+    user = user_repo.get_user_by_email(email=new_user.email) or user_repo.register_new_user(new_user=new_user)
+    db.query(User).filter(User.id == user.id).update({User.is_superuser: True}, synchronize_session=False)
+    db.commit()
+    return user_repo.get_user_by_email(email=new_user.email)
+
+
+async def read_to_end(app: FastAPI, client: AsyncClient, params: dict) -> Tuple[List[Change], Optional[str]]:
+    changes = []
+    while True:
+        res = await client.get(app.url_path_for("changes:list-changes"), params={**params, "limit": 1000})
+        assert res.status_code == status.HTTP_200_OK
+        page = ChangePage(**res.json())
+        changes += page.changes
+        if not page.changes:
+            return changes, page.next_cursor
+        params = {**params, "cursor": page.next_cursor}
+
+
+class TestChangesRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("changes:list-changes"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+    async def test_only_superusers_can_read_changes(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        res = await authorized_client.get(app.url_path_for("changes:list-changes"))
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestChanges:
+    async def test_trade_writes_are_streamed_in_order(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_superuser: UserInDB,
+        test_user: UserInDB,
+        test_product: ProductInDB,
+        db: session.Session,
+    ) -> None:
+        client = create_authorized_client(user=test_superuser)
+        _, cursor = await read_to_end(app, client, {"entity": "trade"})
+
+        trade_repo = TradeRepository(db)
+        trade = trade_repo.create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.sample), user_id=test_user.id,
+        )
+        trade_repo.delete_trade_by_id(trade=trade)
+
+        params = {"entity": "trade", **({"cursor": cursor} if cursor else {})}
+        changes, _ = await read_to_end(app, client, params)
+        changes = [c for c in changes if c.key == {"id": trade.id}]
+        assert [c.op for c in changes] == ["insert", "delete"]
+        assert changes[0].data["size"] == "sample"
+        assert changes[1].data is None
+
+    async def test_consumer_resumes_from_its_checkpoint(
+        self, test_user: UserInDB, test_product: ProductInDB, db: session.Session,
+    ) -> None:
+        seen = []
+        consumer = ChangeConsumer(name="test-consumer", handler=seen.extend, entities=["trade"], batch_size=1000)
+        while consumer.poll_once():
+            pass
+        seen.clear()
+
+        trade = TradeRepository(db).create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.sample), user_id=test_user.id,
+        )
+        while consumer.poll_once():
+            pass
+        assert [c.key for c in seen] == [{"id": trade.id}]
@@ -0,0 +1,129 @@
+from typing import Callable
+
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+from sqlalchemy.orm import session
+
+from app.db.metadata import FeedInboxItem, User
+from app.db.repositories.follows import FollowsRepository
+from app.db.repositories.trades import TradeRepository
+from app.models.follow import PersonalFeedPage
+from app.models.product import ProductInDB
+from app.models.trade import Size, TradeCreate
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestFollowRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("follows:list-following"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.get(app.url_path_for("follows:get-feed"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.put(app.url_path_for("follows:follow-user", user_id=1))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+    async def test_unauthorized_user_cannot_see_feed(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("follows:get-feed"))
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestFollows:
+    async def test_user_can_follow_and_unfollow(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user2: UserInDB, db: session.Session,
+    ) -> None:
+        res = await authorized_client.put(app.url_path_for("follows:follow-user", user_id=test_user2.id))
+        assert res.status_code == status.HTTP_200_OK
+        res = await authorized_client.get(app.url_path_for("follows:list-following"))
+        assert test_user2.id in [u["id"] for u in res.json()]
+        follower_count = db.query(User.follower_count).filter(User.id == test_user2.id).scalar()
+
+        res = await authorized_client.delete(app.url_path_for("follows:unfollow-user", user_id=test_user2.id))
+        assert res.status_code == status.HTTP_200_OK
+        db.expire_all()
+        assert db.query(User.follower_count).filter(User.id == test_user2.id).scalar() == follower_count - 1
+        res = await authorized_client.delete(app.url_path_for("follows:unfollow-user", user_id=test_user2.id))
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize("user_id, status_code", ((999, 404), (0, 422)))
+    async def test_invalid_followee_raises_error(
+        self, app: FastAPI, authorized_client: AsyncClient, user_id: int, status_code: int,
+    ) -> None:
+        res = await authorized_client.put(app.url_path_for("follows:follow-user", user_id=user_id))
+        assert res.status_code == status_code
+
+    async def test_users_cannot_follow_themselves(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB,
+    ) -> None:
+        res = await authorized_client.put(app.url_path_for("follows:follow-user", user_id=test_user.id))
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestPersonalFeed:
+    async def test_new_trades_are_fanned_out_to_followers(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user3: UserInDB,
+        test_user4: UserInDB,
+        test_product: ProductInDB,
+        db: session.Session,
+    ) -> None:
+        follows_repo = FollowsRepository(db)
+        follows_repo.follow_user(follower_id=test_user3.id, followee_id=test_user4.id)
+        trade = TradeRepository(db).create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.sample), user_id=test_user4.id,
+        )
+        assert follows_repo.fan_out_trade(trade_id=trade.id) >= 1
+        assert db.query(FeedInboxItem).filter(
+            FeedInboxItem.user_id == test_user3.id, FeedInboxItem.trade_id == trade.id,
+        ).count() == 1
+
+        client = create_authorized_client(user=test_user3)
+        res = await client.get(app.url_path_for("follows:get-feed"))
+        assert res.status_code == status.HTTP_200_OK
+        assert PersonalFeedPage(**res.json()).trades[0].id == trade.id
+
+    async def test_authors_with_many_followers_are_merged_in_on_read(
+        self, test_user5: UserInDB, test_user6: UserInDB, test_product: ProductInDB, db: session.Session,
+    ) -> None:
+        follows_repo = FollowsRepository(db)
+        follows_repo.follow_user(follower_id=test_user5.id, followee_id=test_user6.id, max_followers=0)
+        trade = TradeRepository(db).create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.sample), user_id=test_user6.id,
+        )
+        assert follows_repo.fan_out_trade(trade_id=trade.id, max_followers=0) == 0
+
+        feed = follows_repo.list_feed(user_id=test_user5.id, max_followers=0)
+        assert trade.id in [t.id for t in feed]
+
+    async def test_author_dropping_below_fan_out_limit_is_backfilled(
+        self,
+        test_user: UserInDB,
+        test_user2: UserInDB,
+        test_user6: UserInDB,
+        test_product: ProductInDB,
+        db: session.Session,
+    ) -> None:
+        follows_repo = FollowsRepository(db)
+        follows_repo.follow_user(follower_id=test_user.id, followee_id=test_user6.id)
+        follows_repo.follow_user(follower_id=test_user2.id, followee_id=test_user6.id)
+        follower_count = db.query(User.follower_count).filter(User.id == test_user6.id).scalar()
+        max_followers = follower_count - 1
+
+        # test_user6 is over the limit, so the trade is only pulled in on read
+        trade = TradeRepository(db).create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.sample), user_id=test_user6.id,
+        )
+        assert follows_repo.fan_out_trade(trade_id=trade.id, max_followers=max_followers) == 0
+
+        follows_repo.unfollow_user(follower_id=test_user2.id, followee_id=test_user6.id, max_followers=max_followers)
+        assert db.query(FeedInboxItem).filter(
+            FeedInboxItem.user_id == test_user.id, FeedInboxItem.trade_id == trade.id,
+        ).count() == 1
+        feed = follows_repo.list_feed(user_id=test_user.id, max_followers=max_followers)
+        assert trade.id in [t.id for t in feed]
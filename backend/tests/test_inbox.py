@@ -0,0 +1,86 @@
+from typing import Callable, List
+
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+
+from app.models.offer import OfferInboxPage
+from app.models.trade import TradeInDB
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestInboxRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("offers:list-outgoing-offers"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.get(app.url_path_for("offers:list-incoming-offers"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+    async def test_unauthenticated_users_cant_list_offers(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("offers:list-outgoing-offers"))
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestListInbox:
+    async def test_user_can_list_own_offers(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user_list: List[UserInDB],
+        test_trade_with_offers: TradeInDB,
+    ) -> None:
+        offering_user = test_user_list[0]
+        authorized_client = create_authorized_client(user=offering_user)
+        res = await authorized_client.get(app.url_path_for("offers:list-outgoing-offers"), params={"limit": 100})
+        assert res.status_code == status.HTTP_200_OK
+        page = OfferInboxPage(**res.json())
+        assert all(o.user_id == offering_user.id for o in page.offers)
+        assert test_trade_with_offers.id in [o.trade.id for o in page.offers]
+        assert all(o.trade.product is not None for o in page.offers)
+
+    async def test_trade_owner_can_list_offers_on_their_trades(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_user_list: List[UserInDB],
+        test_trade_with_offers: TradeInDB,
+    ) -> None:
+        authorized_client = create_authorized_client(user=test_user2)
+        res = await authorized_client.get(
+            app.url_path_for("offers:list-incoming-offers"), params={"limit": 100, "status": "pending"},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        page = OfferInboxPage(**res.json())
+        assert all(o.trade.user_id == test_user2.id for o in page.offers)
+        assert all(o.status == "pending" for o in page.offers)
+        trade_offer_users = [o.user_id for o in page.offers if o.trade_id == test_trade_with_offers.id]
+        assert sorted(trade_offer_users) == sorted(user.id for user in test_user_list)
+
+    async def test_pages_can_be_followed_with_cursor(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_trade_with_offers: TradeInDB,
+    ) -> None:
+        authorized_client = create_authorized_client(user=test_user2)
+        res = await authorized_client.get(app.url_path_for("offers:list-incoming-offers"), params={"limit": 1})
+        first_page = OfferInboxPage(**res.json())
+        assert len(first_page.offers) == 1
+        assert first_page.next_cursor is not None
+        res = await authorized_client.get(
+            app.url_path_for("offers:list-incoming-offers"), params={"limit": 1, "cursor": first_page.next_cursor},
+        )
+        second_page = OfferInboxPage(**res.json())
+        assert len(second_page.offers) == 1
+        first, second = first_page.offers[0], second_page.offers[0]
+        assert (first.created_at, first.trade_id, first.user_id) > (second.created_at, second.trade_id, second.user_id)
+
+    async def test_invalid_cursor_raises_error(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        res = await authorized_client.get(app.url_path_for("offers:list-outgoing-offers"), params={"cursor": "nope"})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
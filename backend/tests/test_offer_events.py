@@ -0,0 +1,38 @@
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+
+from app.services.notifications import OfferEventHub
+
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestOfferEventRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("offers:stream-offer-events"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+    async def test_unauthenticated_users_cant_stream_events(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("offers:stream-offer-events"))
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestOfferEventHub:
+    async def test_events_go_to_trade_owner_and_offering_user_only(self) -> None:
+        hub = OfferEventHub()
+        event = {"type": "offer.accepted", "trade_id": 1, "trade_owner_id": 10, "user_id": 20, "status": "accepted"}
+        async with hub.subscription(10) as owner_queue, hub.subscription(20) as offerer_queue, \
+                hub.subscription(30) as bystander_queue:
+            hub.dispatch(event)
+            assert owner_queue.get_nowait() == event
+            assert offerer_queue.get_nowait() == event
+            assert bystander_queue.empty()
+
+    async def test_slow_subscribers_drop_oldest_events(self) -> None:
+        hub = OfferEventHub(queue_size=2)
+        async with hub.subscription(10) as queue:
+            for trade_id in range(3):
+                hub.dispatch({"type": "offer.pending", "trade_id": trade_id, "trade_owner_id": 10, "user_id": 20})
+            assert [queue.get_nowait()["trade_id"] for _ in range(2)] == [1, 2]
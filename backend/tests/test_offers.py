@@ -1,3 +1,6 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from typing import List, Callable
 
 import pytest
@@ -6,13 +9,15 @@ import random
 from httpx import AsyncClient
 from fastapi import FastAPI, status
 from databases import Database
+from sqlalchemy import func, text
 from sqlalchemy.orm import session
-from app.db.metadata import Trade
+from app.db.database import SessionLocal
+from app.db.metadata import Offer, Trade
 from app.db.repositories.offers import OffersRepository
 
 from app.models.trade import TradeCreate, TradeInDB
 from app.models.user import UserInDB
-from app.models.offer import OfferCreate, OfferUpdate, OfferInDB, OfferPublic
+from app.models.offer import OfferBulkResult, OfferCreate, OfferUpdate, OfferInDB, OfferPublic, OfferTimeline
 
 
 pytestmark = pytest.mark.asyncio
@@ -383,4 +388,347 @@ class TestRescindOffers:
         res = await authorized_client.delete(
             app.url_path_for("offers:rescind-offer-from-user", trade_id=test_trade_with_accepted_offer.id)
         )
-        assert res.status_code == status.HTTP_400_BAD_REQUEST
\ No newline at end of file
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestOfferCounters:
+    async def test_trade_counts_offers_as_they_are_made(
+        self, db: session.Session, test_user_list: List[UserInDB], test_trade_with_offers: TradeInDB,
+    ) -> None:
+        trade = db.query(Trade).filter(Trade.id == test_trade_with_offers.id).first()
+        assert trade.offer_count == len(test_user_list)
+        assert trade.pending_offer_count == len(test_user_list)
+
+    async def test_accepting_and_cancelling_updates_pending_count(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user3: UserInDB,
+        test_user_list: List[UserInDB],
+        test_trade_with_accepted_offer: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        trade = db.query(Trade).filter(Trade.id == test_trade_with_accepted_offer.id).first()
+        assert trade.offer_count == len(test_user_list)
+        assert trade.pending_offer_count == 0
+
+        accepted_user_client = create_authorized_client(user=test_user3)
+        res = await accepted_user_client.put(
+            app.url_path_for("offers:cancel-offer-from-user", trade_id=test_trade_with_accepted_offer.id)
+        )
+        assert res.status_code == status.HTTP_200_OK
+        db.refresh(trade)
+        assert trade.pending_offer_count == len(test_user_list) - 1
+
+    async def test_rescinding_offer_decrements_counts(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user4: UserInDB,
+        test_user_list: List[UserInDB],
+        test_trade_with_offers: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        authorized_client = create_authorized_client(user=test_user4)
+        res = await authorized_client.delete(
+            app.url_path_for("offers:rescind-offer-from-user", trade_id=test_trade_with_offers.id)
+        )
+        assert res.status_code == status.HTTP_200_OK
+        trade = db.query(Trade).filter(Trade.id == test_trade_with_offers.id).first()
+        assert trade.offer_count == len(test_user_list) - 1
+        assert trade.pending_offer_count == len(test_user_list) - 1
+
+class TestOfferTimeline:
+    async def test_every_transition_is_kept_in_order(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_user3: UserInDB,
+        test_user4: UserInDB,
+        test_trade_with_accepted_offer: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        accepted_user_client = create_authorized_client(user=test_user3)
+        res = await accepted_user_client.put(
+            app.url_path_for("offers:cancel-offer-from-user", trade_id=test_trade_with_accepted_offer.id)
+        )
+        assert res.status_code == status.HTTP_200_OK
+
+        res = await accepted_user_client.get(
+            app.url_path_for("offers:get-offer-timeline", trade_id=test_trade_with_accepted_offer.id)
+        )
+        assert res.status_code == status.HTTP_200_OK
+        timeline = OfferTimeline(**res.json())
+        # other users' offers are hidden from anyone but the trade owner
+        assert {e.user_id for e in timeline.events} == {test_user3.id}
+        assert [e.status for e in timeline.events] == ["pending", "accepted", "cancelled"]
+
+        owner_client = create_authorized_client(user=test_user2)
+        res = await owner_client.get(
+            app.url_path_for("offers:get-offer-timeline", trade_id=test_trade_with_accepted_offer.id)
+        )
+        timeline = OfferTimeline(**res.json())
+        assert [e.status for e in timeline.events if e.user_id == test_user4.id] == ["pending", "rejected", "pending"]
+
+        mismatches = OffersRepository(db).find_status_mismatches()
+        assert not [m for m in mismatches if m["trade_id"] == test_trade_with_accepted_offer.id]
+
+class TestBulkOffers:
+    async def test_owner_can_reject_a_list_of_users(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_user3: UserInDB,
+        test_user4: UserInDB,
+        test_user_list: List[UserInDB],
+        test_trade_with_offers: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        owner_client = create_authorized_client(user=test_user2)
+        res = await owner_client.post(
+            app.url_path_for("offers:reject-offers", trade_id=test_trade_with_offers.id),
+            json={"usernames": [test_user3.username, test_user4.username]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert OfferBulkResult(**res.json()).affected == 2
+        offers = OffersRepository(db).list_offers_for_trade(trade=test_trade_with_offers)
+        assert sorted(o.user_id for o in offers if o.status == "rejected") == sorted([test_user3.id, test_user4.id])
+        trade = db.query(Trade).filter(Trade.id == test_trade_with_offers.id).first()
+        assert trade.pending_offer_count == len(test_user_list) - 2
+
+    async def test_owner_can_reject_all_but_one(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_user5: UserInDB,
+        test_user_list: List[UserInDB],
+        test_trade_with_offers: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        owner_client = create_authorized_client(user=test_user2)
+        res = await owner_client.post(
+            app.url_path_for("offers:reject-offers", trade_id=test_trade_with_offers.id),
+            json={"except_username": test_user5.username},
+        )
+        assert OfferBulkResult(**res.json()).affected == len(test_user_list) - 1
+        offers = OffersRepository(db).list_offers_for_trade(trade=test_trade_with_offers)
+        assert [o.user_id for o in offers if o.status == "pending"] == [test_user5.id]
+
+    async def test_cancelling_accepted_offer_keeps_owner_rejections(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_user3: UserInDB,
+        test_user4: UserInDB,
+        test_user5: UserInDB,
+        test_user6: UserInDB,
+        test_trade_with_offers: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        owner_client = create_authorized_client(user=test_user2)
+        res = await owner_client.post(
+            app.url_path_for("offers:reject-offers", trade_id=test_trade_with_offers.id),
+            json={"usernames": [test_user4.username]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        res = await owner_client.put(
+            app.url_path_for(
+                "offers:accept-offer-from-user", trade_id=test_trade_with_offers.id, username=test_user3.username,
+            )
+        )
+        assert res.status_code == status.HTTP_200_OK
+
+        accepted_user_client = create_authorized_client(user=test_user3)
+        res = await accepted_user_client.put(
+            app.url_path_for("offers:cancel-offer-from-user", trade_id=test_trade_with_offers.id)
+        )
+        assert res.status_code == status.HTTP_200_OK
+
+        offers = OffersRepository(db).list_offers_for_trade(trade=test_trade_with_offers)
+        assert {o.user_id: o.status for o in offers} == {
+            test_user3.id: "cancelled",
+            test_user4.id: "rejected",
+            test_user5.id: "pending",
+            test_user6.id: "pending",
+        }
+        trade = db.query(Trade).filter(Trade.id == test_trade_with_offers.id).first()
+        assert trade.pending_offer_count == 2
+
+    async def test_owner_can_expire_offers_on_many_trades(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_user_list: List[UserInDB],
+        test_trade_with_offers: TradeInDB,
+        test_trade_with_accepted_offer: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        owner_client = create_authorized_client(user=test_user2)
+        res = await owner_client.post(
+            app.url_path_for("offers:expire-incoming-offers"),
+            json={"trade_ids": [test_trade_with_offers.id, test_trade_with_accepted_offer.id]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        result = OfferBulkResult(**res.json())
+        # the accepted trade's other offers were already rejected, so nothing there was pending
+        assert result.by_trade == {test_trade_with_offers.id: len(test_user_list)}
+        trade = db.query(Trade).filter(Trade.id == test_trade_with_offers.id).first()
+        assert trade.pending_offer_count == 0
+
+    @pytest.mark.parametrize("body", ({}, {"usernames": ["jlo"], "except_username": "jlo"}))
+    async def test_reject_needs_exactly_one_selector(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_trade_with_offers: TradeInDB,
+        body: dict,
+    ) -> None:
+        owner_client = create_authorized_client(user=test_user2)
+        res = await owner_client.post(
+            app.url_path_for("offers:reject-offers", trade_id=test_trade_with_offers.id), json=body,
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_non_owner_cannot_bulk_update_offers(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user3: UserInDB,
+        test_trade_with_offers: TradeInDB,
+    ) -> None:
+        client = create_authorized_client(user=test_user3)
+        res = await client.post(
+            app.url_path_for("offers:expire-offers", trade_id=test_trade_with_offers.id)
+        )
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+        res = await client.post(
+            app.url_path_for("offers:expire-incoming-offers"), json={"trade_ids": [test_trade_with_offers.id]},
+        )
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+
+class TestOfferExpiry:
+    async def test_stale_pending_offers_expire_in_batches(
+        self, test_user_list: List[UserInDB], test_trade_with_offers: TradeInDB, db: session.Session,
+    ) -> None:
+        db.query(Offer).filter(Offer.trade_id == test_trade_with_offers.id).\
+            update({Offer.updated_at: func.now() - timedelta(days=30)}, synchronize_session=False)
+        db.commit()
+
+        offers_repo = OffersRepository(db)
+        expired = 0
+        while True:
+            batch = offers_repo.expire_stale_offers(ttl=timedelta(days=14), batch_size=2)
+            assert sum(batch.values()) <= 2
+            if not batch:
+                break
+            expired += batch.get(test_trade_with_offers.id, 0)
+        assert expired == len(test_user_list)
+
+        db.expire_all()
+        offers = offers_repo.list_offers_for_trade(trade=test_trade_with_offers)
+        assert {o.status for o in offers} == {"expired"}
+        trade = db.query(Trade).filter(Trade.id == test_trade_with_offers.id).first()
+        assert trade.pending_offer_count == 0
+        events = offers_repo.list_events_for_trade(trade_id=test_trade_with_offers.id)
+        assert len([e for e in events if e.status == "expired"]) == len(test_user_list)
+
+class TestOfferPartitions:
+    async def test_offers_move_to_closed_partition_when_settled(
+        self,
+        test_user3: UserInDB,
+        test_trade_with_accepted_offer: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        partitions = dict(db.execute(
+            text("SELECT user_id, tableoid::regclass::text FROM offer WHERE trade_id = :trade_id"),
+            {"trade_id": test_trade_with_accepted_offer.id},
+        ).all())
+        assert partitions.pop(test_user3.id) == "offer_live"
+        assert set(partitions.values()) == {"offer_closed"}
+
+        plan = "\n".join(db.execute(
+            text("EXPLAIN SELECT * FROM offer WHERE trade_id = :trade_id AND status IN ('pending', 'accepted')"),
+            {"trade_id": test_trade_with_accepted_offer.id},
+        ).scalars())
+        assert "offer_live" in plan and "offer_closed" not in plan
+
+    async def test_owner_can_list_only_live_offers(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_user3: UserInDB,
+        test_trade_with_accepted_offer: TradeInDB,
+    ) -> None:
+        authorized_client = create_authorized_client(user=test_user2)
+        res = await authorized_client.get(
+            app.url_path_for("offers:list-offers-for-trade", trade_id=test_trade_with_accepted_offer.id),
+            params={"live": True},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        offers = [OfferPublic(**o) for o in res.json()]
+        assert [(o.user_id, o.status) for o in offers] == [(test_user3.id, "accepted")]
+
+    async def test_accept_retries_when_a_concurrent_reject_moves_an_offer(
+        self,
+        test_user3: UserInDB,
+        test_user4: UserInDB,
+        test_user_list: List[UserInDB],
+        test_trade_with_offers: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        def wait_for_blocked_sessions(count: int) -> None:
+            for _ in range(100):
+                blocked = db.execute(text(
+                    "SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database()"
+                )).scalar()
+                db.rollback()
+                if blocked >= count:
+                    return
+                time.sleep(0.05)
+            raise AssertionError("sessions never blocked")
+
+        def reject(usernames: List[str]) -> int:
+            rejecting = SessionLocal()
+            try:
+                return OffersRepository(rejecting).reject_pending_offers(
+                    trade_id=test_trade_with_offers.id, usernames=usernames,
+                )
+            finally:
+                rejecting.close()
+
+        def accept(user_id: int) -> str:
+            accepting = SessionLocal()
+            try:
+                offer = accepting.query(Offer).\
+                    filter(Offer.trade_id == test_trade_with_offers.id, Offer.user_id == user_id).one()
+                return OffersRepository(accepting).accept_offer(offer=offer, offer_update=OfferUpdate(status="accepted")).status
+            finally:
+                accepting.close()
+
+        # holding the trade row stops the bulk reject after it has moved test_user4's offer to offer_closed
+        # but before it commits, and the accept then waits on that offer
+        holder = SessionLocal()
+        holder.execute(text("SELECT id FROM trade WHERE id = :id FOR UPDATE"), {"id": test_trade_with_offers.id})
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            rejected = pool.submit(reject, [test_user4.username])
+            wait_for_blocked_sessions(1)
+            accepted = pool.submit(accept, test_user3.id)
+            wait_for_blocked_sessions(2)
+            holder.rollback()
+            holder.close()
+            assert rejected.result() == 1
+            assert accepted.result() == "accepted"
+
+        offers = OffersRepository(db).list_offers_for_trade(trade=test_trade_with_offers)
+        assert {o.user_id: o.status for o in offers} == {
+            user.id: "accepted" if user.id == test_user3.id else "rejected" for user in test_user_list
+        }
+        events = OffersRepository(db).list_events_for_trade(trade_id=test_trade_with_offers.id, user_id=test_user4.id)
+        assert [e.status for e in events] == ["pending", "rejected"]
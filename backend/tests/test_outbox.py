@@ -0,0 +1,117 @@
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+from sqlalchemy.orm import session
+
+from app.db.metadata import OutboxMessage
+from app.db.repositories.outbox import OutboxRepository
+from app.models.product import ProductInDB
+from app.models.trade import Size, TradeCreate, TradePublicByUser
+from app.services.outbox import OutboxWorker
+
+
+pytestmark = pytest.mark.asyncio
+
+
+def queue_message(db: session.Session, *, topic: str, payload: dict) -> OutboxMessage:
+    OutboxRepository(db).add_message(topic=topic, payload=payload)
+    db.commit()
+    return db.query(OutboxMessage).filter(OutboxMessage.topic == topic).order_by(OutboxMessage.id.desc()).first()
+
+
+class TestOutboxWrites:
+    async def test_trade_creation_queues_message_in_same_transaction(
+        self, app: FastAPI, authorized_client: AsyncClient, test_product: ProductInDB, db: session.Session,
+    ) -> None:
+        new_trade = TradeCreate(product_id=test_product.id, size=Size.sample)
+        res = await authorized_client.post(app.url_path_for("trades:create-trade"), json={"new_trade": new_trade.dict()})
+        assert res.status_code == status.HTTP_201_CREATED
+        created_trade = TradePublicByUser(**res.json())
+
+        messages = db.query(OutboxMessage).filter(OutboxMessage.topic == "trade.created").all()
+        assert created_trade.id in [m.payload["trade_id"] for m in messages]
+
+
+class TestOutboxWorker:
+    # each worker only claims its own test topics, so messages other tests' fixtures queue are left alone
+    async def test_worker_runs_handler_and_marks_message_processed(self, db: session.Session) -> None:
+        worker = OutboxWorker(topics=["test.succeeds"])
+        handled = []
+
+        @worker.register("test.succeeds")
+        def handle(payload: dict) -> None:
+            handled.append(payload)
+
+        message = queue_message(db, topic="test.succeeds", payload={"n": 1})
+        other = queue_message(db, topic="test.someone_elses", payload={"n": 1})
+        while await worker.drain_once():
+            pass
+
+        assert {"n": 1} in handled
+        db.refresh(message)
+        assert message.processed_at is not None
+        assert message.attempts == 1
+        db.refresh(other)
+        assert other.attempts == 0
+        assert other.processed_at is None and other.failed_at is None
+        db.delete(other)
+        db.commit()
+
+    async def test_failing_handler_is_retried_then_dead_lettered(self, db: session.Session) -> None:
+        worker = OutboxWorker(max_attempts=2, base_retry_seconds=0, topics=["test.fails"])
+
+        @worker.register("test.fails")
+        async def handle(payload: dict) -> None:
+            raise ValueError("receiver down")
+
+        message = queue_message(db, topic="test.fails", payload={"n": 2})
+        queued_at = message.available_at
+
+        await worker.drain_once()
+        db.refresh(message)
+        assert message.attempts == 1
+        assert message.available_at > queued_at
+        assert message.failed_at is None
+        assert message.locked_until is None
+        assert "receiver down" in message.last_error
+
+        await worker.drain_once()
+        db.refresh(message)
+        assert message.attempts == 2
+        assert message.processed_at is None
+        assert message.failed_at is not None
+
+    async def test_retry_only_runs_handlers_that_failed(self, db: session.Session) -> None:
+        worker = OutboxWorker(base_retry_seconds=0, topics=["test.partly_fails"])
+        calls = []
+
+        @worker.register("test.partly_fails")
+        def first(payload: dict) -> None:
+            calls.append("first")
+
+        @worker.register("test.partly_fails")
+        def second(payload: dict) -> None:
+            calls.append("second")
+            if calls.count("second") == 1:
+                raise ValueError("try again")
+
+        message = queue_message(db, topic="test.partly_fails", payload={"n": 3})
+        while await worker.drain_once():
+            pass
+
+        assert calls == ["first", "second", "second"]
+        db.refresh(message)
+        assert message.processed_at is not None
+        assert message.attempts == 2
+
+    async def test_message_without_handler_is_not_marked_processed(self, db: session.Session) -> None:
+        worker = OutboxWorker(topics=["test.unhandled"])
+        message = queue_message(db, topic="test.unhandled", payload={"n": 4})
+        while await worker.drain_once():
+            pass
+
+        db.refresh(message)
+        assert message.processed_at is None
+        assert message.failed_at is not None
+        assert message.last_error == "no handler registered for test.unhandled"
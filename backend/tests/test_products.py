@@ -10,7 +10,16 @@ from starlette.status  import HTTP_200_OK, HTTP_404_NOT_FOUND, HTTP_422_UNPROCES
 from app.models.product import ProductCreate, ProductInDB
 from app.models.product import ProductType
 from app.models.product import ProductPublic
-from app.db.metadata import Product  
+from app.db.metadata import Product, ProductSimilarity
+from app.db.repositories.trades import TradeRepository
+from app.models.trade import TradeCreate
+from app.models.user import UserInDB
+from sqlalchemy.orm.session import Session
+import numpy as np
+from app.models.product import ProductPriceStats, SimilarProduct
+from app.models.trade import WhatDo
+from app.services.sketches import LogBucketSketch
+from app.services.recommender import build_interaction_matrix, top_k_similar
 # decorate all tests with @pytest.mark.asyncio
 pytestmark = pytest.mark.asyncio  
 
@@ -86,7 +95,8 @@ class TestGetProduct:
         res = await client.get(app.url_path_for("products:get-product-by-id",id=test_product.id))
         assert res.status_code == HTTP_200_OK
         product = ProductPublic(**res.json())
-        assert product == ProductPublic.from_orm(test_product)
+        assert product.views.views >= 1
+        assert product.copy(update={"views": None}) == ProductPublic.from_orm(test_product)
 
     @pytest.mark.parametrize(
         "id, status_code",
@@ -112,6 +122,113 @@ class TestGetProduct:
         products = [ProductPublic(**l) for l in res.json()]
         assert ProductPublic.from_orm(test_product) in products
 
+    async def test_products_can_be_retrieved_by_ids(
+        self, app: FastAPI, client: AsyncClient, test_product: Product
+    ) -> None:
+        res = await client.get(app.url_path_for("products:get-all-products"), params={"ids": [test_product.id, 999]})
+        assert res.status_code == HTTP_200_OK
+        products = [ProductPublic(**l) for l in res.json()]
+        assert [p.id for p in products] == [test_product.id]
+
+class TestProductCounters:
+    async def test_active_trade_count_follows_trades(
+        self, app: FastAPI, client: AsyncClient, test_product: Product, test_user: UserInDB, db: Session,
+    ) -> None:
+        trade_repo = TradeRepository(db)
+        starting_count = ProductPublic(**(await client.get(
+            app.url_path_for("products:get-product-by-id", id=test_product.id)
+        )).json()).active_trade_count
+
+        created_trade = trade_repo.create_trade(
+            trade_create=TradeCreate(product_id=test_product.id), user_id=test_user.id,
+        )
+        res = await client.get(app.url_path_for("products:get-product-by-id", id=test_product.id))
+        assert ProductPublic(**res.json()).active_trade_count == starting_count + 1
+
+        trade_repo.delete_trade_by_id(trade=created_trade)
+        res = await client.get(app.url_path_for("products:get-product-by-id", id=test_product.id))
+        assert ProductPublic(**res.json()).active_trade_count == starting_count
+
+class TestSimilarProducts:
+    async def test_products_with_shared_interest_are_most_similar(self) -> None:
+        # users 1 and 2 both like products 10 and 20; only user 3 likes 30
+        user_ids = np.array([1, 1, 2, 2, 2, 3, 3])
+        product_ids = np.array([10, 20, 10, 20, 20, 20, 30])
+        matrix, products = build_interaction_matrix(user_ids, product_ids)
+        neighbours = {product_id: (list(ids), list(scores)) for product_id, ids, scores in top_k_similar(matrix, products, k=1)}
+
+        assert neighbours[10][0] == [20]
+        assert neighbours[30][0] == [20]
+        assert neighbours[20][0] == [10]
+        assert 0 < neighbours[10][1][0] <= 1
+
+    async def test_similar_products_are_served_best_first(
+        self, app: FastAPI, client: AsyncClient, test_product: Product, db: Session,
+    ) -> None:
+        others = [
+            Product(product_name=f"similar_product_{n}", type=ProductType.gel) for n in range(2)
+        ]
+        db.add_all(others)
+        db.flush()
+        db.add_all([
+            ProductSimilarity(product_id=test_product.id, similar_product_id=others[0].id, score=0.2),
+            ProductSimilarity(product_id=test_product.id, similar_product_id=others[1].id, score=0.9),
+        ])
+        db.commit()
+
+        res = await client.get(app.url_path_for("products:list-similar-products", id=test_product.id))
+        assert res.status_code == HTTP_200_OK
+        similar = [SimilarProduct(**p) for p in res.json()]
+        assert [p.id for p in similar] == [others[1].id, others[0].id]
+        assert similar[0].score == 0.9
+
+        res = await client.get(app.url_path_for("products:list-similar-products", id=999))
+        assert res.status_code == HTTP_404_NOT_FOUND
+
+class TestPriceStats:
+    async def test_sketch_quantiles_are_within_relative_accuracy(self) -> None:
+        sketch = LogBucketSketch()
+        for price in range(1, 1001):
+            sketch.add(price)
+        assert sketch.count == 1000
+        assert abs(sketch.quantile(0.5) - 500) / 500 <= 0.01
+        assert abs(sketch.quantile(0.9) - 900) / 900 <= 0.01
+
+        other = LogBucketSketch()
+        other.add(5000)
+        sketch.merge(other)
+        assert abs(sketch.quantile(1) - 5000) / 5000 <= 0.01
+        sketch.add(5000, -1)
+        assert abs(sketch.quantile(1) - 1000) / 1000 <= 0.01
+
+    async def test_price_stats_follow_trades(
+        self, app: FastAPI, client: AsyncClient, test_user: UserInDB, db: Session,
+    ) -> None:
+        product = Product(product_name="priced_product", type=ProductType.oil)
+        db.add(product)
+        db.commit()
+        trade_repo = TradeRepository(db)
+        trades = [
+            trade_repo.create_trade(
+                trade_create=TradeCreate(product_id=product.id, what_do=WhatDo.sell, price=price), user_id=test_user.id,
+            )
+            for price in (10, 20, 30, 40, 100)
+        ]
+
+        res = await client.get(app.url_path_for("products:get-product-price-stats", id=product.id))
+        assert res.status_code == HTTP_200_OK
+        stats = ProductPriceStats(**res.json())
+        assert stats.product.count == 5
+        assert stats.type.count >= 5
+        assert abs(stats.product.median - 30) <= 0.3
+        assert abs(stats.product.max - 100) <= 1
+
+        trade_repo.delete_trade_by_id(trade=trades[-1])
+        res = await client.get(app.url_path_for("products:get-product-price-stats", id=product.id))
+        stats = ProductPriceStats(**res.json())
+        assert stats.product.count == 4
+        assert abs(stats.product.max - 40) <= 0.4
+
 class TestUpdateProduct:
     @pytest.mark.parametrize(
         "attrs_to_change, values",
@@ -68,6 +68,17 @@ class TestProfileView:
         )
         assert res.status_code == status.HTTP_404_NOT_FOUND          
 
+    async def test_authenticated_user_can_view_many_profiles_at_once(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB, test_user2: UserInDB
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("profiles:get-profiles-by-usernames"),
+            params={"usernames": [test_user.username, test_user2.username, "username_doesnt_match"]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        profiles = [ProfilePublic(**p) for p in res.json()]
+        assert sorted(p.username for p in profiles) == sorted([test_user.username, test_user2.username])
+
 class TestProfileManagement:
     @pytest.mark.parametrize(
         "attr, value",
@@ -110,4 +121,22 @@ class TestProfileManagement:
         res = await authorized_client.put(
             app.url_path_for("profiles:update-own-profile"), json={"profile_update": {attr: value}},
         )
-        assert res.status_code == status_code
\ No newline at end of file
+        assert res.status_code == status_code
+
+    async def test_profile_update_checks_if_match(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB,
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("profiles:get-profile-by-username", username=test_user.username))
+        etag = res.headers["etag"]
+        res = await authorized_client.put(
+            app.url_path_for("profiles:update-own-profile"),
+            json={"profile_update": {"bio": "updated once"}},
+            headers={"If-Match": etag},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        res = await authorized_client.put(
+            app.url_path_for("profiles:update-own-profile"),
+            json={"profile_update": {"bio": "updated from a stale copy"}},
+            headers={"If-Match": etag},
+        )
+        assert res.status_code == status.HTTP_412_PRECONDITION_FAILED
@@ -0,0 +1,115 @@
+from typing import Callable
+
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+from sqlalchemy.orm import session
+
+from app.db.metadata import Product
+from app.db.repositories.saved_searches import MATCH_ALL, SavedSearchesRepository, search_anchor
+from app.db.repositories.trades import TradeRepository
+from app.models.product import ProductType
+from app.models.saved_search import SavedSearchCreate, SavedSearchMatchPage, SavedSearchPublic
+from app.models.trade import Size, TradeCreate, WhatDo
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestSavedSearchRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.post(app.url_path_for("searches:create-saved-search"), json={})
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.get(app.url_path_for("searches:list-saved-searches"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.get(app.url_path_for("searches:list-saved-search-matches", id=1))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.delete(app.url_path_for("searches:delete-saved-search", id=1))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+
+class TestSavedSearchAnchor:
+    @pytest.mark.parametrize(
+        "product_id, product_type, size, anchor",
+        (
+            (7, "gel", "jumbo", "product:7"),
+            (None, "gel", "jumbo", "type:gel"),
+            (None, None, "jumbo", "size:jumbo"),
+            (None, None, None, MATCH_ALL),
+        ),
+    )
+    async def test_search_is_filed_under_most_selective_attribute(
+        self, product_id: int, product_type: str, size: str, anchor: str,
+    ) -> None:
+        assert search_anchor(product_id=product_id, product_type=product_type, size=size) == anchor
+
+
+class TestSavedSearches:
+    async def test_user_can_save_list_and_delete_searches(
+        self, app: FastAPI, authorized_client: AsyncClient, test_product: Product,
+    ) -> None:
+        res = await authorized_client.post(
+            app.url_path_for("searches:create-saved-search"),
+            json={"new_search": {"product_id": test_product.id, "size": "travel", "max_price": 10}},
+        )
+        assert res.status_code == status.HTTP_201_CREATED
+        saved_search = SavedSearchPublic(**res.json())
+        assert saved_search.size == Size.travel
+
+        res = await authorized_client.get(app.url_path_for("searches:list-saved-searches"))
+        assert saved_search.id in [s["id"] for s in res.json()]
+
+        res = await authorized_client.delete(app.url_path_for("searches:delete-saved-search", id=saved_search.id))
+        assert res.status_code == status.HTTP_200_OK
+        res = await authorized_client.get(app.url_path_for("searches:list-saved-search-matches", id=saved_search.id))
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_new_trades_are_matched_against_saved_searches(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        db: session.Session,
+        test_product: Product,
+        test_user2: UserInDB,
+        test_user3: UserInDB,
+    ) -> None:
+        searches_repo = SavedSearchesRepository(db)
+        trade_repo = TradeRepository(db)
+        cheap_jumbo = searches_repo.create_saved_search(
+            user_id=test_user3.id, search_create=SavedSearchCreate(size=Size.jumbo, max_price=5),
+        )
+        same_product = searches_repo.create_saved_search(
+            user_id=test_user3.id, search_create=SavedSearchCreate(product_id=test_product.id),
+        )
+        other_type = searches_repo.create_saved_search(
+            user_id=test_user3.id, search_create=SavedSearchCreate(product_type=ProductType.shampoo),
+        )
+
+        trade = trade_repo.create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.jumbo, what_do=WhatDo.sell, price=20),
+            user_id=test_user2.id,
+        )
+        # what the trade.created outbox handler does
+        matches = searches_repo.match_trade(trade_id=trade.id)
+        assert (same_product.id, test_user3.id) in matches
+        assert cheap_jumbo.id not in [search_id for search_id, _ in matches]
+        assert other_type.id not in [search_id for search_id, _ in matches]
+        # a retried message doesn't report the same matches again
+        assert searches_repo.match_trade(trade_id=trade.id) == []
+
+        client = create_authorized_client(user=test_user3)
+        res = await client.get(app.url_path_for("searches:list-saved-search-matches", id=same_product.id))
+        assert res.status_code == status.HTTP_200_OK
+        assert trade.id in [t.id for t in SavedSearchMatchPage(**res.json()).trades]
+
+    async def test_own_trades_do_not_match(
+        self, db: session.Session, test_product: Product, test_user3: UserInDB,
+    ) -> None:
+        searches_repo = SavedSearchesRepository(db)
+        searches_repo.create_saved_search(user_id=test_user3.id, search_create=SavedSearchCreate())
+        trade = TradeRepository(db).create_trade(
+            trade_create=TradeCreate(product_id=test_product.id), user_id=test_user3.id,
+        )
+        assert test_user3.id not in [user_id for _, user_id in searches_repo.match_trade(trade_id=trade.id)]
@@ -0,0 +1,135 @@
+from typing import Callable, List
+
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+from sqlalchemy import delete
+from sqlalchemy.orm import session
+
+from app.db.metadata import Product, SwapMatch, Trade, WishlistItem
+from app.db.repositories.products import ProductsRepository
+from app.db.repositories.swaps import SwapsRepository
+from app.db.repositories.trades import TradeRepository
+from app.db.repositories.wishlist import WishlistRepository
+from app.models.product import ProductCreate, ProductType
+from app.models.swap import SwapMatchPage
+from app.models.trade import TradeCreate
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def swap_products(db: session.Session) -> List[Product]:
+    products_repo = ProductsRepository(db)
+    products = []
+    for n in range(3):
+        name = f"swap_product_{n}"
+        products.append(
+            products_repo.get_product_by_name(name=name) or
+            products_repo.create_product(ProductCreate(product_name=name, type=ProductType.gel))
+        )
+    return products
+
+
+def list_for_trade(db: session.Session, *, user: UserInDB, product: Product) -> Trade:
+    return TradeRepository(db).create_trade(trade_create=TradeCreate(product_id=product.id), user_id=user.id)
+
+
+class TestSwapRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("swaps:list-swap-matches"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+
+class TestSwapMatching:
+    async def test_two_way_swap_is_matched_and_removed_with_the_listing(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        db: session.Session,
+        test_user3: UserInDB,
+        test_user4: UserInDB,
+        swap_products: List[Product],
+    ) -> None:
+        swaps_repo = SwapsRepository(db)
+        wishlist_repo = WishlistRepository(db)
+        gel, spray, _ = swap_products
+        trade_3 = list_for_trade(db, user=test_user3, product=gel)
+        trade_4 = list_for_trade(db, user=test_user4, product=spray)
+        wishlist_repo.add_item(user_id=test_user3.id, product_id=spray.id)
+        wishlist_repo.add_item(user_id=test_user4.id, product_id=gel.id)
+
+        # what the outbox handler does for the new listing
+        assert swaps_repo.match_trades(trade_ids=[trade_4.id]) == 1
+        # finding the same cycle from the other listing doesn't duplicate it
+        assert swaps_repo.match_trades(trade_ids=[trade_3.id]) == 0
+
+        client = create_authorized_client(user=test_user3)
+        res = await client.get(app.url_path_for("swaps:list-swap-matches"))
+        assert res.status_code == status.HTTP_200_OK
+        page = SwapMatchPage(**res.json())
+        match = next(m for m in page.matches if {t.id for t in m.trades} == {trade_3.id, trade_4.id})
+        assert match.length == 2
+
+        TradeRepository(db).delete_trade_by_id(trade=trade_4)
+        res = await client.get(app.url_path_for("swaps:list-swap-matches"))
+        assert match.id not in [m["id"] for m in res.json()["matches"]]
+
+    async def test_three_way_swap_is_matched(
+        self,
+        db: session.Session,
+        test_user3: UserInDB,
+        test_user4: UserInDB,
+        test_user5: UserInDB,
+        swap_products: List[Product],
+    ) -> None:
+        swaps_repo = SwapsRepository(db)
+        wishlist_repo = WishlistRepository(db)
+        users = [test_user3, test_user4, test_user5]
+        trades = [list_for_trade(db, user=u, product=p) for u, p in zip(users, swap_products)]
+        # each user wants what the previous one has
+        for n, user in enumerate(users):
+            wishlist_repo.add_item(user_id=user.id, product_id=swap_products[n - 1].id)
+
+        swaps_repo.match_trades(trade_ids=[trades[1].id])
+        matches = swaps_repo.list_matches_for_user(user_id=test_user5.id)
+        assert any(len(m.trade_ids) == 3 and set(m.trade_ids) == {t.id for t in trades} for m in matches)
+
+        # dropping a wish breaks the cycle
+        wishlist_repo.remove_item(item=wishlist_repo.get_item(user_id=test_user4.id, product_id=swap_products[0].id))
+        matches = swaps_repo.list_matches_for_user(user_id=test_user5.id)
+        assert not any(set(m.trade_ids) == {t.id for t in trades} for m in matches)
+
+    async def test_rebuild_keeps_live_matches_and_drops_stale_ones(
+        self,
+        db: session.Session,
+        test_user5: UserInDB,
+        test_user6: UserInDB,
+        swap_products: List[Product],
+    ) -> None:
+        swaps_repo = SwapsRepository(db)
+        wishlist_repo = WishlistRepository(db)
+        _, spray, cream = swap_products
+        trade_5 = list_for_trade(db, user=test_user5, product=cream)
+        trade_6 = list_for_trade(db, user=test_user6, product=spray)
+        wishlist_repo.add_item(user_id=test_user5.id, product_id=spray.id)
+        wishlist_repo.add_item(user_id=test_user6.id, product_id=cream.id)
+        swaps_repo.match_trades(trade_ids=[trade_5.id])
+        cycle_key = ",".join(map(str, sorted([trade_5.id, trade_6.id])))
+        match = db.query(SwapMatch).filter(SwapMatch.cycle_key == cycle_key).one()
+
+        assert swaps_repo.rebuild_matches(batch_size=1) >= 1
+        assert db.query(SwapMatch.id).filter(SwapMatch.cycle_key == cycle_key).scalar() == match.id
+
+        # a wish dropped behind the incremental matcher's back is only caught by the rebuild
+        db.execute(
+            delete(WishlistItem.__table__).where(
+                WishlistItem.user_id == test_user6.id, WishlistItem.product_id == cream.id,
+            )
+        )
+        db.commit()
+        swaps_repo.rebuild_matches(batch_size=1)
+        assert db.query(SwapMatch).filter(SwapMatch.cycle_key == cycle_key).count() == 0
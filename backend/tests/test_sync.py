@@ -0,0 +1,134 @@
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+from sqlalchemy import text
+from sqlalchemy.orm import session
+
+from app.db.metadata import Product, Trade
+from app.db.repositories.products import ProductsRepository
+from app.db.repositories.trades import TradeRepository
+from app.models.product import ProductCreate, ProductInDB, ProductType
+from app.models.sync import SyncChanges
+from app.models.trade import Size, TradeCreate, TradeUpdate
+from app.models.user import UserInDB
+
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestSyncRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("sync:get-changes"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+    async def test_unauthorized_user_cannot_sync(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("sync:get-changes"))
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestSync:
+    async def test_first_sync_returns_everything(
+        self, app: FastAPI, authorized_client: AsyncClient, test_product: ProductInDB,
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("sync:get-changes"))
+        assert res.status_code == status.HTTP_200_OK
+        changes = SyncChanges(**res.json())
+        assert changes.reset
+        assert test_product.id in [p.id for p in changes.products]
+
+    async def test_delta_holds_changes_and_deletions_since_watermark(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+        test_product: ProductInDB,
+        db: session.Session,
+    ) -> None:
+        trade_repo = TradeRepository(db)
+        updated_trade = trade_repo.create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.sample), user_id=test_user.id,
+        )
+        deleted_trade = trade_repo.create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.sample), user_id=test_user.id,
+        )
+        res = await authorized_client.get(app.url_path_for("sync:get-changes"))
+        watermark = SyncChanges(**res.json()).watermark
+
+        trade_repo.update_trade(trade=updated_trade, trade_update=TradeUpdate(size=Size.jumbo))
+        deleted_id = trade_repo.delete_trade_by_id(trade=deleted_trade)
+
+        res = await authorized_client.get(app.url_path_for("sync:get-changes"), params={"since": watermark.isoformat()})
+        assert res.status_code == status.HTTP_200_OK
+        changes = SyncChanges(**res.json())
+        assert not changes.reset
+        assert updated_trade.id in [t.id for t in changes.trades]
+        assert ("trade", deleted_id) in [(t.kind, t.item_id) for t in changes.tombstones]
+        assert changes.watermark >= watermark
+
+    async def test_first_sync_is_paged_per_kind(
+        self, app: FastAPI, authorized_client: AsyncClient, test_product: ProductInDB, db: session.Session,
+    ) -> None:
+        # enough products to need more than one page, even when this test runs alone
+        products_repo = ProductsRepository(db)
+        for i in range(3):
+            name = f"sync_paged_product_{i}"
+            products_repo.get_product_by_name(name=name) or products_repo.create_product(
+                ProductCreate(product_name=name, type=ProductType.gel),
+            )
+
+        product_ids, trade_ids, watermarks = [], [], []
+        params = {"limit": 2}
+        while True:
+            res = await authorized_client.get(app.url_path_for("sync:get-changes"), params=params)
+            assert res.status_code == status.HTTP_200_OK
+            changes = SyncChanges(**res.json())
+            assert changes.reset
+            assert len(changes.products) <= 2 and len(changes.trades) <= 2
+            product_ids += [p.id for p in changes.products]
+            trade_ids += [t.id for t in changes.trades]
+            watermarks.append(changes.watermark)
+            if changes.next_cursor is None:
+                break
+            # a page that was cut off only vouches for what it sent
+            sent = [r.updated_at for r in changes.products + changes.trades + changes.offers]
+            assert changes.watermark <= max(sent)
+            params = {"limit": 2, "cursor": changes.next_cursor}
+
+        assert len(watermarks) > 1
+        assert sorted(product_ids) == sorted(set(product_ids))
+        assert set(product_ids) == {id for id, in db.query(Product.id)}
+        assert set(trade_ids) == {id for id, in db.query(Trade.id)}
+        assert watermarks == sorted(watermarks)
+
+    async def test_bad_sync_cursor_is_rejected(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        res = await authorized_client.get(app.url_path_for("sync:get-changes"), params={"cursor": "bm90LWEtY3Vyc29y"})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_rows_deleted_during_a_paged_reset_are_tombstoned(
+        self, app: FastAPI, authorized_client: AsyncClient, test_product: ProductInDB, db: session.Session,
+    ) -> None:
+        products_repo = ProductsRepository(db)
+        product = products_repo.get_product_by_name(name="sync_deleted_product") or products_repo.create_product(
+            ProductCreate(product_name="sync_deleted_product", type=ProductType.gel),
+        )
+        # oldest first, so it is the one product on the first page
+        db.execute(text("UPDATE product SET updated_at = '1970-01-01' WHERE id = :id"), {"id": product.id})
+        db.commit()
+
+        res = await authorized_client.get(app.url_path_for("sync:get-changes"), params={"limit": 1})
+        changes = SyncChanges(**res.json())
+        assert changes.reset
+        assert [p.id for p in changes.products] == [product.id]
+        assert changes.next_cursor is not None
+
+        products_repo.delete_product_by_id(id=product.id)
+        tombstones = []
+        while changes.next_cursor is not None:
+            res = await authorized_client.get(
+                app.url_path_for("sync:get-changes"), params={"limit": 1, "cursor": changes.next_cursor},
+            )
+            assert res.status_code == status.HTTP_200_OK
+            changes = SyncChanges(**res.json())
+            tombstones += [(t.kind, t.item_id) for t in changes.tombstones]
+        assert ("product", product.id) in tombstones
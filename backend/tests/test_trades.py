@@ -1,17 +1,26 @@
-from typing import List
+from datetime import timedelta
+from typing import Dict, List
 from fastapi.exceptions import HTTPException
 import pytest
 from fastapi import FastAPI, status
 from httpx import AsyncClient
+from sqlalchemy import func
 from sqlalchemy.orm import session
 from starlette.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND
 from app.api.routes.products import create_new_product
-from app.db.metadata import Trade
+from app.db.metadata import Product, Trade, TradeArchive
+from app.db.repositories.products import ProductsRepository
 from app.db.repositories.trades import TradeRepository
-from app.models.product import ProductInDB, ProductType
+from app.models.product import ProductCreate, ProductInDB, ProductType, ProductUpdate
 
 from app.models.user import UserInDB
-from app.models.trade import TradeInDB, TradePublic, TradePublicByProduct, TradePublicByUser, Size, TradeCreate, WhatDo
+from app.models.trade import TradeBrowsePage, TradeInDB, TradePublic, TradePublicByProduct, TradePublicByUser, Size, TradeCreate, TradeUpdate, WhatDo
+from app.models.feed import FeedPage
+from app.models.trending import TrendingFeed
+from app.db.repositories.views import ViewsRepository
+from app.services import trending_tracker, view_counter
+from app.services.sketches import HyperLogLog
+from app.services.trending import EVENT_WEIGHTS, PRODUCT, TRADE, DecayedSpaceSaving, TrendingTracker
 
 pytestmark = pytest.mark.asyncio
 
@@ -105,7 +114,8 @@ class TestGetTrade:
     async def test_trade_can_be_retrieved_by_id(self, app:FastAPI, client: AsyncClient, test_trade:TradeInDB)-> None:
         res = await client.get(app.url_path_for("trades:get-trade-by-id", trade_id=test_trade.id))
         returned_trade = TradePublic(**res.json())
-        assert TradePublic.from_orm(test_trade) == returned_trade
+        assert returned_trade.views.views >= 1
+        assert TradePublic.from_orm(test_trade) == returned_trade.copy(update={"views": None})
 
     @pytest.mark.parametrize(
         "id, status_code",
@@ -181,6 +191,243 @@ class TestGetTrade:
         assert isinstance(res.json(), list)
         assert len(res.json()) > 0
 
+    async def test_trades_can_be_retrieved_by_ids(self, app:FastAPI, client:AsyncClient, test_trade:TradeInDB, test_trade2:TradeInDB) -> None:
+        res = await client.get(app.url_path_for("trades:get-all-trades"), params={"ids": [test_trade.id, test_trade2.id]})
+        assert res.status_code == HTTP_200_OK
+        trades = [TradePublic(**l) for l in res.json()]
+        assert sorted(t.id for t in trades) == sorted([test_trade.id, test_trade2.id])
+
+class TestBrowseTrades:
+    async def test_browse_filters_are_combined(
+        self, app:FastAPI, client:AsyncClient, test_trade:TradeInDB, test_trade2:TradeInDB
+    ) -> None:
+        res = await client.get(
+            app.url_path_for("trades:browse-trades"),
+            params={"what_do": "give away", "size": "jumbo", "product_type": "cream", "limit": 100},
+        )
+        assert res.status_code == HTTP_200_OK
+        page = TradeBrowsePage(**res.json())
+        trade_ids = [t.id for t in page.trades]
+        assert test_trade2.id in trade_ids
+        assert test_trade.id not in trade_ids
+        for trade in page.trades:
+            assert trade.what_do == WhatDo.giveaway
+            assert trade.size == Size.jumbo
+            assert trade.product.type == ProductType.cream
+
+    async def test_browse_returns_facet_counts(
+        self, app:FastAPI, client:AsyncClient, test_trade:TradeInDB, test_trade2:TradeInDB, db:session.Session
+    ) -> None:
+        res = await client.get(app.url_path_for("trades:browse-trades"))
+        assert res.status_code == HTTP_200_OK
+        facets = TradeBrowsePage(**res.json()).facets
+        assert facets.what_do["trade"] == db.query(Trade).filter(Trade.what_do == "trade").count()
+        assert facets.size["jumbo"] == db.query(Trade).filter(Trade.size == "jumbo").count()
+
+    async def test_facet_counts_follow_trade_updates_and_deletes(
+        self, app:FastAPI, client:AsyncClient, test_user:UserInDB, test_product:ProductInDB, db:session.Session
+    ) -> None:
+        async def size_counts() -> Dict[str, int]:
+            res = await client.get(app.url_path_for("trades:browse-trades"))
+            return TradeBrowsePage(**res.json()).facets.size
+
+        trade_repo = TradeRepository(db)
+        starting = await size_counts()
+        created_trade = trade_repo.create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.sample), user_id=test_user.id,
+        )
+        assert (await size_counts()).get("sample", 0) == starting.get("sample", 0) + 1
+
+        # the trade moves from the old size bucket to the new one
+        trade_repo.update_trade(trade=created_trade, trade_update=TradeUpdate(size=Size.jumbo))
+        counts = await size_counts()
+        assert counts.get("sample", 0) == starting.get("sample", 0)
+        assert counts.get("jumbo", 0) == starting.get("jumbo", 0) + 1
+
+        trade_repo.delete_trade_by_id(trade=created_trade)
+        counts = await size_counts()
+        assert counts.get("sample", 0) == starting.get("sample", 0)
+        assert counts.get("jumbo", 0) == starting.get("jumbo", 0)
+
+    async def test_facet_counts_follow_product_type_changes(
+        self, app:FastAPI, client:AsyncClient, test_user:UserInDB, db:session.Session
+    ) -> None:
+        async def type_counts() -> Dict[str, int]:
+            res = await client.get(app.url_path_for("trades:browse-trades"))
+            return TradeBrowsePage(**res.json()).facets.type
+
+        products_repo = ProductsRepository(db)
+        product = products_repo.get_product_by_name(name="facet_moving_product") or products_repo.create_product(
+            ProductCreate(product_name="facet_moving_product", type=ProductType.mousse),
+        )
+        products_repo.update_product(id=product.id, product_update=ProductUpdate(type=ProductType.mousse))
+        starting = await type_counts()
+        TradeRepository(db).create_trade(trade_create=TradeCreate(product_id=product.id), user_id=test_user.id)
+        TradeRepository(db).create_trade(trade_create=TradeCreate(product_id=product.id), user_id=test_user.id)
+        assert (await type_counts()).get("mousse", 0) == starting.get("mousse", 0) + 2
+
+        # every trade of the product moves to the new type
+        products_repo.update_product(id=product.id, product_update=ProductUpdate(type=ProductType.oil))
+        counts = await type_counts()
+        assert counts.get("mousse", 0) == starting.get("mousse", 0)
+        assert counts.get("oil", 0) == starting.get("oil", 0) + 2
+
+        products_repo.delete_product_by_id(id=product.id)
+        counts = await type_counts()
+        assert counts.get("mousse", 0) == starting.get("mousse", 0)
+        assert counts.get("oil", 0) == starting.get("oil", 0)
+
+    async def test_browse_pages_follow_cursor(
+        self, app:FastAPI, client:AsyncClient, test_trade:TradeInDB, test_trade2:TradeInDB
+    ) -> None:
+        res = await client.get(app.url_path_for("trades:browse-trades"), params={"limit": 1})
+        first_page = TradeBrowsePage(**res.json())
+        assert first_page.next_cursor is not None
+        res = await client.get(
+            app.url_path_for("trades:browse-trades"), params={"limit": 1, "cursor": first_page.next_cursor}
+        )
+        second_page = TradeBrowsePage(**res.json())
+        assert second_page.trades[0].id < first_page.trades[0].id
+
+    async def test_facet_repair_reads_enum_columns(
+        self, test_trade:TradeInDB, test_trade2:TradeInDB, db:session.Session
+    ) -> None:
+        trade_repo = TradeRepository(db)
+        trade_repo.facets_repo.repair_facet_counts()
+        facets = trade_repo.get_facet_counts()
+        assert facets["what_do"]["give away"] == db.query(Trade).filter(Trade.what_do == "give away").count()
+        assert facets["type"]["cream"] == db.query(Trade).join(Trade.product).filter(Product.type == "cream").count()
+        # loaded back as the plain strings the rest of the code compares against
+        assert db.query(Trade.what_do).filter(Trade.id == test_trade2.id).scalar() == "give away"
+
+class TestFeed:
+    async def test_feed_entries_follow_trade_writes(
+        self, app:FastAPI, client:AsyncClient, test_user:UserInDB, test_product:ProductInDB, db:session.Session
+    ) -> None:
+        async def feed_entry(trade_id:int):
+            res = await client.get(app.url_path_for("trades:list-feed"), params={"limit": 100})
+            assert res.status_code == HTTP_200_OK
+            return next((e for e in FeedPage(**res.json()).entries if e.trade_id == trade_id), None)
+
+        trade_repo = TradeRepository(db)
+        created_trade = trade_repo.create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, what_do=WhatDo.sell, size=Size.sample, price=12.5),
+            user_id=test_user.id,
+        )
+        entry = await feed_entry(created_trade.id)
+        assert entry.product_name == test_product.product_name
+        assert entry.username == test_user.username
+        assert entry.price == 12.5
+
+        trade_repo.update_trade(trade=created_trade, trade_update=TradeUpdate(size=Size.jumbo))
+        assert (await feed_entry(created_trade.id)).size == Size.jumbo
+
+        trade_repo.delete_trade_by_id(trade=created_trade)
+        assert await feed_entry(created_trade.id) is None
+
+    async def test_feed_pages_follow_cursor(
+        self, app:FastAPI, client:AsyncClient, test_trade:TradeInDB, test_trade2:TradeInDB
+    ) -> None:
+        res = await client.get(app.url_path_for("trades:list-feed"), params={"limit": 1})
+        first_page = FeedPage(**res.json())
+        assert first_page.next_cursor is not None
+        res = await client.get(app.url_path_for("trades:list-feed"), params={"limit": 1, "cursor": first_page.next_cursor})
+        second_page = FeedPage(**res.json())
+        first, second = first_page.entries[0], second_page.entries[0]
+        assert (second.created_at, second.trade_id) < (first.created_at, first.trade_id)
+
+class TestTrending:
+    async def test_scores_decay_with_age(self) -> None:
+        counter = DecayedSpaceSaving(capacity=10, half_life=3600, clock=lambda: 0)
+        counter.add(1, 4.0, now=0)
+        counter.add(2, 3.0, now=3600)
+        # item 1's 4 has halved to 2 by the time item 2 scores 3
+        assert [key for key, _ in counter.top(2, now=3600)] == [2, 1]
+        assert abs(dict(counter.top(2, now=3600))[1] - 2.0) < 1e-9
+
+    async def test_heavy_hitters_survive_eviction(self) -> None:
+        counter = DecayedSpaceSaving(capacity=3, half_life=3600, clock=lambda: 0)
+        for n in range(100):
+            counter.add(7, 1.0, now=0)
+            counter.add(1000 + n, 1.0, now=0)
+        assert len(counter.scores) == 3
+        assert counter.top(1, now=0)[0][0] == 7
+
+    async def test_restarting_reloads_the_checkpoint_without_doubling(self, app: FastAPI) -> None:
+        tracker = TrendingTracker()
+        tracker.record(event_type="offer.accepted", trade_id=1)
+        tracker.save_checkpoint()
+        tracker.load_checkpoint()
+        tracker.load_checkpoint()
+        [(key, score)] = tracker.counters[TRADE].top(1)
+        assert key == 1
+        assert abs(score - EVENT_WEIGHTS["offer.accepted"]) < 1e-3
+
+    async def test_trending_feed_is_served_from_snapshot(
+        self, app: FastAPI, client: AsyncClient, test_trade: TradeInDB,
+    ) -> None:
+        def leads(kind: str, key: int) -> bool:
+            return trending_tracker.counters[kind].top(1)[0][0] == key
+
+        # the counters are shared with the offer activity of every earlier test, so keep going until it leads
+        for _ in range(10000):
+            trending_tracker.record(event_type="offer.accepted", trade_id=test_trade.id, product_id=test_trade.product_id)
+            if leads(TRADE, test_trade.id) and leads(PRODUCT, test_trade.product_id):
+                break
+        await trending_tracker.refresh()
+
+        res = await client.get(app.url_path_for("trades:list-trending"))
+        assert res.status_code == HTTP_200_OK
+        feed = TrendingFeed(**res.json())
+        assert feed.trades[0].id == test_trade.id
+        assert feed.products[0].id == test_trade.product_id
+
+class TestViewCounts:
+    async def test_unique_viewers_are_estimated_within_a_few_percent(self) -> None:
+        viewers = HyperLogLog()
+        for n in range(10000):
+            viewers.add(f"viewer-{n}")
+            viewers.add(f"viewer-{n}")
+        assert abs(viewers.count() - 10000) / 10000 < 0.05
+
+    async def test_views_are_buffered_then_flushed_in_one_batch(
+        self, app: FastAPI, client: AsyncClient, test_trade: TradeInDB, db: session.Session,
+    ) -> None:
+        view_counter.flush()
+        stored = ViewsRepository(db).get_view_count(kind="trade", item_id=test_trade.id)
+        stored_views = stored.views if stored else 0
+
+        for _ in range(3):
+            res = await client.get(app.url_path_for("trades:get-trade-by-id", trade_id=test_trade.id))
+        assert TradePublic(**res.json()).views.views == stored_views + 3
+
+        assert view_counter.flush() >= 1
+        db.expire_all()
+        stored = ViewsRepository(db).get_view_count(kind="trade", item_id=test_trade.id)
+        assert stored.views == stored_views + 3
+        assert HyperLogLog(stored.unique_viewers).count() >= 1
+
+class TestArchiveTrades:
+    async def test_old_idle_trades_are_archived_and_removed(
+        self, test_user:UserInDB, test_product:ProductInDB, db:session.Session
+    ) -> None:
+        trade_repo = TradeRepository(db)
+        created_trade = trade_repo.create_trade(
+            trade_create=TradeCreate(product_id=test_product.id, size=Size.sample), user_id=test_user.id,
+        )
+        db.query(Trade).filter(Trade.id == created_trade.id).\
+            update({Trade.created_at: func.now() - timedelta(days=3650)}, synchronize_session=False)
+        db.commit()
+
+        trade_id = created_trade.id
+        while trade_repo.archive_stale_trades(older_than=timedelta(days=3000), batch_size=10):
+            pass
+        db.expire_all()
+        assert db.query(Trade).filter(Trade.id == trade_id).first() is None
+        archived = db.query(TradeArchive).filter(TradeArchive.id == trade_id).first()
+        assert archived.trade["size"] == "sample"
+        assert archived.offers == []
+
 class TestUpdateTrade:
     @pytest.mark.parametrize(
         "attrs_to_change, values",
@@ -240,19 +487,22 @@ class TestUpdateTrade:
             (-1, {"comment": "test"}, 422),
             (0, {"comment": "test2"}, 422),
             (500, {"comment": "test3"}, 404),
-            (1, None, 422),
-            (1, {"what_do": "invalid what_do"}, 422),
-            (1, {"size": None}, 400),
+            # None stands for the id of a trade the user owns
+            (None, None, 422),
+            (None, {"what_do": "invalid what_do"}, 422),
+            (None, {"size": None}, 400),
         ),
     )
     async def test_update_trade_with_invalid_input_throws_error(
         self,
         app: FastAPI,
         authorized_client: AsyncClient,
+        test_trade: TradeInDB,
         id: int,
         payload: dict,
         status_code: int,
     ) -> None:
+        id = test_trade.id if id is None else id
         trade_update = {"trade_update": payload}
         res = await authorized_client.put(
             app.url_path_for("trades:update-trade-by-id", trade_id=id),
@@ -276,6 +526,42 @@ class TestUpdateTrade:
         )
         assert res.status_code == status.HTTP_403_FORBIDDEN
 
+class TestTradeVersioning:
+    async def test_update_with_stale_etag_is_refused(
+        self, app: FastAPI, authorized_client: AsyncClient, test_trade: TradeInDB,
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("trades:get-trade-by-id", trade_id=test_trade.id))
+        assert res.status_code == HTTP_200_OK
+        etag = res.headers["etag"]
+
+        res = await authorized_client.put(
+            app.url_path_for("trades:update-trade-by-id", trade_id=test_trade.id),
+            json={"trade_update": {"comment": "first editor"}},
+            headers={"If-Match": etag},
+        )
+        assert res.status_code == HTTP_200_OK
+        assert res.headers["etag"] != etag
+
+        # a second editor still holding the old ETag doesn't overwrite the first
+        res = await authorized_client.put(
+            app.url_path_for("trades:update-trade-by-id", trade_id=test_trade.id),
+            json={"trade_update": {"comment": "second editor"}},
+            headers={"If-Match": etag},
+        )
+        assert res.status_code == status.HTTP_412_PRECONDITION_FAILED
+        res = await authorized_client.get(app.url_path_for("trades:get-trade-by-id", trade_id=test_trade.id))
+        assert TradePublic(**res.json()).comment == "first editor"
+
+    async def test_unrecognised_etag_is_refused(
+        self, app: FastAPI, authorized_client: AsyncClient, test_trade: TradeInDB,
+    ) -> None:
+        res = await authorized_client.put(
+            app.url_path_for("trades:update-trade-by-id", trade_id=test_trade.id),
+            json={"trade_update": {"comment": "test"}},
+            headers={"If-Match": '"not-a-version"'},
+        )
+        assert res.status_code == status.HTTP_412_PRECONDITION_FAILED
+
 class TestDeleteTrade:
     async def test_trade_can_be_deleted(self, app:FastAPI, authorized_client: AsyncClient, test_trade:TradeInDB)-> None:
         res = await authorized_client.delete(app.url_path_for("trades:delete-trade-by-id", trade_id=test_trade.id))
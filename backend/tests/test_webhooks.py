@@ -0,0 +1,271 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from typing import Callable
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+from sqlalchemy.orm import session
+
+from app.db.metadata import OutboxMessage, WebhookDeadLetter, WebhookDelivery
+from app.db.repositories.offers import OffersRepository
+from app.db.repositories.webhooks import WebhooksRepository
+from app.models.trade import TradeInDB
+from app.models.user import UserInDB
+from app.models.webhook import WebhookSubscriptionCreate, WebhookSubscriptionInDB, WebhookSubscriptionPublic
+from app.services.outbox_handlers import deliver_offer_webhooks
+from app.services.webhooks import (
+    SIGNATURE_HEADER, UnsafeWebhookUrl, WebhookDispatcher, check_webhook_url, queue_webhook_deliveries, sign_body,
+)
+from benchmarks.webhook_receiver import WebhookReceiver
+
+
+pytestmark = pytest.mark.asyncio
+
+# a public address literal, so subscribing passes the URL check without a DNS lookup
+PUBLIC_HOOK_URL = "https://93.184.215.14/hooks"
+
+
+@pytest.fixture
+def create_webhook_target(db: session.Session, test_user: UserInDB) -> Callable:
+    webhooks_repo = WebhooksRepository(db)
+    created = []
+
+    def _create_webhook_target(*, url: str = "https://receiver.test/hooks") -> WebhookSubscriptionInDB:
+        subscription = webhooks_repo.create_subscription(
+            user_id=test_user.id, subscription_create=WebhookSubscriptionCreate(url=url),
+        )
+        created.append(subscription)
+        return WebhookSubscriptionInDB.from_orm(subscription)
+
+    yield _create_webhook_target
+    for subscription in created:
+        webhooks_repo.delete_subscription(subscription=subscription)
+
+
+def allow_any_url(url: str) -> None:
+    # the in-process receiver isn't reachable by DNS, so the dispatcher tests skip the address check
+    pass
+
+
+class TestWebhookRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.post(app.url_path_for("webhooks:create-subscription"), json={})
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.get(app.url_path_for("webhooks:list-subscriptions"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.delete(app.url_path_for("webhooks:delete-subscription", id=1))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+    async def test_unauthorized_user_cannot_subscribe(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.post(
+            app.url_path_for("webhooks:create-subscription"),
+            json={"new_subscription": {"url": "https://example.com/hooks"}},
+        )
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestWebhookSubscriptions:
+    async def test_user_can_create_list_and_delete_subscriptions(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB,
+    ) -> None:
+        res = await authorized_client.post(
+            app.url_path_for("webhooks:create-subscription"),
+            json={"new_subscription": {"url": PUBLIC_HOOK_URL, "events": ["offer.pending"]}},
+        )
+        assert res.status_code == status.HTTP_201_CREATED
+        subscription = WebhookSubscriptionPublic(**res.json())
+        assert subscription.user_id == test_user.id
+        assert subscription.events == ["offer.pending"]
+        assert subscription.secret
+
+        res = await authorized_client.get(app.url_path_for("webhooks:list-subscriptions"))
+        assert subscription.id in [s["id"] for s in res.json()]
+
+        res = await authorized_client.delete(app.url_path_for("webhooks:delete-subscription", id=subscription.id))
+        assert res.status_code == status.HTTP_200_OK
+        res = await authorized_client.delete(app.url_path_for("webhooks:delete-subscription", id=subscription.id))
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    async def test_unknown_event_type_is_rejected(self, app: FastAPI, authorized_client: AsyncClient) -> None:
+        res = await authorized_client.post(
+            app.url_path_for("webhooks:create-subscription"),
+            json={"new_subscription": {"url": "https://example.com/hooks", "events": ["offer.exploded"]}},
+        )
+        assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    @pytest.mark.parametrize(
+        "url",
+        (
+            "http://example.com/hooks",
+            "https://127.0.0.1:8000/hooks",
+            "https://169.254.169.254/latest/meta-data/",
+            "https://10.0.0.7/hooks",
+            "https://192.168.1.1/hooks",
+            "https://[::1]/hooks",
+        ),
+    )
+    async def test_internal_and_plain_http_urls_are_rejected(
+        self, app: FastAPI, authorized_client: AsyncClient, url: str,
+    ) -> None:
+        res = await authorized_client.post(
+            app.url_path_for("webhooks:create-subscription"), json={"new_subscription": {"url": url}},
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize(
+        "url", ("https://localhost/hooks", "https://[::ffff:127.0.0.1]/hooks", "https://100.64.0.1/hooks"),
+    )
+    async def test_url_check_looks_at_resolved_addresses(self, url: str) -> None:
+        with pytest.raises(UnsafeWebhookUrl):
+            check_webhook_url(url)
+
+
+    async def test_expired_offers_reach_subscriptions_filtering_on_them(
+        self,
+        app: FastAPI,
+        create_authorized_client: Callable,
+        test_user2: UserInDB,
+        test_trade_with_offers: TradeInDB,
+        db: session.Session,
+    ) -> None:
+        client = create_authorized_client(user=test_user2)
+        res = await client.post(
+            app.url_path_for("webhooks:create-subscription"),
+            json={"new_subscription": {"url": PUBLIC_HOOK_URL, "events": ["offer.expired"]}},
+        )
+        assert res.status_code == status.HTTP_201_CREATED
+        subscription = WebhookSubscriptionPublic(**res.json())
+
+        OffersRepository(db).expire_pending_offers(trade_ids=[test_trade_with_offers.id])
+        message = db.query(OutboxMessage).filter(OutboxMessage.topic == "offer.status_changed").\
+            order_by(OutboxMessage.id.desc()).first()
+        assert message.payload["type"] == "offer.expired"
+        # what the outbox worker does with it
+        await deliver_offer_webhooks(message.payload)
+
+        queued = [
+            (d.event["type"], d.event["trade_id"])
+            for d in db.query(WebhookDelivery).filter(WebhookDelivery.subscription_id == subscription.id)
+        ]
+        await client.delete(app.url_path_for("webhooks:delete-subscription", id=subscription.id))
+        assert queued == [
+            ("offer.expired", test_trade_with_offers.id),
+        ]
+
+
+class TestWebhookDispatcher:
+    async def test_events_are_batched_and_signed(self, create_webhook_target: Callable, db: session.Session) -> None:
+        target = create_webhook_target()
+        queued = queue_webhook_deliveries(
+            events=[(target.user_id, {"type": "offer.pending", "trade_id": n}) for n in range(5)],
+        )
+        assert queued == 5
+
+        receiver = WebhookReceiver()
+        dispatcher = WebhookDispatcher(transport=httpx.ASGITransport(app=receiver), url_check=allow_any_url)
+        await dispatcher.drain_once()
+        await dispatcher.stop()
+
+        assert len(receiver.batches) == 1
+        batch = receiver.batches[0]
+        assert [e["trade_id"] for e in batch["events"]] == list(range(5))
+        assert batch["headers"][SIGNATURE_HEADER.lower()] == sign_body(body=batch["body"], secret=target.secret)
+        assert json.loads(batch["body"]) == {"events": batch["events"]}
+        assert db.query(WebhookDelivery).filter(WebhookDelivery.subscription_id == target.id).count() == 0
+
+    async def test_only_subscribed_event_types_are_queued(self, db: session.Session, test_user: UserInDB) -> None:
+        webhooks_repo = WebhooksRepository(db)
+        subscription = webhooks_repo.create_subscription(
+            user_id=test_user.id,
+            subscription_create=WebhookSubscriptionCreate(url="https://receiver.test/hooks", events=["offer.accepted"]),
+        )
+        queued = queue_webhook_deliveries(events=[
+            (test_user.id, {"type": "offer.pending", "trade_id": 1}),
+            (test_user.id, {"type": "offer.accepted", "trade_id": 1}),
+        ])
+        queued_types = [
+            d.event["type"]
+            for d in db.query(WebhookDelivery).filter(WebhookDelivery.subscription_id == subscription.id)
+        ]
+        webhooks_repo.delete_subscription(subscription=subscription)
+        assert queued == 1
+        assert queued_types == ["offer.accepted"]
+
+    async def test_failed_batches_are_retried_then_dead_lettered(
+        self, create_webhook_target: Callable, db: session.Session,
+    ) -> None:
+        target = create_webhook_target()
+        queue_webhook_deliveries(events=[(target.user_id, {"type": "offer.accepted", "trade_id": 1})])
+        dispatcher = WebhookDispatcher(
+            transport=httpx.ASGITransport(app=WebhookReceiver(fail_with=503)),
+            url_check=allow_any_url,
+            max_attempts=3,
+            base_retry_seconds=0.01,
+        )
+        await dispatcher.drain_once()
+        await dispatcher.stop()
+
+        assert dispatcher.stats["requests"] == 3
+        dead_letters = db.query(WebhookDeadLetter).filter(WebhookDeadLetter.subscription_id == target.id).all()
+        assert [(d.events, d.attempts, d.last_error) for d in dead_letters] == [
+            ([{"type": "offer.accepted", "trade_id": 1}], 3, "HTTP 503"),
+        ]
+        assert db.query(WebhookDelivery).filter(WebhookDelivery.subscription_id == target.id).count() == 0
+
+    async def test_client_errors_are_not_retried(self, create_webhook_target: Callable, db: session.Session) -> None:
+        target = create_webhook_target()
+        queue_webhook_deliveries(events=[(target.user_id, {"type": "trade.deleted", "trade_id": 1})])
+        dispatcher = WebhookDispatcher(
+            transport=httpx.ASGITransport(app=WebhookReceiver(fail_with=410)), url_check=allow_any_url,
+        )
+        await dispatcher.drain_once()
+        await dispatcher.stop()
+
+        assert dispatcher.stats["requests"] == 1
+        assert db.query(WebhookDeadLetter).filter(WebhookDeadLetter.subscription_id == target.id).count() == 1
+
+    async def test_deliveries_outlive_a_worker_that_died(self, create_webhook_target: Callable, db: session.Session) -> None:
+        target = create_webhook_target()
+        queue_webhook_deliveries(events=[(target.user_id, {"type": "trade.created", "trade_id": 1})])
+        # a worker leases the subscription and dies before sending; its lease (none here) runs out
+        claimed = WebhooksRepository(db).claim_deliveries(max_subscriptions=100, batch_size=100, lease_seconds=0)
+        assert target.id in [c["id"] for c in claimed]
+
+        receiver = WebhookReceiver()
+        dispatcher = WebhookDispatcher(transport=httpx.ASGITransport(app=receiver), url_check=allow_any_url)
+        await dispatcher.drain_once()
+        await dispatcher.stop()
+
+        assert receiver.events == [{"type": "trade.created", "trade_id": 1}]
+        assert db.query(WebhookDelivery).filter(WebhookDelivery.subscription_id == target.id).count() == 0
+
+    async def test_leased_endpoints_are_left_to_their_worker(self, create_webhook_target: Callable) -> None:
+        target = create_webhook_target()
+        queue_webhook_deliveries(events=[(target.user_id, {"type": "trade.created", "trade_id": 1})])
+        receiver = WebhookReceiver()
+        first = WebhookDispatcher(transport=httpx.ASGITransport(app=receiver), url_check=allow_any_url)
+        second = WebhookDispatcher(transport=httpx.ASGITransport(app=receiver), url_check=allow_any_url)
+        await asyncio.gather(first.drain_once(), second.drain_once())
+        await first.stop()
+        await second.stop()
+
+        assert receiver.events == [{"type": "trade.created", "trade_id": 1}]
+
+    async def test_internal_targets_are_never_sent_to(self, create_webhook_target: Callable, db: session.Session) -> None:
+        target = create_webhook_target(url="https://169.254.169.254/hooks")
+        queue_webhook_deliveries(events=[(target.user_id, {"type": "trade.created", "trade_id": 1})])
+        receiver = WebhookReceiver()
+        dispatcher = WebhookDispatcher(transport=httpx.ASGITransport(app=receiver))
+        await dispatcher.drain_once()
+        await dispatcher.stop()
+
+        assert dispatcher.stats["requests"] == 0
+        assert receiver.batches == []
+        dead_letters = db.query(WebhookDeadLetter).filter(WebhookDeadLetter.subscription_id == target.id).all()
+        assert [(d.attempts, d.last_error) for d in dead_letters] == [
+            (0, "169.254.169.254 resolves to a non-public address."),
+        ]
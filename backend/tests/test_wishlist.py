@@ -0,0 +1,56 @@
+import pytest
+
+from httpx import AsyncClient
+from fastapi import FastAPI, status
+from sqlalchemy.orm import session
+
+from app.db.metadata import OutboxMessage, Product
+from app.models.swap import WishlistItemPublic
+
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestWishlistRoutes:
+    async def test_routes_exist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("wishlist:list-wishlist"))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.post(app.url_path_for("wishlist:add-to-wishlist"), json={})
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+        res = await client.delete(app.url_path_for("wishlist:remove-from-wishlist", product_id=1))
+        assert res.status_code != status.HTTP_404_NOT_FOUND
+
+    async def test_unauthorized_user_cannot_see_wishlist(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("wishlist:list-wishlist"))
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestWishlist:
+    async def test_user_can_add_list_and_remove_products(
+        self, app: FastAPI, authorized_client: AsyncClient, test_product: Product, db: session.Session,
+    ) -> None:
+        res = await authorized_client.post(app.url_path_for("wishlist:add-to-wishlist"), json={"product_id": test_product.id})
+        assert res.status_code == status.HTTP_201_CREATED
+        assert WishlistItemPublic(**res.json()).product.id == test_product.id
+        assert db.query(OutboxMessage).filter(OutboxMessage.topic == "wishlist.added").count() > 0
+
+        # adding it twice is harmless
+        res = await authorized_client.post(app.url_path_for("wishlist:add-to-wishlist"), json={"product_id": test_product.id})
+        assert res.status_code == status.HTTP_201_CREATED
+
+        res = await authorized_client.get(app.url_path_for("wishlist:list-wishlist"))
+        assert [i["product_id"] for i in res.json()] == [test_product.id]
+
+        res = await authorized_client.delete(
+            app.url_path_for("wishlist:remove-from-wishlist", product_id=test_product.id)
+        )
+        assert res.status_code == status.HTTP_200_OK
+        res = await authorized_client.get(app.url_path_for("wishlist:list-wishlist"))
+        assert res.json() == []
+
+    @pytest.mark.parametrize("product_id, status_code", ((999, 404), (0, 422), (None, 422)))
+    async def test_invalid_product_raises_error(
+        self, app: FastAPI, authorized_client: AsyncClient, product_id: int, status_code: int,
+    ) -> None:
+        res = await authorized_client.post(app.url_path_for("wishlist:add-to-wishlist"), json={"product_id": product_id})
+        assert res.status_code == status_code